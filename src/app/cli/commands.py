@@ -85,6 +85,7 @@ def create_user(
     from app.config.app import alchemy
     from app.domain.accounts.deps import provide_users_service
     from app.domain.accounts.schemas import UserCreate
+    from app.lib import invalidation
 
     console = get_console()
 
@@ -100,7 +101,7 @@ def create_user(
             password=password,
             is_superuser=superuser,
         )
-        async with alchemy.get_session() as db_session:
+        async with invalidation.dispatching(), alchemy.get_session() as db_session:
             users_service = await anext(provide_users_service(db_session))
             user = await users_service.create(data=obj_in.to_dict(), auto_commit=True)
             console.print(f"User created: {user.email}")
@@ -134,11 +135,12 @@ def promote_to_superuser(email: str) -> None:
     from app.config.app import alchemy
     from app.domain.accounts.schemas import UserUpdate
     from app.domain.accounts.services import UserService
+    from app.lib import invalidation
 
     console = get_console()
 
     async def _promote_to_superuser(email: str) -> None:
-        async with UserService.new(config=alchemy) as users_service:
+        async with invalidation.dispatching(), UserService.new(config=alchemy) as users_service:
             user = await users_service.get_one_or_none(email=email)
             if user:
                 console.print(f"Promoting user: %{user.email}")
@@ -174,6 +176,7 @@ def create_default_roles() -> None:
     from app.db.models import UserRole
     from app.domain.accounts.deps import provide_users_service
     from app.domain.accounts.services import RoleService
+    from app.lib import invalidation
     from app.lib.deps import create_service_provider
 
     provide_roles_service = create_service_provider(RoleService)
@@ -181,7 +184,7 @@ def create_default_roles() -> None:
 
     async def _create_default_roles() -> None:
         await load_database_fixtures()
-        async with alchemy.get_session() as db_session:
+        async with invalidation.dispatching(), alchemy.get_session() as db_session:
             users_service = await anext(provide_users_service(db_session))
             roles_service = await anext(provide_roles_service(db_session))
             default_role = await roles_service.get_one_or_none(slug=slugify(users_service.default_role))
@@ -198,3 +201,87 @@ def create_default_roles() -> None:
 
     console.rule("Creating default roles.")
     anyio.run(_create_default_roles)
+
+
+@user_management_group.command(
+    name="password-hash-report",
+    help="Report how many accounts use outdated password hashing parameters.",
+)
+def password_hash_report() -> None:
+    """Count stored password hashes by scheme and parameters.
+
+    Outdated hashes are replaced when their owners next log in.
+    """
+    from collections import Counter
+
+    import anyio
+    from rich import get_console
+    from rich.table import Table
+    from sqlalchemy import select
+
+    from app.config.app import alchemy
+    from app.db.models import User
+    from app.lib import crypt
+
+    console = get_console()
+
+    async def _password_hash_report() -> None:
+        parameters: Counter[str] = Counter()
+        outdated: Counter[str] = Counter()
+        async with alchemy.get_session() as db_session:
+            hashed_passwords = await db_session.stream_scalars(
+                select(User.hashed_password).execution_options(yield_per=1000),
+            )
+            async for hashed_password in hashed_passwords:
+                if hashed_password is None:
+                    continue
+                # "$argon2id$v=19$m=65536,t=3,p=4$<salt>$<digest>" -> "$argon2id$v=19$m=65536,t=3,p=4"
+                key = hashed_password.rsplit("$", 2)[0]
+                parameters[key] += 1
+                if crypt.password_needs_update(hashed_password):
+                    outdated[key] += 1
+
+        table = Table("Parameters", "Accounts", "Outdated")
+        for key, count in parameters.most_common():
+            table.add_row(key, str(count), "yes" if outdated[key] else "no")
+        console.print(table)
+        console.print(f"{outdated.total()} of {parameters.total()} accounts use outdated password hashing parameters.")
+
+    console.rule("Password hash report.")
+    anyio.run(_password_hash_report)
+
+
+@click.command(name="precompress", help="Write compressed siblings of the built frontend assets")
+@click.option(
+    "--directory",
+    help="Directory to compress. Defaults to the Vite bundle directory.",
+    type=click.Path(exists=True, file_okay=False),
+    required=False,
+    show_default=False,
+)
+def precompress_assets(directory: str | None) -> None:
+    """Write ``.br``, ``.zst`` and ``.gz`` siblings of the built assets, served by the application in place of the
+    original files to clients accepting those encodings.
+
+    Args:
+        directory (str | None): The directory to compress.
+    """
+    from pathlib import Path
+    from typing import cast
+
+    from rich import get_console
+
+    from app.config import get_settings
+    from app.lib.compression import available_encodings, precompress
+
+    console = get_console()
+    settings = get_settings()
+    encodings = available_encodings(cast("list[str]", settings.server.COMPRESSION_ENCODINGS))
+    console.rule("Precompress frontend assets.")
+    written = precompress(
+        Path(directory) if directory else settings.vite.BUNDLE_DIR,
+        encodings,
+        minimum_size=settings.server.COMPRESSION_MINIMUM_SIZE,
+        excluded_media_types=cast("list[str]", settings.server.COMPRESSION_EXCLUDED_MEDIA_TYPES),
+    )
+    console.print(f"Wrote {written} compressed files ({', '.join(encodings)}).")
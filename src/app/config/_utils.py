@@ -12,7 +12,7 @@ BASE_DIR: Final[Path] = Path(__file__).parent.parent
 TRUE_VALUES: Final[frozenset[str]] = frozenset({"True", "true", "1", "yes", "YES", "Y", "y", "T", "t"})
 
 T = TypeVar("T")
-ParseTypes = bool | int | str | list[str] | Path | list[Path]
+ParseTypes = bool | int | float | str | list[str] | Path | list[Path]
 
 
 class UnsetType:
@@ -33,6 +33,10 @@ def get_env(key: str, default: bool, type_hint: UnsetType = _UNSET) -> Callable[
 def get_env(key: str, default: int, type_hint: UnsetType = _UNSET) -> Callable[[], int]: ...
 
 
+@overload
+def get_env(key: str, default: float, type_hint: UnsetType = _UNSET) -> Callable[[], float]: ...
+
+
 @overload
 def get_env(key: str, default: str, type_hint: UnsetType = _UNSET) -> Callable[[], str]: ...
 
@@ -71,6 +75,10 @@ def get_config_val(key: str, default: bool, type_hint: UnsetType = _UNSET) -> bo
 def get_config_val(key: str, default: int, type_hint: UnsetType = _UNSET) -> int: ...
 
 
+@overload
+def get_config_val(key: str, default: float, type_hint: UnsetType = _UNSET) -> float: ...
+
+
 @overload
 def get_config_val(key: str, default: str, type_hint: UnsetType = _UNSET) -> str: ...
 
@@ -127,7 +135,12 @@ def get_config_val(  # noqa: C901, PLR0912, PLR0911
         if type_hint != _UNSET:
             return cast("T", int_value)
         return int_value
-    if type(default) is Path:
+    if type(default) is float:
+        float_value = float(value)
+        if type_hint != _UNSET:
+            return cast("T", float_value)
+        return float_value
+    if isinstance(default, Path):
         path_value = Path(value)
         if type_hint != _UNSET:
             return cast("T", path_value)
@@ -5,7 +5,6 @@ from typing import cast
 
 import structlog
 from httpx_oauth.clients.github import GitHubOAuth2
-from litestar.config.compression import CompressionConfig
 from litestar.config.cors import CORSConfig
 from litestar.config.csrf import CSRFConfig
 from litestar.contrib.jinja import JinjaTemplateEngine
@@ -28,11 +27,22 @@ from litestar.template import TemplateConfig
 from litestar_saq import CronJob, QueueConfig, SAQConfig
 from litestar_vite import ViteConfig
 
+from app.lib.assets import StaticAssetsMiddleware
+from app.lib.compression import CompressionMiddleware
+from app.lib.queries import QueryTrackingMiddleware
+from app.lib.replicas import ReplicaRoutingMiddleware, RoutingSession
+from app.lib.response_cache import ResponseCacheLockMiddleware
+from app.lib.timing import ServerTimingMiddleware
+
 from .base import get_settings
 
 settings = get_settings()
 
-compression = CompressionConfig(backend="gzip")
+compression = CompressionMiddleware(
+    encodings=cast("list[str]", settings.server.COMPRESSION_ENCODINGS),
+    minimum_size=settings.server.COMPRESSION_MINIMUM_SIZE,
+    excluded_media_types=cast("list[str]", settings.server.COMPRESSION_EXCLUDED_MEDIA_TYPES),
+)
 csrf = CSRFConfig(
     secret=settings.app.SECRET_KEY,
     cookie_secure=settings.app.CSRF_COOKIE_SECURE,
@@ -42,13 +52,20 @@ cors = CORSConfig(allow_origins=cast("list[str]", settings.app.ALLOWED_CORS_ORIG
 alchemy = SQLAlchemyAsyncConfig(
     engine_instance=settings.db.get_engine(),
     before_send_handler="autocommit",
-    session_config=AsyncSessionConfig(expire_on_commit=False),
+    session_config=AsyncSessionConfig(expire_on_commit=False, sync_session_class=RoutingSession),
     alembic_config=AlembicAsyncConfig(
         version_table_name=settings.db.MIGRATION_DDL_VERSION_TABLE,
         script_config=settings.db.MIGRATION_CONFIG,
         script_location=settings.db.MIGRATION_PATH,
     ),
 )
+query_tracking = QueryTrackingMiddleware(
+    strict=settings.db.QUERY_BUDGET_STRICT,
+    repeated_threshold=settings.db.REPEATED_QUERY_THRESHOLD if settings.app.DEBUG else 0,
+)
+replica_routing = ReplicaRoutingMiddleware()
+response_cache_locks = ResponseCacheLockMiddleware()
+server_timing = ServerTimingMiddleware(sample_rate=settings.log.TIMING_SAMPLE_RATE)
 templates = TemplateConfig(engine=JinjaTemplateEngine(directory=settings.vite.TEMPLATE_DIR))
 problem_details = ProblemDetailsConfig(enable_for_all_http_exceptions=True)
 vite = ViteConfig(
@@ -61,6 +78,13 @@ vite = ViteConfig(
     port=settings.vite.PORT,
     host=settings.vite.HOST,
 )
+static_assets = StaticAssetsMiddleware(
+    path=settings.vite.ASSET_URL,
+    directory=settings.vite.BUNDLE_DIR,
+    manifest=settings.vite.BUNDLE_DIR / vite.manifest_name,
+    encodings=cast("list[str]", settings.server.COMPRESSION_ENCODINGS),
+    max_age=settings.vite.ASSET_MAX_AGE,
+)
 github_oauth = GitHubOAuth2(
     client_id=settings.app.GITHUB_OAUTH2_CLIENT_ID,
     client_secret=settings.app.GITHUB_OAUTH2_CLIENT_SECRET,
@@ -75,6 +99,7 @@ saq = SAQConfig(
             dsn=settings.redis.URL,
             name="system-tasks",
             tasks=["app.domain.system.tasks.system_task", "app.domain.system.tasks.system_upkeep"],
+            after_process=["app.domain.system.tasks.record_job_metrics"],
             scheduled_tasks=[
                 CronJob(
                     function="app.domain.system.tasks.system_upkeep",
@@ -88,6 +113,7 @@ saq = SAQConfig(
             dsn=settings.redis.URL,
             name="background-tasks",
             tasks=["app.domain.system.tasks.background_worker_task"],
+            after_process=["app.domain.system.tasks.record_job_metrics"],
             scheduled_tasks=[
                 CronJob(
                     function="app.domain.system.tasks.background_worker_task",
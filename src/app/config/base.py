@@ -7,16 +7,20 @@ from dataclasses import dataclass, field
 from functools import lru_cache
 from pathlib import Path
 from typing import TYPE_CHECKING, Any, Final, cast
+from uuid import uuid4
 
 from advanced_alchemy.utils.text import slugify
 from litestar.data_extractors import RequestExtractorField
 from litestar.serialization import decode_json, encode_json
 from litestar.utils.module_loader import module_to_os_path
 from redis.asyncio import Redis
-from sqlalchemy import event
+from sqlalchemy import event, make_url
 from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
 from sqlalchemy.pool import NullPool
 
+from app.lib.metrics import InstrumentedRedis, TimedQueuePool
+from app.lib.replicas import is_read_only
+
 from ._utils import get_env
 
 if TYPE_CHECKING:
@@ -28,6 +32,20 @@ DEFAULT_MODULE_NAME = "app"
 BASE_DIR: Final[Path] = module_to_os_path(DEFAULT_MODULE_NAME)
 
 
+_SQLITE_JOURNAL_MODES: Final = frozenset(("DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"))
+_SQLITE_SYNCHRONOUS: Final = frozenset(("OFF", "NORMAL", "FULL", "EXTRA"))
+_SQLITE_TEMP_STORES: Final = frozenset(("DEFAULT", "FILE", "MEMORY"))
+
+
+def _unique_statement_name() -> str:
+    return f"__asyncpg_{uuid4()}__"
+
+
+def _is_memory_database(url: str) -> bool:
+    parsed = make_url(url)
+    return parsed.database in {None, "", ":memory:"} or parsed.query.get("mode") == "memory"
+
+
 @dataclass
 class DatabaseSettings:
     ECHO: bool = field(default_factory=get_env("DATABASE_ECHO", False))
@@ -46,8 +64,42 @@ class DatabaseSettings:
     """Amount of time to wait before recycling connections."""
     POOL_PRE_PING: bool = field(default_factory=get_env("DATABASE_PRE_POOL_PING", False))
     """Optionally ping database before fetching a session from the connection pool."""
+    POOL_WARMUP: bool = field(default_factory=get_env("DATABASE_POOL_WARMUP", False))
+    """Open the connections of the pools, and run the hottest statements on each of them, when a worker starts. See
+    :mod:`app.lib.warmup`."""
     URL: str = field(default_factory=get_env("DATABASE_URL", "sqlite+aiosqlite:///db.sqlite3"))
     """SQLAlchemy Database URL."""
+    QUERY_CACHE_SIZE: int = field(default_factory=get_env("DATABASE_QUERY_CACHE_SIZE", 500))
+    """Statements kept compiled by each engine. See the report of :mod:`app.lib.statement_cache` to size it."""
+    PREPARED_STATEMENT_CACHE_SIZE: int = field(
+        default_factory=get_env("DATABASE_PREPARED_STATEMENT_CACHE_SIZE", 100),
+    )
+    """Statements kept prepared on each ``asyncpg`` connection by SQLAlchemy. ``0`` disables it."""
+    STATEMENT_CACHE_SIZE: int = field(default_factory=get_env("DATABASE_STATEMENT_CACHE_SIZE", 100))
+    """Statements kept prepared on each ``asyncpg`` connection by ``asyncpg`` itself, for the queries it runs directly,
+    such as type introspection. ``0`` disables it."""
+    SQLITE_JOURNAL_MODE: str = field(default_factory=get_env("SQLITE_JOURNAL_MODE", "WAL"))
+    """SQLite journal mode. ``WAL`` lets readers run while a transaction writes."""
+    SQLITE_SYNCHRONOUS: str = field(default_factory=get_env("SQLITE_SYNCHRONOUS", "NORMAL"))
+    """How often SQLite waits for writes to reach the disk. In WAL mode, ``NORMAL`` only syncs on checkpoints: the
+    last transactions may be lost on power failure, but the database stays consistent."""
+    SQLITE_MMAP_SIZE: int = field(default_factory=get_env("SQLITE_MMAP_SIZE", 134217728))
+    """Bytes of the database file read through memory mapping. ``0`` disables it."""
+    SQLITE_CACHE_SIZE: int = field(default_factory=get_env("SQLITE_CACHE_SIZE", -65536))
+    """Page cache of each connection, in pages, or in KiB when negative."""
+    SQLITE_TEMP_STORE: str = field(default_factory=get_env("SQLITE_TEMP_STORE", "MEMORY"))
+    """Where SQLite keeps temporary tables and indices: ``DEFAULT``, ``FILE`` or ``MEMORY``."""
+    SQLITE_BUSY_TIMEOUT: int = field(default_factory=get_env("SQLITE_BUSY_TIMEOUT", 5000))
+    """Milliseconds a connection waits for a lock held by another one before failing with "database is locked"."""
+    SQLITE_BEGIN_IMMEDIATE: bool = field(default_factory=get_env("SQLITE_BEGIN_IMMEDIATE", True))
+    """Start the transactions of code not marked read-only with ``BEGIN IMMEDIATE``, taking the write lock upfront.
+    Requests to ``GET`` and ``HEAD`` handlers are read-only, see :mod:`app.lib.replicas`. A deferred transaction upgrading to a write lock fails at once when another connection wrote since it
+    started, while an immediate one waits up to :attr:`SQLITE_BUSY_TIMEOUT`."""
+    PGBOUNCER: bool = field(default_factory=get_env("DATABASE_PGBOUNCER", False))
+    """Connect through PgBouncer in transaction pooling mode.
+
+    Consecutive transactions may run on different server connections, so both prepared statement caches are disabled
+    and each statement is prepared under a unique name."""
     MIGRATION_CONFIG: str = field(
         default_factory=get_env("DATABASE_MIGRATION_CONFIG", f"{BASE_DIR}/db/migrations/alembic.ini")
     )
@@ -60,31 +112,102 @@ class DatabaseSettings:
     """The name to use for the `alembic` versions table name."""
     FIXTURE_PATH: str = field(default_factory=get_env("DATABASE_FIXTURE_PATH", f"{BASE_DIR}/db/fixtures"))
     """The path to JSON fixture files to load into tables."""
+    QUERY_BUDGET_STRICT: bool = field(default_factory=get_env("DATABASE_QUERY_BUDGET_STRICT", False))
+    """Fail requests that execute more statements than the query budget of their handler, instead of logging a warning.
+
+    Enabled by the test suite."""
+    REPEATED_QUERY_THRESHOLD: int = field(default_factory=get_env("DATABASE_REPEATED_QUERY_THRESHOLD", 3))
+    """Log statements executed at least this many times within a request, in debug mode, as likely N+1 queries."""
+    REPLICA_URLS: list[str] | str = field(default_factory=get_env("DATABASE_REPLICA_URLS", [], list[str]))
+    """SQLAlchemy URLs of read replicas of the database. Accepts a comma separated list.
+
+    The reads of ``GET`` handlers, and of code marked read-only, are sent to the replicas, see :mod:`app.lib.replicas`.
+    """
+    REPLICA_POOL_MAX_OVERFLOW: int = field(default_factory=get_env("DATABASE_REPLICA_MAX_POOL_OVERFLOW", 10))
+    """Max overflow for the connection pool of each replica."""
+    REPLICA_POOL_SIZE: int = field(default_factory=get_env("DATABASE_REPLICA_POOL_SIZE", 5))
+    """Pool size for the connection pool of each replica."""
+    REPLICA_POOL_TIMEOUT: int = field(default_factory=get_env("DATABASE_REPLICA_POOL_TIMEOUT", 30))
+    """Time in seconds for timing connections out of the connection pool of a replica."""
+    REPLICA_POOL_RECYCLE: int = field(default_factory=get_env("DATABASE_REPLICA_POOL_RECYCLE", 300))
+    """Amount of time to wait before recycling the connections of a replica."""
+    REPLICA_MAX_STALENESS: float = field(default_factory=get_env("DATABASE_REPLICA_MAX_STALENESS", 5.0))
+    """Seconds a replica may lag behind the primary before its reads are sent to the primary."""
+    REPLICA_CHECK_INTERVAL: float = field(default_factory=get_env("DATABASE_REPLICA_CHECK_INTERVAL", 1.0))
+    """Seconds between two measures of the replication lag."""
     _engine_instance: AsyncEngine | None = None
     """SQLAlchemy engine instance generated from settings."""
+    _replica_engines: list[AsyncEngine] | None = None
+    """SQLAlchemy engine instances of the replicas, generated from settings."""
+
+    def __post_init__(self) -> None:
+        if isinstance(self.REPLICA_URLS, str):
+            self.REPLICA_URLS = [url.strip() for url in self.REPLICA_URLS.split(",") if url.strip()]
+        for name, value, choices in (
+            ("SQLITE_JOURNAL_MODE", self.SQLITE_JOURNAL_MODE, _SQLITE_JOURNAL_MODES),
+            ("SQLITE_SYNCHRONOUS", self.SQLITE_SYNCHRONOUS, _SQLITE_SYNCHRONOUS),
+            ("SQLITE_TEMP_STORE", self.SQLITE_TEMP_STORE, _SQLITE_TEMP_STORES),
+        ):
+            if value.upper() not in choices:
+                msg = f"{name} must be one of {', '.join(sorted(choices))}, not {value!r}"
+                raise ValueError(msg)
 
     @property
     def engine(self) -> AsyncEngine:
         return self.get_engine()
 
     def get_engine(self) -> AsyncEngine:
-        if self._engine_instance is not None:
-            return self._engine_instance
-        if self.URL.startswith("postgresql+asyncpg"):
+        if self._engine_instance is None:
+            self._engine_instance = self._create_engine(
+                self.URL,
+                pool_size=self.POOL_SIZE,
+                max_overflow=self.POOL_MAX_OVERFLOW,
+                pool_timeout=self.POOL_TIMEOUT,
+                pool_recycle=self.POOL_RECYCLE,
+            )
+        return self._engine_instance
+
+    def get_replica_engines(self) -> list[AsyncEngine]:
+        """Engines of the read replicas, each with its own connection pool."""
+        if self._replica_engines is None:
+            self._replica_engines = [
+                self._create_engine(
+                    url,
+                    pool_size=self.REPLICA_POOL_SIZE,
+                    max_overflow=self.REPLICA_POOL_MAX_OVERFLOW,
+                    pool_timeout=self.REPLICA_POOL_TIMEOUT,
+                    pool_recycle=self.REPLICA_POOL_RECYCLE,
+                )
+                for url in cast("list[str]", self.REPLICA_URLS)
+            ]
+        return self._replica_engines
+
+    def _create_engine(
+        self,
+        url: str,
+        *,
+        pool_size: int,
+        max_overflow: int,
+        pool_timeout: int,
+        pool_recycle: int,
+    ) -> AsyncEngine:
+        if url.startswith("postgresql+asyncpg"):
             engine = create_async_engine(
-                url=self.URL,
+                url=url,
                 future=True,
                 json_serializer=encode_json,
                 json_deserializer=decode_json,
                 echo=self.ECHO,
                 echo_pool=self.ECHO_POOL,
-                max_overflow=self.POOL_MAX_OVERFLOW,
-                pool_size=self.POOL_SIZE,
-                pool_timeout=self.POOL_TIMEOUT,
-                pool_recycle=self.POOL_RECYCLE,
+                max_overflow=max_overflow,
+                pool_size=pool_size,
+                pool_timeout=pool_timeout,
+                pool_recycle=pool_recycle,
                 pool_pre_ping=self.POOL_PRE_PING,
                 pool_use_lifo=True,  # use lifo to reduce the number of idle connections
-                poolclass=NullPool if self.POOL_DISABLED else None,
+                poolclass=NullPool if self.POOL_DISABLED else TimedQueuePool,
+                query_cache_size=self.QUERY_CACHE_SIZE,
+                connect_args=self._asyncpg_connect_args(),
             )
             """Database session factory.
 
@@ -128,17 +251,32 @@ class DatabaseSettings:
                         format="binary",
                     ),
                 )
-        elif self.URL.startswith("sqlite+aiosqlite"):
+        elif url.startswith("sqlite+aiosqlite"):
+            # an in-memory database only lives as long as its single connection
+            pool_options: dict[str, Any] = (
+                {}
+                if _is_memory_database(url)
+                else {
+                    "max_overflow": max_overflow,
+                    "pool_size": pool_size,
+                    "pool_timeout": pool_timeout,
+                    "pool_use_lifo": True,
+                    "poolclass": NullPool if self.POOL_DISABLED else TimedQueuePool,
+                }
+            )
             engine = create_async_engine(
-                url=self.URL,
+                url=url,
                 future=True,
                 json_serializer=encode_json,
                 json_deserializer=decode_json,
                 echo=self.ECHO,
                 echo_pool=self.ECHO_POOL,
-                pool_recycle=self.POOL_RECYCLE,
+                pool_recycle=pool_recycle,
                 pool_pre_ping=self.POOL_PRE_PING,
+                query_cache_size=self.QUERY_CACHE_SIZE,
+                **pool_options,
             )
+            pragmas = self._sqlite_pragmas()
             """Database session factory.
 
             See [`async_sessionmaker()`][sqlalchemy.ext.asyncio.async_sessionmaker].
@@ -146,31 +284,65 @@ class DatabaseSettings:
 
             @event.listens_for(engine.sync_engine, "connect")
             def _sqla_on_connect(dbapi_connection: Any, _: Any) -> Any:  # pragma: no cover
-                """Override the default begin statement.  The disables the built in begin execution."""
+                """Override the default begin statement.  The disables the built in begin execution.
+
+                Then apply the performance profile of the settings.
+                """
                 dbapi_connection.isolation_level = None
+                cursor = dbapi_connection.cursor()
+                for pragma in pragmas:
+                    cursor.execute(pragma)
+                cursor.close()
 
             @event.listens_for(engine.sync_engine, "begin")
             def _sqla_on_begin(dbapi_connection: Any) -> Any:  # pragma: no cover
-                """Emits a custom begin"""
-                dbapi_connection.exec_driver_sql("BEGIN")
+                """Emits a custom begin, immediate for requests that may write when enabled."""
+                if self.SQLITE_BEGIN_IMMEDIATE and not is_read_only():
+                    dbapi_connection.exec_driver_sql("BEGIN IMMEDIATE")
+                else:
+                    dbapi_connection.exec_driver_sql("BEGIN")
         else:
             engine = create_async_engine(
-                url=self.URL,
+                url=url,
                 future=True,
                 json_serializer=encode_json,
                 json_deserializer=decode_json,
                 echo=self.ECHO,
                 echo_pool=self.ECHO_POOL,
-                max_overflow=self.POOL_MAX_OVERFLOW,
-                pool_size=self.POOL_SIZE,
-                pool_timeout=self.POOL_TIMEOUT,
-                pool_recycle=self.POOL_RECYCLE,
+                max_overflow=max_overflow,
+                pool_size=pool_size,
+                pool_timeout=pool_timeout,
+                pool_recycle=pool_recycle,
                 pool_pre_ping=self.POOL_PRE_PING,
                 pool_use_lifo=True,  # use lifo to reduce the number of idle connections
-                poolclass=NullPool if self.POOL_DISABLED else None,
+                poolclass=NullPool if self.POOL_DISABLED else TimedQueuePool,
+                query_cache_size=self.QUERY_CACHE_SIZE,
             )
-        self._engine_instance = engine
-        return self._engine_instance
+        return engine
+
+    def _sqlite_pragmas(self) -> list[str]:
+        # the busy timeout comes first, so that switching the journal mode waits for other connections
+        return [
+            f"PRAGMA busy_timeout = {int(self.SQLITE_BUSY_TIMEOUT)}",
+            f"PRAGMA journal_mode = {self.SQLITE_JOURNAL_MODE.upper()}",
+            f"PRAGMA synchronous = {self.SQLITE_SYNCHRONOUS.upper()}",
+            f"PRAGMA mmap_size = {int(self.SQLITE_MMAP_SIZE)}",
+            f"PRAGMA cache_size = {int(self.SQLITE_CACHE_SIZE)}",
+            f"PRAGMA temp_store = {self.SQLITE_TEMP_STORE.upper()}",
+        ]
+
+    def _asyncpg_connect_args(self) -> dict[str, Any]:
+        if self.PGBOUNCER:
+            # named statements prepared on one server connection do not exist on the others
+            return {
+                "prepared_statement_cache_size": 0,
+                "statement_cache_size": 0,
+                "prepared_statement_name_func": _unique_statement_name,
+            }
+        return {
+            "prepared_statement_cache_size": self.PREPARED_STATEMENT_CACHE_SIZE,
+            "statement_cache_size": self.STATEMENT_CACHE_SIZE,
+        }
 
 
 @dataclass
@@ -197,6 +369,12 @@ class ViteSettings:
     """Template directory."""
     ASSET_URL: str = field(default_factory=get_env("ASSET_URL", "/static/"))
     """Base URL for assets"""
+    ASSET_MAX_AGE: int = field(default_factory=get_env("VITE_ASSET_MAX_AGE", 31536000))
+    """Lifetime in seconds of the fingerprinted assets listed in the Vite manifest, served as immutable."""
+    HTML_MAX_AGE: int = field(default_factory=get_env("VITE_HTML_MAX_AGE", 60))
+    """Lifetime in seconds of the HTML shell, which references the fingerprinted assets of the current build."""
+    PRELOAD_ASSETS: bool = field(default_factory=get_env("VITE_PRELOAD_ASSETS", True))
+    """Send a `Link` header preloading the entry point assets with the HTML shell, for proxies sending 103 Early Hints."""
 
     @property
     def set_static_files(self) -> bool:
@@ -218,6 +396,44 @@ class ServerSettings:
     """Turn on hot reloading."""
     RELOAD_DIRS: list[str] = field(default_factory=get_env("LITESTAR_RELOAD_DIRS", [f"{BASE_DIR}"]))
     """Directories to watch for reloading."""
+    COMPRESSION_ENCODINGS: list[str] | str = field(
+        default_factory=get_env("COMPRESSION_ENCODINGS", ["br", "zstd", "gzip"], list[str]),
+    )
+    """Response encodings in order of preference. ``br`` and ``zstd`` require the ``compression`` extra, and are
+    skipped without it. Accepts a comma separated list."""
+    COMPRESSION_MINIMUM_SIZE: int = field(default_factory=get_env("COMPRESSION_MINIMUM_SIZE", 500))
+    """Response bodies smaller than this many bytes are sent uncompressed."""
+    COMPRESSION_EXCLUDED_MEDIA_TYPES: list[str] | str = field(
+        default_factory=get_env(
+            "COMPRESSION_EXCLUDED_MEDIA_TYPES",
+            [
+                "image/png",
+                "image/jpeg",
+                "image/gif",
+                "image/webp",
+                "image/avif",
+                "audio/",
+                "video/",
+                "font/woff",
+                "application/zip",
+                "application/gzip",
+                "application/zstd",
+                "application/pdf",
+            ],
+            list[str],
+        ),
+    )
+    """Media types, or prefixes ending with ``/``, that are already compressed. Accepts a comma separated list."""
+
+    def __post_init__(self) -> None:
+        if isinstance(self.COMPRESSION_ENCODINGS, str):
+            self.COMPRESSION_ENCODINGS = [
+                name.strip() for name in self.COMPRESSION_ENCODINGS.split(",") if name.strip()
+            ]
+        if isinstance(self.COMPRESSION_EXCLUDED_MEDIA_TYPES, str):
+            self.COMPRESSION_EXCLUDED_MEDIA_TYPES = [
+                name.strip() for name in self.COMPRESSION_EXCLUDED_MEDIA_TYPES.split(",") if name.strip()
+            ]
 
 
 @dataclass
@@ -314,6 +530,11 @@ class LogSettings:
     """Level to log uvicorn access logs."""
     ASGI_ERROR_LEVEL: int = field(default_factory=get_env("ASGI_ERROR_LOG_LEVEL", 30))
     """Level to log uvicorn error logs."""
+    TIMING_SAMPLE_RATE: float = field(default_factory=get_env("LOG_TIMING_SAMPLE_RATE", 1.0))
+    """Share of the requests, between ``0`` and ``1``, timed and reported in the ``Server-Timing`` header.
+
+    ``0`` disables the timings.
+    """
 
 
 @dataclass
@@ -332,17 +553,104 @@ class RedisSettings:
     def client(self) -> Redis:
         return self.get_client()
 
-    def get_client(self) -> Redis:
-        return Redis.from_url(
-            url=self.URL,
-            encoding="utf-8",
-            decode_responses=False,
-            socket_connect_timeout=self.SOCKET_CONNECT_TIMEOUT,
-            socket_keepalive=self.SOCKET_KEEPALIVE,
-            health_check_interval=self.HEALTH_CHECK_INTERVAL,
+    def get_client(self, instrumented: bool = False) -> Redis:
+        """Create a client, recording the latency of its commands when ``instrumented``, see :mod:`app.lib.metrics`."""
+        client_type = InstrumentedRedis if instrumented else Redis
+        return cast(
+            "Redis",
+            client_type.from_url(
+                url=self.URL,
+                encoding="utf-8",
+                decode_responses=False,
+                socket_connect_timeout=self.SOCKET_CONNECT_TIMEOUT,
+                socket_keepalive=self.SOCKET_KEEPALIVE,
+                health_check_interval=self.HEALTH_CHECK_INTERVAL,
+            ),
         )
 
 
+@dataclass
+class CacheSettings:
+    """Cache configurations."""
+
+    PRINCIPAL_ENABLED: bool = field(default_factory=get_env("CACHE_PRINCIPAL_ENABLED", True))
+    """Cache the authenticated user (roles and team memberships) instead of loading it on every request."""
+    PRINCIPAL_EXPIRATION: int = field(default_factory=get_env("CACHE_PRINCIPAL_EXPIRATION", 60))
+    """Time in seconds a cached principal is kept in Redis."""
+    PRINCIPAL_LOCAL_EXPIRATION: int = field(default_factory=get_env("CACHE_PRINCIPAL_LOCAL_EXPIRATION", 5))
+    """Time in seconds a cached principal is kept in the per-worker memory cache.
+
+    Changes made by other workers are only seen after this expires, so keep it short.
+    """
+    PRINCIPAL_LOCAL_MAX_SIZE: int = field(default_factory=get_env("CACHE_PRINCIPAL_LOCAL_MAX_SIZE", 1024))
+    """Maximum number of principals kept in the per-worker memory cache."""
+    COUNT_EXPIRATION: int = field(default_factory=get_env("CACHE_COUNT_EXPIRATION", 300))
+    """Time in seconds a list total counted with the ``cached`` strategy is kept in Redis.
+
+    Writes retire cached totals as soon as they are committed, so this only bounds how long unused entries are kept.
+    """
+    RESPONSE_STALE_EXPIRATION: int = field(default_factory=get_env("CACHE_RESPONSE_STALE_EXPIRATION", 60))
+    """Time in seconds an expired cached response is still served while a single request refreshes it.
+
+    Writes purge the affected responses outright, so stale entries are only served for data that did not change.
+    """
+    RESPONSE_LOCK_TIMEOUT: int = field(default_factory=get_env("CACHE_RESPONSE_LOCK_TIMEOUT", 5))
+    """Maximum time in seconds concurrent requests wait for the one rendering a missing cached response.
+
+    Set to ``0`` to let every request render on a miss.
+    """
+    RESPONSE_COMPRESSION_MIN_SIZE: int = field(default_factory=get_env("CACHE_RESPONSE_COMPRESSION_MIN_SIZE", 1024))
+    """Minimum body size in bytes of a cached response stored compressed, with the encoding negotiated with the client.
+
+    Compressed entries are replayed as they are on cache hits, without compressing the response again.
+    """
+    LOCAL_STORES: list[str] | str = field(default_factory=get_env("CACHE_LOCAL_STORES", [], list[str]))
+    """Names of the stores served from a per-worker memory tier in front of Redis, such as ``response_cache``.
+
+    Accepts a comma separated list.
+    """
+    LOCAL_STORE_MAX_SIZE: int = field(default_factory=get_env("CACHE_LOCAL_STORE_MAX_SIZE", 1024))
+    """Maximum number of entries kept in the memory tier of each local store."""
+    LOCAL_STORE_EXPIRATION: int = field(default_factory=get_env("CACHE_LOCAL_STORE_EXPIRATION", 5))
+    """Time in seconds an entry is kept in the memory tier of a local store.
+
+    Writes made through the application are broadcast to every worker, so this only bounds how long changes made
+    directly in Redis go unnoticed.
+    """
+
+    def __post_init__(self) -> None:
+        if isinstance(self.LOCAL_STORES, str):
+            self.LOCAL_STORES = [name.strip() for name in self.LOCAL_STORES.split(",") if name.strip()]
+
+
+@dataclass
+class HealthSettings:
+    """Health check configurations."""
+
+    CHECK_TIMEOUT: float = field(default_factory=get_env("HEALTH_CHECK_TIMEOUT", 2.0))
+    """Seconds each readiness check may take before it is reported as failed."""
+    CACHE_EXPIRATION: float = field(default_factory=get_env("HEALTH_CACHE_EXPIRATION", 5.0))
+    """Seconds the outcome of the readiness checks is reused for by the probes hitting a worker."""
+
+
+@dataclass
+class MetricsSettings:
+    """Prometheus metrics configurations."""
+
+    ENABLED: bool = field(default_factory=get_env("METRICS_ENABLED", False))
+    """Record metrics and serve them on the ``/metrics`` endpoint."""
+    TOKEN: str = field(default_factory=get_env("METRICS_TOKEN", ""))
+    """Bearer token the scrapers of the ``/metrics`` endpoint authenticate with.
+
+    The endpoint answers 401 to requests without it, and to every request while it is not set.
+    """
+    FLUSH_INTERVAL: float = field(default_factory=get_env("METRICS_FLUSH_INTERVAL", 10.0))
+    """Seconds between two flushes of the metrics of a worker to Redis.
+
+    The gauges of a worker are dropped after three intervals without a flush.
+    """
+
+
 @dataclass
 class AppSettings:
     """Application configuration"""
@@ -367,10 +675,24 @@ class AppSettings:
     """CSRF Secure Cookie"""
     JWT_ENCRYPTION_ALGORITHM: str = field(default_factory=lambda: "HS256")
     """JWT Encryption Algorithm"""
+    JWT_CLAIMS_ENABLED: bool = field(default_factory=get_env("JWT_CLAIMS_ENABLED", False))
+    """Embed authorization claims in access tokens, so handlers marked `claims_only` skip loading the user."""
     GITHUB_OAUTH2_CLIENT_ID: str = field(default_factory=get_env("GITHUB_OAUTH2_CLIENT_ID", ""))
     """Github OAuth2 Client ID"""
     GITHUB_OAUTH2_CLIENT_SECRET: str = field(default_factory=get_env("GITHUB_OAUTH2_CLIENT_SECRET", ""))
     """Github OAuth2 Client Secret"""
+    PASSWORD_ARGON2_MEMORY_COST: int = field(default_factory=get_env("PASSWORD_ARGON2_MEMORY_COST", 65536))
+    """Argon2 memory cost, in KiB, for new password hashes. Existing hashes are upgraded on login."""
+    PASSWORD_ARGON2_TIME_COST: int = field(default_factory=get_env("PASSWORD_ARGON2_TIME_COST", 3))
+    """Argon2 number of iterations for new password hashes."""
+    PASSWORD_ARGON2_PARALLELISM: int = field(default_factory=get_env("PASSWORD_ARGON2_PARALLELISM", 4))
+    """Argon2 degree of parallelism for new password hashes."""
+    PASSWORD_HASHING_BACKEND: str = field(default_factory=get_env("PASSWORD_HASHING_BACKEND", "process"))
+    """Executor used for password hashing and verification: `process` or `thread`."""
+    PASSWORD_HASHING_WORKERS: int = field(default_factory=get_env("PASSWORD_HASHING_WORKERS", 2))
+    """Number of password hashing workers per application process."""
+    PASSWORD_HASHING_MAX_PENDING: int = field(default_factory=get_env("PASSWORD_HASHING_MAX_PENDING", 32))
+    """Maximum number of queued and running password operations before new ones are rejected with a 503."""
 
     @property
     def slug(self) -> str:
@@ -406,6 +728,9 @@ class Settings:
     server: ServerSettings = field(default_factory=ServerSettings)
     log: LogSettings = field(default_factory=LogSettings)
     redis: RedisSettings = field(default_factory=RedisSettings)
+    cache: CacheSettings = field(default_factory=CacheSettings)
+    metrics: MetricsSettings = field(default_factory=MetricsSettings)
+    health: HealthSettings = field(default_factory=HealthSettings)
     saq: SaqSettings = field(default_factory=SaqSettings)
 
     @classmethod
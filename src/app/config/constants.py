@@ -12,10 +12,34 @@ DEFAULT_PAGINATION_SIZE = 20
 """Default page size to use."""
 CACHE_EXPIRATION: int = 60
 """Default cache key expiration in seconds."""
+RESPONSE_CACHE_STORE = "response_cache"
+"""The name of the store used to cache responses."""
+CACHE_TAGS = "cache_tags"
+"""Route handler ``opt`` key listing the tags of its cached responses, formatted with the path parameters."""
+CACHE_KEY_SCOPES = "cache_key_scopes"
+"""Route handler ``opt`` key listing the cache key scopes its cached responses vary by, such as ``user``."""
+PRINCIPAL_CACHE_STORE = "principals"
+"""The name of the store used to cache authenticated users."""
+TOKEN_VERSION_NAMESPACE = "token-versions"  # noqa: S105
+"""The Redis key namespace of the per-user token version counters."""
+COUNT_CACHE_NAMESPACE = "counts"
+"""The Redis key namespace of the list totals counted with the ``cached`` strategy."""
+QUERY_BUDGET = "query_budget"
+"""Route handler ``opt`` key holding the maximum number of statements a request to the handler may execute."""
+CLAIMS_ONLY = "claims_only"
+"""Route handler ``opt`` key for handlers that authorize from token claims, without loading the user."""
+READ_ONLY = "read_only"
+"""Route handler ``opt`` key sending the reads of the handler to a database replica, or to the primary when ``False``.
+
+Defaults to ``True`` for ``GET`` and ``HEAD`` handlers when replicas are configured."""
 DEFAULT_USER_ROLE = "Application Access"
 """The name of the default role assigned to all users."""
 HEALTH_ENDPOINT = "/health"
 """The endpoint to use for the the service health check."""
+METRICS_ENDPOINT = "/metrics"
+"""The endpoint serving the Prometheus metrics."""
+METRICS_NAMESPACE = "metrics"
+"""The Redis key namespace of the metrics aggregated across workers."""
 SITE_INDEX = "/"
 """The site index URL."""
 OPENAPI_SCHEMA = "/schema"
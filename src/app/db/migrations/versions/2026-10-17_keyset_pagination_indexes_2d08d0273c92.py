@@ -0,0 +1,68 @@
+# type: ignore
+"""Keyset pagination indexes
+
+Revision ID: 2d08d0273c92
+Revises: 1c703154d1d8
+Create Date: 2026-10-17 09:12:44.518203+00:00
+
+"""
+from __future__ import annotations
+
+import warnings
+from typing import TYPE_CHECKING
+
+import sqlalchemy as sa
+from alembic import op
+from advanced_alchemy.types import EncryptedString, EncryptedText, GUID, ORA_JSONB, DateTimeUTC
+from sqlalchemy import Text  # noqa: F401
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+__all__ = ["downgrade", "upgrade", "schema_upgrades", "schema_downgrades", "data_upgrades", "data_downgrades"]
+
+sa.GUID = GUID
+sa.DateTimeUTC = DateTimeUTC
+sa.ORA_JSONB = ORA_JSONB
+sa.EncryptedString = EncryptedString
+sa.EncryptedText = EncryptedText
+
+# revision identifiers, used by Alembic.
+revision = '2d08d0273c92'
+down_revision = '1c703154d1d8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", category=UserWarning)
+        with op.get_context().autocommit_block():
+            schema_upgrades()
+            data_upgrades()
+
+def downgrade() -> None:
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", category=UserWarning)
+        with op.get_context().autocommit_block():
+            data_downgrades()
+            schema_downgrades()
+
+def schema_upgrades() -> None:
+    """schema upgrade migrations go here."""
+    # Built concurrently on PostgreSQL so that large tables stay writable while the index is created.
+    op.create_index('ix_user_account_name_id', 'user_account', ['name', 'id'], unique=False, if_not_exists=True, postgresql_concurrently=True)
+    op.create_index('ix_team_name_id', 'team', ['name', 'id'], unique=False, if_not_exists=True, postgresql_concurrently=True)
+    op.create_index('ix_tag_name_id', 'tag', ['name', 'id'], unique=False, if_not_exists=True, postgresql_concurrently=True)
+
+def schema_downgrades() -> None:
+    """schema downgrade migrations go here."""
+    op.drop_index('ix_tag_name_id', table_name='tag', if_exists=True, postgresql_concurrently=True)
+    op.drop_index('ix_team_name_id', table_name='team', if_exists=True, postgresql_concurrently=True)
+    op.drop_index('ix_user_account_name_id', table_name='user_account', if_exists=True, postgresql_concurrently=True)
+
+def data_upgrades() -> None:
+    """Add any optional data upgrade migrations here!"""
+
+def data_downgrades() -> None:
+    """Add any optional data downgrade migrations here!"""
@@ -7,6 +7,7 @@ from advanced_alchemy.mixins import SlugKey, UniqueMixin
 from advanced_alchemy.utils.text import slugify
 from sqlalchemy import (
     ColumnElement,
+    Index,
     String,
     Table,
 )
@@ -46,6 +47,10 @@ class Tag(UUIDAuditBase, SlugKey, UniqueMixin):
         return cls.slug == slugify(name)
 
 
+# Matches the keyset pagination order of the tag list.
+Index("ix_tag_name_id", Tag.name, Tag.id)
+
+
 def _team_tag() -> Table:
     from .team_tag import team_tag
 
@@ -4,7 +4,7 @@ from typing import TYPE_CHECKING
 
 from advanced_alchemy.base import UUIDAuditBase
 from advanced_alchemy.mixins import SlugKey
-from sqlalchemy import String
+from sqlalchemy import Index, String
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .team_tag import team_tag
@@ -48,3 +48,7 @@ class Team(UUIDAuditBase, SlugKey):
         cascade="all, delete",
         passive_deletes=True,
     )
+
+
+# Matches the keyset pagination order of the team list.
+Index("ix_team_name_id", Team.name, Team.id)
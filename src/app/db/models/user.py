@@ -4,7 +4,7 @@ from datetime import date, datetime
 from typing import TYPE_CHECKING
 
 from advanced_alchemy.base import UUIDAuditBase
-from sqlalchemy import String
+from sqlalchemy import Index, String
 from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -16,7 +16,10 @@ if TYPE_CHECKING:
 
 class User(UUIDAuditBase):
     __tablename__ = "user_account"
-    __table_args__ = {"comment": "User accounts for application access"}
+    __table_args__ = (
+        Index("ix_user_account_name_id", "name", "id"),
+        {"comment": "User accounts for application access"},
+    )
     __pii_columns__ = {"name", "email", "avatar_url"}
 
     email: Mapped[str] = mapped_column(unique=True, index=True, nullable=False)
@@ -1,5 +1,5 @@
 """User Account domain logic."""
 
-from app.domain.accounts import controllers, deps, guards, schemas, services, signals, urls
+from app.domain.accounts import cache, controllers, deps, guards, permissions, schemas, services, signals, urls
 
-__all__ = ("controllers", "deps", "guards", "schemas", "services", "signals", "urls")
+__all__ = ("cache", "controllers", "deps", "guards", "permissions", "schemas", "services", "signals", "urls")
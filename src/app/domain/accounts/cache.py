@@ -0,0 +1,343 @@
+"""Authenticated principal cache.
+
+Resolving the user behind a token costs a user lookup plus the role and team membership loads. The result is cached
+as a compact snapshot: first in a short-lived per-worker LRU, then in Redis. Snapshots are dropped whenever the user,
+their roles or their team memberships are committed, and the other workers are told to drop their copy.
+
+A snapshot is only written back if no invalidation happened since the user was loaded: a load racing with a commit
+would otherwise cache the state from before the commit, until it expires.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime  # noqa: TC003
+from operator import attrgetter
+from typing import TYPE_CHECKING, Any
+from uuid import UUID, uuid4
+
+import msgspec
+import structlog
+from redis import RedisError
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.config.base import get_settings
+from app.db import models as m
+from app.domain.accounts.permissions import Permissions, TeamPermission, set_permissions
+from app.lib import invalidation
+from app.lib.cache import LocalCache
+
+if TYPE_CHECKING:
+    from litestar.stores.base import Store
+
+    from app.lib.stores import InvalidationChannel
+
+__all__ = ("Principal", "PrincipalCache", "PrincipalRole", "PrincipalTeam", "principal_cache")
+
+logger = structlog.get_logger()
+
+_GENERATION_KEY = "generation"
+"""Replaced on every invalidation, so that writers can tell whether their snapshot may be outdated."""
+
+
+def _set_loaded(instance: Any, key: str, value: Any) -> None:
+    """Populate a relationship as if it had been loaded, without history, cascades or backrefs."""
+    set_committed_value(instance, key, value)  # type: ignore[no-untyped-call]
+
+
+class PrincipalRole(msgspec.Struct, frozen=True, array_like=True):
+    id: UUID
+    role_id: UUID
+    role_slug: str
+    role_name: str
+    assigned_at: datetime
+
+
+class PrincipalTeam(msgspec.Struct, frozen=True, array_like=True):
+    id: UUID
+    team_id: UUID
+    team_name: str
+    role: m.TeamRoles
+    is_owner: bool
+
+
+class Principal(msgspec.Struct, frozen=True, array_like=True):
+    """Snapshot of an authenticated user with the relationships used for authorization."""
+
+    id: UUID
+    email: str
+    name: str | None
+    is_active: bool
+    is_superuser: bool
+    is_verified: bool
+    roles: tuple[PrincipalRole, ...] = ()
+    teams: tuple[PrincipalTeam, ...] = ()
+
+    @classmethod
+    def from_model(cls, user: m.User) -> Principal:
+        """Build a snapshot from a user loaded with its roles and teams."""
+        return cls(
+            id=user.id,
+            email=user.email,
+            name=user.name,
+            is_active=user.is_active,
+            is_superuser=user.is_superuser,
+            is_verified=user.is_verified,
+            roles=tuple(
+                PrincipalRole(
+                    id=assigned_role.id,
+                    role_id=assigned_role.role_id,
+                    role_slug=assigned_role.role.slug,
+                    role_name=assigned_role.role.name,
+                    assigned_at=assigned_role.assigned_at,
+                )
+                for assigned_role in user.roles
+            ),
+            teams=tuple(
+                PrincipalTeam(
+                    id=membership.id,
+                    team_id=membership.team_id,
+                    team_name=membership.team.name,
+                    role=membership.role,
+                    is_owner=membership.is_owner,
+                )
+                for membership in user.teams
+            ),
+        )
+
+    def permissions(self) -> Permissions:
+        """Build the permission snapshot without going through the ORM."""
+        return Permissions(
+            is_superuser=self.is_superuser,
+            roles=frozenset(cached_role.role_name for cached_role in self.roles),
+            teams={
+                cached_team.team_id: TeamPermission(cached_team.role, cached_team.is_owner)
+                for cached_team in self.teams
+            },
+        )
+
+    def to_model(self) -> m.User:
+        """Rebuild a detached user, with its permission snapshot attached.
+
+        Only the attributes needed to authorize a request are populated. The instance is not attached to a session;
+        load the user from the database when the full record is needed.
+        """
+        user = m.User(
+            id=self.id,
+            email=self.email,
+            name=self.name,
+            is_active=self.is_active,
+            is_superuser=self.is_superuser,
+            is_verified=self.is_verified,
+        )
+        roles = []
+        for cached_role in self.roles:
+            assigned_role = m.UserRole(
+                id=cached_role.id,
+                user_id=self.id,
+                role_id=cached_role.role_id,
+                assigned_at=cached_role.assigned_at,
+            )
+            _set_loaded(
+                assigned_role,
+                "role",
+                m.Role(id=cached_role.role_id, slug=cached_role.role_slug, name=cached_role.role_name),
+            )
+            roles.append(assigned_role)
+        teams = []
+        for cached_team in self.teams:
+            membership = m.TeamMember(
+                id=cached_team.id,
+                user_id=self.id,
+                team_id=cached_team.team_id,
+                role=cached_team.role,
+                is_owner=cached_team.is_owner,
+            )
+            _set_loaded(membership, "team", m.Team(id=cached_team.team_id, name=cached_team.team_name))
+            teams.append(membership)
+        _set_loaded(user, "roles", roles)
+        _set_loaded(user, "teams", teams)
+        set_permissions(user, self.permissions())
+        return user
+
+
+_encoder = msgspec.msgpack.Encoder()
+_decoder = msgspec.msgpack.Decoder(Principal)
+
+
+class PrincipalCache:
+    """Caches principals by email, the identifier stored in the token.
+
+    A reverse ``id:<user_id>`` key allows invalidation from changes that only know the user's primary key.
+    Redis errors are logged and treated as a miss, so an unavailable cache only costs the database lookup.
+
+    With a ``channel``, the LRU is only used while subscribed to it, as for
+    :class:`~app.lib.stores.LayeredStore`. Call :meth:`start` when the application starts and :meth:`stop` when it
+    shuts down.
+    """
+
+    __slots__ = (
+        "_generation",
+        "_local",
+        "channel",
+        "enabled",
+        "expires_in",
+        "local_hits",
+        "misses",
+        "remote_hits",
+        "store",
+    )
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        expires_in: int = 60,
+        local_expires_in: int = 5,
+        local_max_size: int = 1024,
+        store: Store | None = None,
+        channel: InvalidationChannel | None = None,
+    ) -> None:
+        self._local: LocalCache[Principal] = LocalCache(max_size=local_max_size, expires_in=local_expires_in)
+        self._generation = 0
+        self.enabled = enabled
+        self.expires_in = expires_in
+        self.store = store
+        self.channel = channel
+        self.local_hits = 0
+        self.remote_hits = 0
+        self.misses = 0
+
+    @property
+    def stats(self) -> dict[str, int]:
+        """Hit and miss counters for this worker."""
+        return {
+            "local_hits": self.local_hits,
+            "remote_hits": self.remote_hits,
+            "misses": self.misses,
+            "local_size": len(self._local),
+        }
+
+    @property
+    def _local_enabled(self) -> bool:
+        return self.channel is None or self.channel.subscribed
+
+    async def start(self) -> None:
+        """Subscribe to the invalidations of the other workers in the background."""
+        if self.channel is not None:
+            await self.channel.start(self._receive, self._clear)
+
+    async def stop(self) -> None:
+        """Unsubscribe from the invalidations of the other workers and drop the LRU."""
+        if self.channel is not None:
+            await self.channel.stop()
+        self._clear()
+
+    def _clear(self) -> None:
+        self._generation += 1
+        self._local.clear()
+
+    def _receive(self, user_ids: list[str]) -> None:
+        self._drop_local({UUID(user_id) for user_id in user_ids})
+
+    def _drop_local(self, user_ids: set[UUID]) -> None:
+        self._generation += 1
+        self._local.delete_where(lambda principal: principal.id in user_ids)
+
+    async def get(self, email: str) -> m.User | None:
+        """Get the cached user for an email.
+
+        Args:
+            email: The token subject.
+
+        Returns:
+            A detached user rebuilt from the snapshot, or ``None`` on a miss.
+        """
+        if not self.enabled:
+            return None
+        principal = self._local.get(email) if self._local_enabled else None
+        if principal is not None:
+            self.local_hits += 1
+            return principal.to_model()
+        if self.store is not None:
+            try:
+                raw = await self.store.get(email)
+            except RedisError:
+                await logger.awarning("Unable to read from the principal cache", exc_info=True)
+                raw = None
+            if raw is not None:
+                try:
+                    principal = _decoder.decode(raw)
+                except msgspec.DecodeError:
+                    principal = None
+            if principal is not None:
+                self.remote_hits += 1
+                if self._local_enabled:
+                    self._local.set(email, principal)
+                return principal.to_model()
+        self.misses += 1
+        return None
+
+    async def generation(self) -> tuple[int, bytes | None]:
+        """Read the current generation, to pass to :meth:`set` along with a user loaded after this call."""
+        remote = None
+        if self.enabled and self.store is not None:
+            try:
+                remote = await self.store.get(_GENERATION_KEY)
+            except RedisError:
+                await logger.awarning("Unable to read from the principal cache", exc_info=True)
+        return self._generation, remote
+
+    async def set(self, user: m.User, generation: tuple[int, bytes | None]) -> None:
+        """Cache a user loaded with its roles and teams, unless it was invalidated since ``generation`` was read."""
+        if not self.enabled or generation[0] != self._generation:
+            return
+        principal = Principal.from_model(user)
+        if self.store is not None:
+            try:
+                await self.store.set(principal.email, _encoder.encode(principal), expires_in=self.expires_in)
+                await self.store.set(f"id:{principal.id}", principal.email, expires_in=self.expires_in)
+                # an invalidation replaces the generation before deleting, so it either sees this write or changed
+                # the generation before this check
+                if await self.store.get(_GENERATION_KEY) != generation[1]:
+                    await self.store.delete(principal.email)
+                    await self.store.delete(f"id:{principal.id}")
+                    return
+            except RedisError:
+                await logger.awarning("Unable to write to the principal cache", exc_info=True)
+                return
+        if generation[0] == self._generation and self._local_enabled:
+            self._local.set(principal.email, principal)
+
+    async def invalidate(self, *user_ids: UUID) -> None:
+        """Drop the cached principals for the given users, on every worker."""
+        ids = set(user_ids)
+        self._drop_local(ids)
+        if self.store is not None:
+            try:
+                await self.store.set(_GENERATION_KEY, uuid4().hex)
+                for user_id in ids:
+                    email = await self.store.get(f"id:{user_id}")
+                    if email is not None:
+                        await self.store.delete(email.decode())
+                    await self.store.delete(f"id:{user_id}")
+            except RedisError:
+                await logger.awarning("Unable to invalidate the principal cache", exc_info=True)
+        if self.channel is not None:
+            await self.channel.publish([str(user_id) for user_id in ids])
+
+
+settings = get_settings()
+principal_cache = PrincipalCache(
+    enabled=settings.cache.PRINCIPAL_ENABLED,
+    expires_in=settings.cache.PRINCIPAL_EXPIRATION,
+    local_expires_in=settings.cache.PRINCIPAL_LOCAL_EXPIRATION,
+    local_max_size=settings.cache.PRINCIPAL_LOCAL_MAX_SIZE,
+)
+"""Principal cache for this worker. The store is attached by the application plugin."""
+
+
+@invalidation.on_commit(m.User, key=attrgetter("id"))
+@invalidation.on_commit(m.UserRole, key=attrgetter("user_id"))
+@invalidation.on_commit(m.TeamMember, key=attrgetter("user_id"))
+async def invalidate_principals(user_ids: set[UUID]) -> None:
+    """Drop cached principals after users, their roles or their team memberships change."""
+    await principal_cache.invalidate(*user_ids)
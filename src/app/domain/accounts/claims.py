@@ -0,0 +1,195 @@
+"""Signed authorization claims embedded in access tokens.
+
+When ``JWT_CLAIMS_ENABLED`` is set, the login endpoint embeds the user's account flags, system roles and team
+memberships in the token. Route handlers marked with the :data:`~app.config.constants.CLAIMS_ONLY` option then
+authorize from the token alone, without loading the user.
+
+Every token records the user's token version at login. The version is kept in Redis and bumped whenever the account,
+its roles or its team memberships are committed, which revokes all of the user's tokens carrying claims. Versions start
+from a random value, and tokens whose user has no version are rejected, so that a version lost with its Redis key
+cannot be issued again and revive revoked tokens.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import secrets
+from operator import attrgetter
+from typing import TYPE_CHECKING, Any
+from uuid import UUID  # noqa: TC003
+
+import msgspec
+import structlog
+from redis import RedisError
+from sqlalchemy import inspect
+
+from app.config.base import get_settings
+from app.db import models as m
+from app.domain.accounts.permissions import Permissions, TeamPermission, get_permissions, set_permissions
+from app.lib import invalidation
+
+if TYPE_CHECKING:
+    from litestar.security.jwt import Token
+    from redis.asyncio import Redis
+
+__all__ = ("CLAIMS_LAYOUT", "Claims", "TokenVersions", "token_versions")
+
+logger = structlog.get_logger()
+
+CLAIMS_LAYOUT = 1
+"""Layout version of :class:`Claims`. Tokens carrying another layout are handled as tokens without claims."""
+
+_TOKEN_EXTRAS_KEY = "claims"  # noqa: S105
+_REVOKING_ATTRIBUTES = ("email", "hashed_password", "is_active", "is_superuser", "is_verified")
+_BUMP_ATTEMPTS = 3
+_BUMP_RETRY_DELAY = 0.5
+"""Seconds to wait before retrying a failed revocation, doubled on each attempt."""
+
+
+class Claims(msgspec.Struct, frozen=True):
+    """Authorization claims of a user at the time the token was issued."""
+
+    id: UUID
+    token_version: int
+    is_active: bool
+    is_superuser: bool
+    is_verified: bool
+    roles: frozenset[str] = frozenset()
+    teams: dict[UUID, TeamPermission] = msgspec.field(default_factory=dict)
+    layout: int = CLAIMS_LAYOUT
+    """Layout version of this structure, checked before decoding."""
+
+    @classmethod
+    def from_model(cls, user: m.User, token_version: int) -> Claims:
+        permissions = get_permissions(user)
+        return cls(
+            id=user.id,
+            token_version=token_version,
+            is_active=user.is_active,
+            is_superuser=user.is_superuser,
+            is_verified=user.is_verified,
+            roles=permissions.roles,
+            teams=permissions.teams,
+        )
+
+    @classmethod
+    def from_token(cls, token: Token) -> Claims | None:
+        """Read the claims of a token, or ``None`` if it has none in the current layout."""
+        raw = token.extras.get(_TOKEN_EXTRAS_KEY)
+        if not isinstance(raw, dict) or raw.get("layout") != CLAIMS_LAYOUT:
+            return None
+        try:
+            return msgspec.convert(raw, cls)
+        except msgspec.ValidationError:
+            return None
+
+    def to_token_extras(self) -> dict[str, Any]:
+        return {_TOKEN_EXTRAS_KEY: msgspec.to_builtins(self)}
+
+    def to_model(self, email: str) -> m.User:
+        """Build a transient user with its permission snapshot attached.
+
+        Only the account flags are populated; ``roles`` and ``teams`` are empty. Authorization must go through
+        :func:`~app.domain.accounts.permissions.get_permissions`.
+        """
+        user = m.User(
+            id=self.id,
+            email=email,
+            is_active=self.is_active,
+            is_superuser=self.is_superuser,
+            is_verified=self.is_verified,
+        )
+        set_permissions(user, Permissions(is_superuser=self.is_superuser, roles=self.roles, teams=self.teams))
+        return user
+
+
+class TokenVersions:
+    """Per-user token version counters, stored in Redis without expiration."""
+
+    __slots__ = ("namespace", "redis")
+
+    def __init__(self, redis: Redis | None = None, namespace: str = "token-versions") -> None:
+        self.redis = redis
+        self.namespace = namespace
+
+    def _key(self, user_id: UUID) -> str:
+        return f"{self.namespace}:{user_id}"
+
+    def _client(self) -> Redis:
+        if self.redis is None:
+            msg = "Token versions are not attached to Redis"
+            raise RedisError(msg)
+        return self.redis
+
+    async def get(self, user_id: UUID) -> int | None:
+        """Get the current token version of a user.
+
+        Returns:
+            The version, or ``None`` if the user has none, in which case no token of the user is valid.
+
+        Raises:
+            RedisError: If the version cannot be read.
+        """
+        value = await self._client().get(self._key(user_id))
+        return int(value) if value is not None else None
+
+    async def issue(self, user_id: UUID) -> int | None:
+        """Get the token version to embed in a new token of a user, starting a new sequence if the user has none.
+
+        Returns:
+            The version, or ``None`` if it cannot be read, in which case the token must not carry claims.
+        """
+        key = self._key(user_id)
+        try:
+            async with self._client().pipeline(transaction=True) as pipe:
+                pipe.set(key, secrets.randbits(62), nx=True)
+                pipe.get(key)
+                _, value = await pipe.execute()
+        except RedisError:
+            await logger.awarning("Unable to read token version", exc_info=True)
+            return None
+        return int(value)
+
+    async def bump(self, *user_ids: UUID) -> None:
+        """Revoke the tokens issued so far to the given users.
+
+        Failures are retried, then logged: the tokens stay valid until they expire.
+        """
+        if self.redis is None or not user_ids:
+            return
+        for attempt in range(_BUMP_ATTEMPTS):
+            try:
+                async with self.redis.pipeline(transaction=False) as pipe:
+                    for user_id in user_ids:
+                        pipe.incr(self._key(user_id))
+                    await pipe.execute()
+            except RedisError:
+                if attempt + 1 == _BUMP_ATTEMPTS:
+                    await logger.aerror("Unable to revoke tokens", user_ids=user_ids, exc_info=True)
+                    return
+                await asyncio.sleep(_BUMP_RETRY_DELAY * 2**attempt)
+            else:
+                return
+
+
+settings = get_settings()
+token_versions = TokenVersions()
+"""Token versions for this worker. The Redis client is attached by the application plugin."""
+
+
+def _revoked_user_id(user: m.User) -> UUID | None:
+    state = inspect(user)
+    if state.deleted or state.was_deleted:
+        return user.id
+    if any(state.attrs[name].history.has_changes() for name in _REVOKING_ATTRIBUTES):
+        return user.id
+    return None
+
+
+@invalidation.on_commit(m.User, key=_revoked_user_id)
+@invalidation.on_commit(m.UserRole, key=attrgetter("user_id"))
+@invalidation.on_commit(m.TeamMember, key=attrgetter("user_id"))
+async def revoke_claims(user_ids: set[UUID]) -> None:
+    """Revoke the tokens of users whose account, roles or team memberships changed."""
+    if settings.app.JWT_CLAIMS_ENABLED:
+        await token_versions.bump(*user_ids)
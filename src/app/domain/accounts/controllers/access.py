@@ -10,12 +10,16 @@ from litestar.di import Provide
 from litestar.enums import RequestEncodingType
 from litestar.params import Body
 
+from app.config import constants
+from app.config.base import get_settings
 from app.domain.accounts import urls
+from app.domain.accounts.claims import Claims, token_versions
 from app.domain.accounts.deps import provide_users_service
 from app.domain.accounts.guards import auth, requires_active_user
 from app.domain.accounts.schemas import AccountLogin, AccountRegister, User
 from app.domain.accounts.services import RoleService
 from app.lib.deps import create_service_provider
+from app.lib.replicas import read_only
 
 if TYPE_CHECKING:
     from litestar.security.jwt import OAuth2Login
@@ -23,6 +27,8 @@ if TYPE_CHECKING:
     from app.db import models as m
     from app.domain.accounts.services import UserService
 
+settings = get_settings()
+
 
 class AccessController(Controller):
     """User login and registration."""
@@ -36,11 +42,28 @@ class AccessController(Controller):
     @post(operation_id="AccountLogin", path=urls.ACCOUNT_LOGIN, exclude_from_auth=True)
     async def login(
         self,
+        request: Request,
         users_service: UserService,
         data: Annotated[AccountLogin, Body(title="OAuth2 Login", media_type=RequestEncodingType.URL_ENCODED)],
     ) -> Response[OAuth2Login]:
         """Authenticate a user."""
-        user = await users_service.authenticate(data.username, data.password)
+        token_version: int | None = None
+        if settings.app.JWT_CLAIMS_ENABLED:
+            # read before the user is loaded, so that a change committed in between revokes the token
+            with read_only(replica=False):
+                user_id = (await users_service.get_ids_by_email([data.username])).get(data.username)
+            if user_id is not None:
+                token_version = await token_versions.issue(user_id)
+        user, new_hash = await users_service.verify_credentials(data.username, data.password)
+        if new_hash is not None:
+            request.app.emit(
+                event_id="password_rehashed",
+                user_id=user.id,
+                current_hash=user.hashed_password,
+                new_hash=new_hash,
+            )
+        if token_version is not None and user.id == user_id:
+            return auth.login(user.email, token_extras=Claims.from_model(user, token_version).to_token_extras())
         return auth.login(user.email)
 
     @post(operation_id="AccountLogout", path=urls.ACCOUNT_LOGOUT, exclude_from_auth=True)
@@ -74,7 +97,14 @@ class AccessController(Controller):
         request.app.emit(event_id="user_created", user_id=user.id)
         return users_service.to_schema(user, schema_type=User)
 
-    @get(operation_id="AccountProfile", path=urls.ACCOUNT_PROFILE, guards=[requires_active_user])
+    @get(
+        operation_id="AccountProfile",
+        path=urls.ACCOUNT_PROFILE,
+        guards=[requires_active_user],
+        cache=300,
+        opt={constants.CACHE_KEY_SCOPES: ("user",), constants.CACHE_TAGS: ("user:{user}", "team", "role")},
+    )
     async def profile(self, current_user: m.User, users_service: UserService) -> User:
         """User Profile."""
-        return users_service.to_schema(current_user, schema_type=User)
+        db_obj = await users_service.get(current_user.id)
+        return users_service.to_schema(db_obj, schema_type=User)
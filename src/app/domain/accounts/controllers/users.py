@@ -9,11 +9,13 @@ from litestar import Controller, delete, get, patch, post
 from litestar.di import Provide
 from litestar.params import Dependency, Parameter
 
+from app.config import constants
 from app.domain.accounts import urls
 from app.domain.accounts.deps import provide_users_service
 from app.domain.accounts.guards import requires_superuser
 from app.domain.accounts.schemas import User, UserCreate, UserUpdate
 from app.lib.deps import create_filter_dependencies
+from app.lib.pagination import CursorPagination, paginate
 
 if TYPE_CHECKING:
     from advanced_alchemy.filters import FilterTypes
@@ -34,6 +36,8 @@ class UserController(Controller):
             "id_filter": UUID,
             "search": "name,email",
             "pagination_type": "limit_offset",
+            "cursor_pagination": True,
+            "count_strategy": "estimated",
             "pagination_size": 20,
             "created_at": True,
             "updated_at": True,
@@ -42,17 +46,26 @@ class UserController(Controller):
         },
     )
 
-    @get(operation_id="ListUsers", path=urls.ACCOUNT_LIST, cache=60)
+    @get(
+        operation_id="ListUsers",
+        path=urls.ACCOUNT_LIST,
+        cache=300,
+        opt={constants.CACHE_TAGS: ("user", "team", "role")},
+    )
     async def list_users(
         self,
         users_service: UserService,
         filters: Annotated[list[FilterTypes], Dependency(skip_validation=True)],
-    ) -> OffsetPagination[User]:
+    ) -> OffsetPagination[User] | CursorPagination[User]:
         """List users."""
-        results, total = await users_service.list_and_count(*filters)
-        return users_service.to_schema(data=results, total=total, schema_type=User, filters=filters)
+        return await paginate(users_service, *filters, schema_type=User)
 
-    @get(operation_id="GetUser", path=urls.ACCOUNT_DETAIL)
+    @get(
+        operation_id="GetUser",
+        path=urls.ACCOUNT_DETAIL,
+        cache=300,
+        opt={constants.CACHE_TAGS: ("user:{user_id}", "team", "role")},
+    )
     async def get_user(
         self,
         users_service: UserService,
@@ -9,9 +9,11 @@ from sqlalchemy.orm import joinedload, load_only, selectinload
 from app.db import models as m
 from app.domain.accounts.services import UserService
 from app.lib.deps import create_service_provider
+from app.lib.warmup import pool_warmup
 
 if TYPE_CHECKING:
     from litestar import Request
+    from sqlalchemy.ext.asyncio import AsyncSession
 
 # create a hard reference to this since it's used oven
 provide_users_service = create_service_provider(
@@ -27,6 +29,13 @@ provide_users_service = create_service_provider(
 )
 
 
+@pool_warmup.query
+async def warm_up_user_lookup(db_session: AsyncSession) -> None:
+    """Run the lookup of the principal by email of :func:`~app.domain.accounts.guards.current_user_from_token`."""
+    service = await anext(provide_users_service(db_session))
+    await service.get_one_or_none(email="")
+
+
 async def provide_user(request: Request[m.User, Any, Any]) -> m.User:
     """Get the user from the request.
 
@@ -1,29 +1,52 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Any
+from typing import TYPE_CHECKING, Any, Self
 
+import structlog
 from litestar.exceptions import PermissionDeniedException
-from litestar.security.jwt import OAuth2PasswordBearerAuth
+from litestar.security.jwt import OAuth2PasswordBearerAuth, Token
+from redis import RedisError
 
 from app.config import constants
 from app.config.app import alchemy
 from app.config.base import get_settings
 from app.db import models as m
 from app.domain.accounts import urls
+from app.domain.accounts.cache import principal_cache
+from app.domain.accounts.claims import Claims, token_versions
 from app.domain.accounts.deps import provide_users_service
+from app.lib.replicas import is_read_only_request, read_only
+from app.lib.timing import phase, timed
 
 if TYPE_CHECKING:
     from litestar.connection import ASGIConnection
     from litestar.handlers.base import BaseRouteHandler
-    from litestar.security.jwt import Token
 
 
-__all__ = ("auth", "current_user_from_token", "requires_active_user", "requires_superuser", "requires_verified_user")
+__all__ = (
+    "TimedToken",
+    "auth",
+    "current_user_from_token",
+    "requires_active_user",
+    "requires_superuser",
+    "requires_verified_user",
+)
 
+logger = structlog.get_logger()
 
 settings = get_settings()
 
 
+class TimedToken(Token):
+    """JWT token timing its decoding as the ``jwt`` phase, see :mod:`app.lib.timing`."""
+
+    @classmethod
+    def decode(cls, *args: Any, **kwargs: Any) -> Self:
+        with phase("jwt"):
+            return super().decode(*args, **kwargs)
+
+
+@timed("guards")
 def requires_active_user(connection: ASGIConnection, _: BaseRouteHandler) -> None:
     """Request requires active user.
 
@@ -42,6 +65,7 @@ def requires_active_user(connection: ASGIConnection, _: BaseRouteHandler) -> Non
     raise PermissionDeniedException(msg)
 
 
+@timed("guards")
 def requires_superuser(connection: ASGIConnection[m.User, Any, Any, Any], _: BaseRouteHandler) -> None:
     """Request requires active superuser.
 
@@ -60,6 +84,7 @@ def requires_superuser(connection: ASGIConnection[m.User, Any, Any, Any], _: Bas
     raise PermissionDeniedException(detail="Insufficient privileges")
 
 
+@timed("guards")
 def requires_verified_user(connection: ASGIConnection[m.User, Any, Any, Any], _: BaseRouteHandler) -> None:
     """Verify the connection user is a superuser.
 
@@ -78,10 +103,15 @@ def requires_verified_user(connection: ASGIConnection[m.User, Any, Any, Any], _:
     raise PermissionDeniedException(detail="User account is not verified.")
 
 
+@timed("principal")
 async def current_user_from_token(token: Token, connection: ASGIConnection[Any, Any, Any, Any]) -> m.User | None:
     """Lookup current user from local JWT token.
 
-    Fetches the user information from the database
+    Fetches the user information from the principal cache, falling back to the database on a miss.
+
+    Tokens carrying claims are rejected once revoked, or when their user has no token version. On route handlers
+    marked ``claims_only``, the user is built from the claims instead of being loaded, and the token is rejected when
+    its version cannot be checked.
 
 
     Args:
@@ -92,8 +122,29 @@ async def current_user_from_token(token: Token, connection: ASGIConnection[Any,
     Returns:
         User: User record mapped to the JWT identifier
     """
-    service = await anext(provide_users_service(alchemy.provide_session(connection.app.state, connection.scope)))
-    user = await service.get_one_or_none(email=token.sub)
+    if settings.app.JWT_CLAIMS_ENABLED and (claims := Claims.from_token(token)) is not None:
+        claims_only = connection.route_handler.opt.get(constants.CLAIMS_ONLY)
+        try:
+            token_version = await token_versions.get(claims.id)
+        except RedisError:
+            await logger.awarning("Unable to read token version", exc_info=True)
+            # the claims may have been revoked: only a user loaded from the database can be trusted
+            if claims_only:
+                return None
+        else:
+            if token_version != claims.token_version:
+                return None
+            if claims_only:
+                return claims.to_model(email=token.sub) if claims.is_active else None
+    user = await principal_cache.get(token.sub)
+    if user is None:
+        generation = await principal_cache.generation()
+        service = await anext(provide_users_service(alchemy.provide_session(connection.app.state, connection.scope)))
+        # the lookup starts the transaction of the request, before ReplicaRoutingMiddleware marks it
+        with read_only(is_read_only_request(connection.scope), replica=False):
+            user = await service.get_one_or_none(email=token.sub)
+        if user is not None:
+            await principal_cache.set(user, generation)
     return user if user and user.is_active else None
 
 
@@ -101,8 +152,10 @@ auth = OAuth2PasswordBearerAuth[m.User](
     retrieve_user_handler=current_user_from_token,
     token_secret=settings.app.SECRET_KEY,
     token_url=urls.ACCOUNT_LOGIN,
+    token_cls=TimedToken,
     exclude=[
         constants.HEALTH_ENDPOINT,
+        constants.METRICS_ENDPOINT,
         urls.ACCOUNT_LOGIN,
         urls.ACCOUNT_REGISTER,
         "^/schema",
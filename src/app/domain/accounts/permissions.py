@@ -0,0 +1,131 @@
+"""Authorization snapshot of a user.
+
+Guards and services ask the same questions on every request: is the user a superuser, do they hold a system role,
+what is their role in a given team. Answering them from the ORM relationships means scanning ``user.roles`` and
+``user.teams`` each time. :func:`get_permissions` answers them from an immutable snapshot built once per user instance.
+
+The module also registers the ``user`` and ``roles`` response cache key scopes (see :mod:`app.lib.response_cache`),
+for cached responses that vary by user or by the system roles of the user.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from typing import TYPE_CHECKING, Any, NamedTuple
+from weakref import WeakKeyDictionary
+
+import msgspec
+from sqlalchemy import event
+
+from app.config import constants
+from app.db import models as m
+from app.lib.response_cache import cache_key_scope
+
+if TYPE_CHECKING:
+    from uuid import UUID
+
+    from litestar import Request
+
+__all__ = ("Permissions", "TeamPermission", "get_permissions", "set_permissions")
+
+
+class TeamPermission(NamedTuple):
+    role: m.TeamRoles
+    is_owner: bool
+
+
+class Permissions(msgspec.Struct, frozen=True):
+    """System roles and team memberships of a user."""
+
+    is_superuser: bool = False
+    roles: frozenset[str] = frozenset()
+    """Names of the system roles assigned to the user."""
+    teams: dict[UUID, TeamPermission] = msgspec.field(default_factory=dict)
+    """Team role and ownership, by team ID."""
+
+    @classmethod
+    def from_model(cls, user: m.User) -> Permissions:
+        """Build a snapshot from a user loaded with its roles and teams."""
+        return cls(
+            is_superuser=user.is_superuser,
+            roles=frozenset(assigned_role.role.name for assigned_role in user.roles),
+            teams={
+                membership.team_id: TeamPermission(membership.role, membership.is_owner) for membership in user.teams
+            },
+        )
+
+    @property
+    def has_superuser_access(self) -> bool:
+        """The user is a superuser, or holds the superuser system role."""
+        return self.is_superuser or constants.SUPERUSER_ACCESS_ROLE in self.roles
+
+    def has_role(self, role_name: str) -> bool:
+        return role_name in self.roles
+
+    def is_team_member(self, team_id: UUID) -> bool:
+        return team_id in self.teams
+
+    def is_team_admin(self, team_id: UUID) -> bool:
+        membership = self.teams.get(team_id)
+        return membership is not None and membership.role == m.TeamRoles.ADMIN
+
+    def is_team_owner(self, team_id: UUID) -> bool:
+        membership = self.teams.get(team_id)
+        return membership is not None and membership.is_owner
+
+
+_permissions: WeakKeyDictionary[m.User, Permissions] = WeakKeyDictionary()
+
+
+def get_permissions(user: m.User) -> Permissions:
+    """Get the permission snapshot of a user, building it on first use.
+
+    The snapshot is kept for the lifetime of the user instance, which is a single request for the authenticated user.
+    It is dropped, and built again on next use, when the superuser flag, the roles or the team memberships of that
+    instance change, as does the role or ownership of one of its loaded memberships.
+    """
+    permissions = _permissions.get(user)
+    if permissions is None:
+        permissions = _permissions[user] = Permissions.from_model(user)
+    return permissions
+
+
+def set_permissions(user: m.User, permissions: Permissions) -> None:
+    """Attach a precomputed permission snapshot to a user instance."""
+    _permissions[user] = permissions
+
+
+def _drop_user_permissions(user: m.User, *_: Any) -> None:
+    _permissions.pop(user, None)
+
+
+def _drop_member_permissions(assignment: m.UserRole | m.TeamMember, *_: Any) -> None:
+    # only a loaded user can have a snapshot, and reading the attribute would load it
+    if (user := assignment.__dict__.get("user")) is not None:
+        _permissions.pop(user, None)
+
+
+for _collection in (m.User.roles, m.User.teams):
+    for _identifier in ("append", "remove", "bulk_replace"):
+        event.listen(_collection, _identifier, _drop_user_permissions)
+event.listen(m.User.is_superuser, "set", _drop_user_permissions)
+for _attribute in (m.UserRole.role, m.TeamMember.role, m.TeamMember.is_owner):
+    event.listen(_attribute, "set", _drop_member_permissions)
+
+
+@cache_key_scope("user")
+def _user_scope(request: Request[m.User, Any, Any]) -> str:
+    """The principal id, or ``anonymous``."""
+    user = request.scope.get("user")
+    return "anonymous" if user is None else str(user.id)
+
+
+@cache_key_scope("roles")
+def _roles_scope(request: Request[m.User, Any, Any]) -> str:
+    """A hash of the superuser flag and the system roles of the principal, shared by users holding the same roles."""
+    user = request.scope.get("user")
+    if user is None:
+        return "anonymous"
+    permissions = get_permissions(user)
+    roles = "\n".join(sorted(permissions.roles))
+    return hashlib.sha256(f"{permissions.is_superuser}\n{roles}".encode()).hexdigest()[:16]
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from datetime import UTC, datetime
-from typing import Any
+from typing import TYPE_CHECKING, Any
 from uuid import UUID  # noqa: TC003
 
 from advanced_alchemy.repository import (
@@ -17,10 +17,17 @@ from advanced_alchemy.service import (
     schema_dump,
 )
 from litestar.exceptions import PermissionDeniedException
+from sqlalchemy import select, update
 
 from app.config import constants
 from app.db import models as m
+from app.domain.accounts.permissions import get_permissions
 from app.lib import crypt
+from app.lib.replicas import read_only
+from app.lib.response_cache import tag_writes
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
 
 
 class UserService(SQLAlchemyAsyncRepositoryService[m.User]):
@@ -46,20 +53,55 @@ class UserService(SQLAlchemyAsyncRepositoryService[m.User]):
 
     async def authenticate(self, username: str, password: bytes | str) -> m.User:
         """Authenticate a user against the stored hashed password."""
-        db_obj = await self.get_one_or_none(email=username)
+        db_obj, _ = await self.verify_credentials(username, password)
+        return db_obj
+
+    async def verify_credentials(self, username: str, password: bytes | str) -> tuple[m.User, str | None]:
+        """Authenticate a user and compute a replacement hash if the stored one uses outdated parameters.
+
+        The lookup is read-only, so that SQLite does not hold the write lock while the password is verified, and reads
+        from the primary, so that a password change applies at once.
+
+        Returns:
+            The user, and the new password hash to persist with :meth:`update_password_hash`, if any.
+        """
+        with read_only(replica=False):
+            db_obj = await self.get_one_or_none(email=username)
         if db_obj is None:
             msg = "User not found or password invalid"
             raise PermissionDeniedException(detail=msg)
         if db_obj.hashed_password is None:
             msg = "User not found or password invalid."
             raise PermissionDeniedException(detail=msg)
-        if not await crypt.verify_password(password, db_obj.hashed_password):
+        valid, new_hash = await crypt.verify_and_update_password(password, db_obj.hashed_password)
+        if not valid:
             msg = "User not found or password invalid"
             raise PermissionDeniedException(detail=msg)
         if not db_obj.is_active:
             msg = "User account is inactive"
             raise PermissionDeniedException(detail=msg)
-        return db_obj
+        return db_obj, new_hash
+
+    async def update_password_hash(
+        self,
+        user_id: UUID,
+        current_hash: str,
+        new_hash: str,
+        auto_commit: bool = False,
+    ) -> bool:
+        """Replace a password hash with an equivalent one, unless the password changed in the meantime.
+
+        Returns:
+            ``True`` if the hash was replaced.
+        """
+        result = await self.repository.session.execute(
+            update(m.User)
+            .where(m.User.id == user_id, m.User.hashed_password == current_hash)
+            .values(hashed_password=new_hash),
+        )
+        if auto_commit:
+            await self.repository.session.commit()
+        return bool(result.rowcount)
 
     async def update_password(self, data: dict[str, Any], db_obj: m.User) -> None:
         """Modify stored user password."""
@@ -75,6 +117,17 @@ class UserService(SQLAlchemyAsyncRepositoryService[m.User]):
         db_obj.hashed_password = await crypt.get_password_hash(data["new_password"])
         await self.repository.update(db_obj)
 
+    async def get_ids_by_email(self, emails: Iterable[str]) -> dict[str, UUID]:
+        """Look up user IDs by email in one query, without loading the users.
+
+        Returns:
+            The ID of each email that belongs to a user.
+        """
+        result = await self.repository.session.execute(
+            select(m.User.email, m.User.id).where(m.User.email.in_(set(emails))),
+        )
+        return dict(result.tuples().all())
+
     @staticmethod
     async def has_role_id(db_obj: m.User, role_id: UUID) -> bool:
         """Return true if user has specified role ID"""
@@ -83,14 +136,11 @@ class UserService(SQLAlchemyAsyncRepositoryService[m.User]):
     @staticmethod
     async def has_role(db_obj: m.User, role_name: str) -> bool:
         """Return true if user has specified role ID"""
-        return any(assigned_role.role_id for assigned_role in db_obj.roles if assigned_role.role_name == role_name)
+        return get_permissions(db_obj).has_role(role_name)
 
     @staticmethod
     def is_superuser(user: m.User) -> bool:
-        return bool(
-            user.is_superuser
-            or any(assigned_role.role.name for assigned_role in user.roles if assigned_role.role.name in {"Superuser"}),
-        )
+        return get_permissions(user).has_superuser_access
 
     async def _populate_model(self, data: ModelDictT[m.User]) -> ModelDictT[m.User]:
         data = schema_dump(data)
@@ -153,3 +203,10 @@ class UserOAuthAccountService(SQLAlchemyAsyncRepositoryService[m.UserOauthAccoun
         model_type = m.UserOauthAccount
 
     repository_type = Repository
+
+
+# cached responses embedding users, their roles or role details
+tag_writes(m.User, "user", "user:{id}")
+tag_writes(m.UserRole, "user", "user:{user_id}")
+tag_writes(m.Role, "role", "role:{id}")
+tag_writes(m.UserOauthAccount, "user:{user_id}")
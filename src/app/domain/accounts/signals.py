@@ -32,3 +32,18 @@ async def user_created_event_handler(
             await logger.aerror("Could not locate the specified user", id=user_id)
         else:
             await logger.ainfo("Found user", **obj.to_dict(exclude={"hashed_password"}))
+
+
+@listener("password_rehashed")
+async def password_rehashed_event_handler(user_id: UUID, current_hash: str, new_hash: str) -> None:
+    """Executes after a login verified a password stored with outdated hashing parameters.
+
+    Args:
+        user_id: The primary key of the user that logged in.
+        current_hash: The hash that was verified.
+        new_hash: The replacement hash computed with the current parameters.
+    """
+    async with alchemy.get_session() as db_session:
+        service = await anext(provide_users_service(db_session))
+        if await service.update_password_hash(user_id, current_hash, new_hash, auto_commit=True):
+            await logger.ainfo("Upgraded password hash", id=user_id)
@@ -1,24 +1,20 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Literal, TypeVar
+from typing import TYPE_CHECKING
 
-import structlog
-from litestar import Controller, MediaType, Request, get
+from litestar import Controller, MediaType, get
 from litestar.response import Response
-from redis import RedisError
-from sqlalchemy import text
+from litestar.status_codes import HTTP_200_OK, HTTP_500_INTERNAL_SERVER_ERROR, HTTP_503_SERVICE_UNAVAILABLE
 
-from app.config.base import get_settings
+from app.lib import metrics
+from app.lib.health import readiness
 
-from .schemas import SystemHealth
-from .urls import SYSTEM_HEALTH
+from .guards import requires_metrics_token
+from .schemas import SystemHealth, SystemLiveness, SystemReadiness
+from .urls import SYSTEM_HEALTH, SYSTEM_HEALTH_LIVE, SYSTEM_HEALTH_READY, SYSTEM_METRICS
 
 if TYPE_CHECKING:
     from litestar_saq import TaskQueues
-    from sqlalchemy.ext.asyncio import AsyncSession
-
-logger = structlog.get_logger()
-OnlineOffline = TypeVar("OnlineOffline", bound=Literal["online", "offline"])
 
 
 class SystemController(Controller):
@@ -34,42 +30,65 @@ class SystemController(Controller):
         summary="Health Check",
         description="Execute a health check against backend components.  Returns system information including database and cache status.",
     )
-    async def check_system_health(
-        self,
-        request: Request,
-        db_session: AsyncSession,
-        task_queues: TaskQueues,
-    ) -> Response[SystemHealth]:
-        """Check database available and returns app config info."""
-        settings = get_settings()
-        try:
-            await db_session.execute(text("select 1"))
-            db_ping = True
-        except ConnectionRefusedError:
-            db_ping = False
+    async def check_system_health(self) -> Response[SystemHealth]:
+        """Report the database and cache status from the readiness checks."""
+        report = await readiness.report()
+        db_status = report.checks["database"].status
+        cache_status = report.checks["cache"].status
+        return Response(
+            content=SystemHealth(database_status=db_status, cache_status=cache_status),
+            status_code=HTTP_200_OK if report.ready else HTTP_500_INTERNAL_SERVER_ERROR,
+            media_type=MediaType.JSON,
+        )
 
-        db_status = "online" if db_ping else "offline"
-        try:
-            cache_ping = await settings.redis.get_client().ping()
-        except RedisError:
-            cache_ping = False
-        cache_status = "online" if cache_ping else "offline"
-        healthy = cache_ping and db_ping
-        if healthy:
-            await logger.adebug(
-                "System Health",
-                database_status=db_status,
-                cache_status=cache_status,
-            )
-        else:
-            await logger.awarn(
-                "System Health Check",
-                database_status=db_status,
-                cache_status=cache_status,
-            )
+    @get(
+        operation_id="SystemLiveness",
+        name="system:health:live",
+        path=SYSTEM_HEALTH_LIVE,
+        media_type=MediaType.JSON,
+        cache=False,
+        summary="Liveness Probe",
+        description="Answer as long as the worker runs, without checking any backend component.",
+    )
+    async def check_liveness(self) -> SystemLiveness:
+        """Answer without any I/O."""
+        return SystemLiveness()
 
+    @get(
+        operation_id="SystemReadiness",
+        name="system:health:ready",
+        path=SYSTEM_HEALTH_READY,
+        media_type=MediaType.JSON,
+        cache=False,
+        summary="Readiness Probe",
+        description="Check the backend components concurrently, with a timeout each. The outcome is reused for a few "
+        "seconds. Answers 503 when a critical component is unavailable.",
+    )
+    async def check_readiness(self) -> Response[SystemReadiness]:
+        """Report the outcome of the readiness checks, including the pool saturation and the worker heartbeats."""
+        report = await readiness.report()
         return Response(
-            content=SystemHealth(database_status=db_status, cache_status=cache_status),  # type: ignore
-            status_code=200 if db_ping and cache_ping else 500,
+            content=SystemReadiness(ready=report.ready, checks=report.checks),
+            status_code=HTTP_200_OK if report.ready else HTTP_503_SERVICE_UNAVAILABLE,
             media_type=MediaType.JSON,
         )
+
+
+class MetricsController(Controller):
+    tags = ["System"]
+
+    @get(
+        operation_id="SystemMetrics",
+        name="system:metrics",
+        path=SYSTEM_METRICS,
+        guards=[requires_metrics_token],
+        cache=False,
+        include_in_schema=False,
+        summary="Metrics",
+        description="Metrics of every worker in the Prometheus text exposition format. Requires the bearer token set "
+        "in ``METRICS_TOKEN``.",
+    )
+    async def get_metrics(self, task_queues: TaskQueues) -> Response[str]:
+        """Render the metrics aggregated across workers, and the depth of the job queues."""
+        samples = await metrics.queue_samples(task_queues.queues.values())
+        return Response(content=await metrics.registry.render(samples), media_type=metrics.CONTENT_TYPE)
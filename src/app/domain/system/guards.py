@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+import secrets
+from typing import TYPE_CHECKING
+
+from litestar.exceptions import NotAuthorizedException
+
+from app.config.base import get_settings
+
+if TYPE_CHECKING:
+    from litestar.connection import ASGIConnection
+    from litestar.handlers.base import BaseRouteHandler
+
+__all__ = ("requires_metrics_token",)
+
+
+def requires_metrics_token(connection: ASGIConnection, _: BaseRouteHandler) -> None:
+    """Request requires the bearer token of the metrics scrapers.
+
+    The metrics endpoint is excluded from the authentication of users, so that scrapers do not need an account.
+
+    Args:
+        connection (ASGIConnection): HTTP Request
+        _ (BaseRouteHandler): Route handler
+
+    Raises:
+        NotAuthorizedException: The token is missing, wrong, or not configured.
+    """
+    expected = get_settings().metrics.TOKEN
+    scheme, _separator, token = connection.headers.get("Authorization", "").partition(" ")
+    if expected and scheme.lower() == "bearer" and secrets.compare_digest(token.encode(), expected.encode()):
+        return
+    raise NotAuthorizedException(detail="Invalid metrics token", headers={"WWW-Authenticate": "Bearer"})
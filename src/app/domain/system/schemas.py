@@ -3,8 +3,9 @@ from typing import Literal
 
 from app.__about__ import __version__ as current_version
 from app.config.base import get_settings
+from app.lib.health import CheckResult
 
-__all__ = ("SystemHealth",)
+__all__ = ("SystemHealth", "SystemLiveness", "SystemReadiness")
 
 settings = get_settings()
 
@@ -15,3 +16,18 @@ class SystemHealth:
     cache_status: Literal["online", "offline"]
     app: str = settings.app.NAME
     version: str = current_version
+
+
+@dataclass
+class SystemLiveness:
+    status: Literal["alive"] = "alive"
+    app: str = settings.app.NAME
+    version: str = current_version
+
+
+@dataclass
+class SystemReadiness:
+    ready: bool
+    checks: dict[str, CheckResult]
+    app: str = settings.app.NAME
+    version: str = current_version
@@ -3,10 +3,15 @@ import asyncio
 from saq.types import Context
 from structlog import get_logger
 
-__all__ = ["background_worker_task", "system_task", "system_upkeep"]
+from app.config import constants
+from app.config.base import get_settings
+from app.lib import metrics
+
+__all__ = ["background_worker_task", "record_job_metrics", "system_task", "system_upkeep"]
 
 
 logger = get_logger()
+settings = get_settings()
 
 
 async def system_upkeep(_: Context) -> None:
@@ -29,3 +34,19 @@ async def system_task(_: Context) -> None:
     await logger.ainfo("Performing simple system task")
     await asyncio.sleep(2)
     await logger.ainfo("System task complete.")
+
+
+async def record_job_metrics(ctx: Context) -> None:
+    """Record the duration and status of the job, see :mod:`app.lib.metrics`.
+
+    Workers run in their own process, where the metrics registry is not attached to Redis, so the job is flushed at
+    once with the client of its queue.
+    """
+    job = ctx.get("job")
+    if job is None or not settings.metrics.ENABLED:
+        return
+    metrics.observe_job(job)
+    await metrics.registry.flush(
+        ctx["worker"].queue.redis,  # type: ignore[attr-defined]
+        namespace=f"{settings.app.slug}:{constants.METRICS_NAMESPACE}",
+    )
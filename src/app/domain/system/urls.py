@@ -1,2 +1,8 @@
 SYSTEM_HEALTH: str = "/health"
 """Default path for the service health check endpoint."""
+SYSTEM_HEALTH_LIVE: str = "/health/live"
+"""Path of the liveness probe."""
+SYSTEM_HEALTH_READY: str = "/health/ready"
+"""Path of the readiness probe."""
+SYSTEM_METRICS: str = "/metrics"
+"""Default path for the Prometheus metrics endpoint."""
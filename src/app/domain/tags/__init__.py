@@ -1,3 +1,3 @@
-from . import controllers, services, urls
+from . import controllers, schemas, services, urls
 
-__all__ = ["controllers", "services", "urls"]
+__all__ = ["controllers", "schemas", "services", "urls"]
@@ -6,11 +6,14 @@ from uuid import UUID
 from advanced_alchemy.extensions.litestar.dto import SQLAlchemyDTO
 from litestar import Controller, delete, get, patch, post
 
+from app.config import constants
 from app.db import models as m
 from app.domain.accounts.guards import requires_active_user, requires_superuser
+from app.domain.tags.schemas import Tag
 from app.domain.tags.services import TagService
 from app.lib import dto
 from app.lib.deps import create_service_dependencies
+from app.lib.pagination import CursorPagination, paginate
 
 from . import urls
 
@@ -50,6 +53,9 @@ class TagController(Controller):
             "id_filter": UUID,
             "created_at": True,
             "updated_at": True,
+            "pagination_type": "limit_offset",
+            "cursor_pagination": True,
+            "count_strategy": "cached",
             "sort_field": "name",
             "search": "name,slug",
         },
@@ -57,17 +63,30 @@ class TagController(Controller):
     tags = ["Tags"]
     return_dto = TagDTO
 
-    @get(operation_id="ListTags", path=urls.TAG_LIST)
+    @get(
+        operation_id="ListTags",
+        path=urls.TAG_LIST,
+        return_dto=None,
+        cache=300,
+        opt={constants.CLAIMS_ONLY: True, constants.CACHE_TAGS: ("tag",)},
+    )
     async def list_tags(
         self,
         tags_service: TagService,
         filters: Annotated[list[FilterTypes], Dependency(skip_validation=True)],
-    ) -> OffsetPagination[m.Tag]:
-        """List tags."""
-        results, total = await tags_service.list_and_count(*filters)
-        return tags_service.to_schema(data=results, total=total, filters=filters)
-
-    @get(operation_id="GetTag", path=urls.TAG_DETAILS)
+    ) -> OffsetPagination[Tag] | CursorPagination[Tag]:
+        """List tags.
+
+        Pages come in two shapes, which the DTO cannot encode, so the list is converted to a schema instead.
+        """
+        return await paginate(tags_service, *filters, schema_type=Tag)
+
+    @get(
+        operation_id="GetTag",
+        path=urls.TAG_DETAILS,
+        cache=300,
+        opt={constants.CLAIMS_ONLY: True, constants.CACHE_TAGS: ("tag:{tag_id}",)},
+    )
     async def get_tag(
         self,
         tags_service: TagService,
@@ -0,0 +1,16 @@
+from __future__ import annotations
+
+from uuid import UUID  # noqa: TC003
+
+from app.lib.schema import CamelizedBaseStruct
+
+__all__ = ("Tag",)
+
+
+class Tag(CamelizedBaseStruct):
+    """A tag, as listed by :class:`~app.domain.tags.controllers.TagController`."""
+
+    id: UUID
+    slug: str
+    name: str
+    description: str | None = None
@@ -1,9 +1,21 @@
 from __future__ import annotations
 
+from typing import TYPE_CHECKING
+
 from advanced_alchemy.repository import SQLAlchemyAsyncRepository
 from advanced_alchemy.service import SQLAlchemyAsyncRepositoryService
+from advanced_alchemy.utils.text import slugify
+from sqlalchemy import insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from uuid_utils.compat import uuid4
 
 from app.db import models as m
+from app.lib.response_cache import tag_writes
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from sqlalchemy import Insert
 
 __all__ = ("TagService",)
 
@@ -18,3 +30,38 @@ class TagService(SQLAlchemyAsyncRepositoryService[m.Tag]):
 
     repository_type = Repository
     match_fields = ["name"]
+
+    async def get_or_create_many(self, names: Iterable[str]) -> list[m.Tag]:
+        """Resolve tag names to tags, creating the missing ones.
+
+        Names are matched on their slug. Existing tags are fetched with a single ``IN`` query and the missing ones are
+        inserted in one statement that skips slugs created concurrently.
+
+        Args:
+            names: Tag names. Names with the same slug resolve to the same tag.
+
+        Returns:
+            One tag per distinct slug, in the order the names were given.
+        """
+        wanted: dict[str, str] = {}
+        for name in names:
+            wanted.setdefault(slugify(name), name)
+        if not wanted:
+            return []
+        session = self.repository.session
+        found = {tag.slug: tag for tag in await session.scalars(select(m.Tag).where(m.Tag.slug.in_(wanted)))}
+        missing = [{"id": uuid4(), "name": wanted[slug], "slug": slug} for slug in wanted.keys() - found.keys()]
+        if missing:
+            statement: Insert = insert(m.Tag)
+            dialect_name = session.get_bind().dialect.name
+            if dialect_name == "postgresql":
+                statement = postgresql.insert(m.Tag).on_conflict_do_nothing(index_elements=[m.Tag.slug])
+            elif dialect_name == "sqlite":
+                statement = sqlite.insert(m.Tag).on_conflict_do_nothing(index_elements=[m.Tag.slug])
+            await session.execute(statement, missing)
+            created = select(m.Tag).where(m.Tag.slug.in_([row["slug"] for row in missing]))
+            found.update((tag.slug, tag) for tag in await session.scalars(created))
+        return [found[slug] for slug in wanted]
+
+
+tag_writes(m.Tag, "tag", "tag:{id}")
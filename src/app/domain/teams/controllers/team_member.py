@@ -4,7 +4,7 @@ from __future__ import annotations
 
 from typing import TYPE_CHECKING
 
-from advanced_alchemy.exceptions import IntegrityError
+from advanced_alchemy.exceptions import IntegrityError, NotFoundError
 from litestar import Controller, post
 from litestar.di import Provide
 from litestar.params import Parameter
@@ -13,7 +13,16 @@ from sqlalchemy.orm import contains_eager, selectinload
 from app.db import models as m
 from app.domain.accounts.deps import provide_users_service
 from app.domain.teams import urls
-from app.domain.teams.schemas import Team, TeamMemberModify
+from app.domain.teams.guards import requires_team_admin
+from app.domain.teams.schemas import (
+    Team,
+    TeamMemberChange,
+    TeamMemberChangeStatus,
+    TeamMemberModify,
+    TeamMembersAdd,
+    TeamMembersChanged,
+    TeamMembersRemove,
+)
 from app.domain.teams.services import TeamMemberService, TeamService
 from app.lib.deps import create_service_provider
 
@@ -79,3 +88,66 @@ class TeamMemberController(Controller):
             raise IntegrityError(msg)
         team_obj = await teams_service.get(team_id)
         return teams_service.to_schema(schema_type=Team, data=team_obj)
+
+    @post(operation_id="AddMembersToTeam", path=urls.TEAM_ADD_MEMBERS, guards=[requires_team_admin])
+    async def add_members_to_team(
+        self,
+        teams_service: TeamService,
+        team_members_service: TeamMemberService,
+        users_service: UserService,
+        data: TeamMembersAdd,
+        team_id: UUID = Parameter(title="Team ID", description="The team to update."),
+    ) -> TeamMembersChanged:
+        """Add members to a team.
+
+        Users are resolved in one query and memberships inserted in one statement. Users that are already members
+        keep their current role.
+        """
+        if not await teams_service.exists(id=team_id):
+            msg = "No team found."
+            raise NotFoundError(msg)
+        roles = {member.user_name: member.role for member in data.members}
+        user_ids = await users_service.get_ids_by_email(roles)
+        added = await team_members_service.add_many(
+            team_id,
+            {user_ids[email]: role for email, role in roles.items() if email in user_ids},
+            auto_commit=True,
+        )
+        results = []
+        for email in roles:
+            if email not in user_ids:
+                status = TeamMemberChangeStatus.NOT_FOUND
+            elif user_ids[email] in added:
+                status = TeamMemberChangeStatus.ADDED
+            else:
+                status = TeamMemberChangeStatus.ALREADY_MEMBER
+            results.append(TeamMemberChange(user_name=email, status=status))
+        return TeamMembersChanged(results=results)
+
+    @post(operation_id="RemoveMembersFromTeam", path=urls.TEAM_REMOVE_MEMBERS, guards=[requires_team_admin])
+    async def remove_members_from_team(
+        self,
+        team_members_service: TeamMemberService,
+        users_service: UserService,
+        data: TeamMembersRemove,
+        team_id: UUID = Parameter(title="Team ID", description="The team to update."),
+    ) -> TeamMembersChanged:
+        """Revoke members access to a team.
+
+        Memberships are deleted in one statement. The team owner cannot be removed.
+        """
+        emails = list(dict.fromkeys(data.user_names))
+        user_ids = await users_service.get_ids_by_email(emails)
+        removed, owners = await team_members_service.remove_many(team_id, set(user_ids.values()), auto_commit=True)
+        results = []
+        for email in emails:
+            if email not in user_ids:
+                status = TeamMemberChangeStatus.NOT_FOUND
+            elif user_ids[email] in removed:
+                status = TeamMemberChangeStatus.REMOVED
+            elif user_ids[email] in owners:
+                status = TeamMemberChangeStatus.OWNER
+            else:
+                status = TeamMemberChangeStatus.NOT_MEMBER
+            results.append(TeamMemberChange(user_name=email, status=status))
+        return TeamMembersChanged(results=results)
@@ -3,12 +3,14 @@
 from __future__ import annotations
 
 from typing import TYPE_CHECKING, Annotated
-from uuid import UUID
+from uuid import UUID, uuid4
 
+from advanced_alchemy.filters import LimitOffset, OrderBy
 from advanced_alchemy.service import FilterTypeT  # noqa: TC002
 from litestar import Controller, delete, get, patch, post
 from sqlalchemy import select
 
+from app.config import constants
 from app.db import models as m
 from app.db.models.team_member import TeamMember as TeamMemberModel
 from app.domain.accounts.guards import requires_active_user
@@ -16,11 +18,20 @@ from app.domain.teams import urls
 from app.domain.teams.guards import requires_team_admin, requires_team_membership
 from app.domain.teams.schemas import Team, TeamCreate, TeamUpdate
 from app.domain.teams.services import TeamService
+from app.lib.counts import count_rows
 from app.lib.deps import create_service_dependencies
+from app.lib.pagination import CursorPagination, paginate
+from app.lib.warmup import pool_warmup
 
 if TYPE_CHECKING:
-    from advanced_alchemy.service.pagination import OffsetPagination
+    from advanced_alchemy.service import OffsetPagination
     from litestar.params import Dependency, Parameter
+    from sqlalchemy import ColumnElement
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+
+def _member_of(user_id: UUID) -> ColumnElement[bool]:
+    return m.Team.id.in_(select(TeamMemberModel.team_id).where(TeamMemberModel.user_id == user_id))
 
 
 class TeamController(Controller):
@@ -31,35 +42,55 @@ class TeamController(Controller):
         TeamService,
         key="teams_service",
         load=[m.Team.tags, m.Team.members],
-        filters={"id_filter": UUID},
+        filters={
+            "id_filter": UUID,
+            "pagination_type": "limit_offset",
+            "cursor_pagination": True,
+            "count_strategy": "cached",
+            "sort_field": "name",
+            "sort_order": "asc",
+        },
     )
 
     guards = [requires_active_user]
 
-    @get(component="team/list", operation_id="ListTeams", path=urls.TEAM_LIST)
+    @get(
+        component="team/list",
+        operation_id="ListTeams",
+        path=urls.TEAM_LIST,
+        cache=300,
+        opt={
+            constants.CLAIMS_ONLY: True,
+            constants.CACHE_KEY_SCOPES: ("user",),
+            constants.CACHE_TAGS: ("team", "user", "tag"),
+        },
+    )
     async def list_teams(
         self,
         teams_service: TeamService,
         current_user: m.User,
         filters: Annotated[list[FilterTypeT], Dependency(skip_validation=True)],
-    ) -> OffsetPagination[Team]:
+    ) -> OffsetPagination[Team] | CursorPagination[Team]:
         """List teams that your account can access.."""
         if not teams_service.can_view_all(current_user):
-            filters.append(
-                m.Team.id.in_(select(TeamMemberModel.team_id).where(TeamMemberModel.user_id == current_user.id)),  # type: ignore[arg-type]
-            )
-        results, total = await teams_service.list_and_count(*filters)
-        return teams_service.to_schema(data=results, total=total, schema_type=Team, filters=filters)
+            filters.append(_member_of(current_user.id))  # type: ignore[arg-type]
+        return await paginate(teams_service, *filters, schema_type=Team)
 
     @post(operation_id="CreateTeam", path=urls.TEAM_CREATE)
     async def create_team(self, teams_service: TeamService, current_user: m.User, data: TeamCreate) -> Team:
         """Create a new team."""
         obj = data.to_dict()
-        obj.update({"owner_id": current_user.id, "owner": current_user})
+        obj.update({"owner_id": current_user.id})
         db_obj = await teams_service.create(obj)
         return teams_service.to_schema(schema_type=Team, data=db_obj)
 
-    @get(operation_id="GetTeam", guards=[requires_team_membership], path=urls.TEAM_DETAIL)
+    @get(
+        operation_id="GetTeam",
+        guards=[requires_team_membership],
+        path=urls.TEAM_DETAIL,
+        cache=300,
+        opt={constants.CLAIMS_ONLY: True, constants.CACHE_TAGS: ("team:{team_id}", "user", "tag")},
+    )
     async def get_team(
         self,
         teams_service: TeamService,
@@ -77,9 +108,11 @@ class TeamController(Controller):
         team_id: Annotated[UUID, Parameter(title="Team ID", description="The team to update.")],
     ) -> Team:
         """Update a migration team."""
+        # refreshing would expire the merged tags
         db_obj = await teams_service.update(
             item_id=team_id,
             data=data.to_dict(),
+            auto_refresh=False,
         )
         return teams_service.to_schema(schema_type=Team, data=db_obj)
 
@@ -91,3 +124,19 @@ class TeamController(Controller):
     ) -> None:
         """Delete a team."""
         _ = await teams_service.delete(team_id)
+
+
+@pool_warmup.query
+async def warm_up_team_list(db_session: AsyncSession) -> None:
+    """Run the queries of the first page of :meth:`TeamController.list_teams` of a user who is not a superuser.
+
+    The rows are counted exactly, as on a count cache miss, so that starting up writes nothing to Redis.
+    """
+    service = await anext(TeamController.dependencies["teams_service"].dependency(db_session=db_session))
+    filters = (
+        LimitOffset(limit=constants.DEFAULT_PAGINATION_SIZE, offset=0),
+        OrderBy(field_name="name", sort_order="asc"),
+        _member_of(uuid4()),
+    )
+    await service.list(*filters)
+    await count_rows(service, *filters)
@@ -1,15 +1,14 @@
-from uuid import UUID
-
 from litestar.connection import ASGIConnection
 from litestar.exceptions import PermissionDeniedException
 from litestar.handlers.base import BaseRouteHandler
 
-from app.config import constants
-from app.db.models import TeamRoles
+from app.domain.accounts.permissions import get_permissions
+from app.lib.timing import timed
 
 __all__ = ["requires_team_admin", "requires_team_membership", "requires_team_ownership"]
 
 
+@timed("guards")
 def requires_team_membership(connection: ASGIConnection, _: BaseRouteHandler) -> None:
     """Verify the connection user is a member of the team.
 
@@ -20,18 +19,13 @@ def requires_team_membership(connection: ASGIConnection, _: BaseRouteHandler) ->
     Raises:
         PermissionDeniedException: _description_
     """
-    team_id = connection.path_params["team_id"]
-    has_system_role = any(
-        assigned_role.role_name
-        for assigned_role in connection.user.roles
-        if assigned_role.role.name in {constants.SUPERUSER_ACCESS_ROLE}
-    )
-    has_team_role = any(membership.team.id == team_id for membership in connection.user.teams)
-    if connection.user.is_superuser or has_system_role or has_team_role:
+    permissions = get_permissions(connection.user)
+    if permissions.has_superuser_access or permissions.is_team_member(connection.path_params["team_id"]):
         return
     raise PermissionDeniedException(detail="Insufficient permissions to access team.")
 
 
+@timed("guards")
 def requires_team_admin(connection: ASGIConnection, _: BaseRouteHandler) -> None:
     """Verify the connection user is a team admin.
 
@@ -42,20 +36,13 @@ def requires_team_admin(connection: ASGIConnection, _: BaseRouteHandler) -> None
     Raises:
         PermissionDeniedException: _description_
     """
-    team_id = connection.path_params["team_id"]
-    has_system_role = any(
-        assigned_role.role_name
-        for assigned_role in connection.user.roles
-        if assigned_role.role.name in {constants.SUPERUSER_ACCESS_ROLE}
-    )
-    has_team_role = any(
-        membership.team.id == team_id and membership.role == TeamRoles.ADMIN for membership in connection.user.teams
-    )
-    if connection.user.is_superuser or has_system_role or has_team_role:
+    permissions = get_permissions(connection.user)
+    if permissions.has_superuser_access or permissions.is_team_admin(connection.path_params["team_id"]):
         return
     raise PermissionDeniedException(detail="Insufficient permissions to access team.")
 
 
+@timed("guards")
 def requires_team_ownership(connection: ASGIConnection, _: BaseRouteHandler) -> None:
     """Verify that the connection user is the team owner.
 
@@ -66,14 +53,8 @@ def requires_team_ownership(connection: ASGIConnection, _: BaseRouteHandler) ->
     Raises:
         PermissionDeniedException: _description_
     """
-    team_id = UUID(connection.path_params["team_id"])
-    has_system_role = any(
-        assigned_role.role.name
-        for assigned_role in connection.user.roles
-        if assigned_role.role.name in {constants.SUPERUSER_ACCESS_ROLE}
-    )
-    has_team_role = any(membership.team.id == team_id and membership.is_owner for membership in connection.user.teams)
-    if connection.user.is_superuser or has_system_role or has_team_role:
+    permissions = get_permissions(connection.user)
+    if permissions.has_superuser_access or permissions.is_team_owner(connection.path_params["team_id"]):
         return
 
     msg = "Insufficient permissions to access team."
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+from enum import Enum
+from typing import Annotated
 from uuid import UUID  # noqa: TC003
 
 import msgspec
@@ -47,3 +49,42 @@ class TeamMemberModify(CamelizedBaseStruct):
     """Team Member Modify."""
 
     user_name: str
+
+
+class TeamMemberAdd(CamelizedBaseStruct):
+    user_name: str
+    role: TeamRoles = TeamRoles.MEMBER
+
+
+class TeamMembersAdd(CamelizedBaseStruct):
+    """Team Members Add."""
+
+    members: Annotated[list[TeamMemberAdd], msgspec.Meta(min_length=1, max_length=1000)]
+
+
+class TeamMembersRemove(CamelizedBaseStruct):
+    """Team Members Remove."""
+
+    user_names: Annotated[list[str], msgspec.Meta(min_length=1, max_length=1000)]
+
+
+class TeamMemberChangeStatus(str, Enum):
+    """Outcome of a membership change for one user."""
+
+    ADDED = "added"
+    REMOVED = "removed"
+    ALREADY_MEMBER = "already_member"
+    NOT_MEMBER = "not_member"
+    NOT_FOUND = "not_found"
+    OWNER = "owner"
+
+
+class TeamMemberChange(CamelizedBaseStruct):
+    user_name: str
+    status: TeamMemberChangeStatus
+
+
+class TeamMembersChanged(CamelizedBaseStruct):
+    """Per-user outcome of a bulk membership change."""
+
+    results: list[TeamMemberChange]
@@ -13,11 +13,15 @@ from advanced_alchemy.service import (
     is_dict_without_field,
     schema_dump,
 )
-from advanced_alchemy.utils.text import slugify
+from sqlalchemy import and_, delete, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
 from uuid_utils.compat import uuid4
 
-from app.config import constants
 from app.db import models as m
+from app.domain.accounts.permissions import get_permissions
+from app.domain.tags.services import TagService
+from app.lib import invalidation
+from app.lib.response_cache import tag_writes
 
 if TYPE_CHECKING:
     from uuid import UUID
@@ -59,14 +63,7 @@ class TeamService(SQLAlchemyAsyncRepositoryService[m.Team]):
 
     @staticmethod
     def can_view_all(user: m.User) -> bool:
-        return bool(
-            user.is_superuser
-            or any(
-                assigned_role.role.name
-                for assigned_role in user.roles
-                if assigned_role.role.name in {constants.SUPERUSER_ACCESS_ROLE}
-            ),
-        )
+        return get_permissions(user).has_superuser_access
 
     async def _populate_slug(self, data: ModelDictT[m.Team]) -> ModelDictT[m.Team]:
         if is_dict_without_field(data, "slug") and is_dict_with_field(data, "name"):
@@ -85,12 +82,7 @@ class TeamService(SQLAlchemyAsyncRepositoryService[m.Team]):
             data["id"] = data.get("id", uuid4())
             data = await super().to_model(data)
             if tags_added:
-                data.tags.extend(
-                    [
-                        await m.Tag.as_unique_async(self.repository.session, name=tag_text, slug=slugify(tag_text))
-                        for tag_text in tags_added
-                    ],
-                )
+                data.tags.extend(await self._get_or_create_tags(tags_added))
             if owner:
                 data.members.append(m.TeamMember(user=owner, role=m.TeamRoles.ADMIN, is_owner=True))
             elif owner_id:
@@ -100,21 +92,15 @@ class TeamService(SQLAlchemyAsyncRepositoryService[m.Team]):
             tags_updated = data.pop("tags", None)
             data = await super().to_model(data)
             if tags_updated:
-                existing_tags = [tag.name for tag in data.tags]
-                tags_to_remove = [tag for tag in data.tags if tag.name not in tags_updated]
-                tags_to_add = [tag for tag in tags_updated if tag not in existing_tags]
-                for tag_rm in tags_to_remove:
-                    data.tags.remove(tag_rm)
-                data.tags.extend(
-                    [
-                        await m.Tag.as_unique_async(
-                            self.repository.session, name=tag_text.name, slug=slugify(tag_text.name)
-                        )
-                        for tag_text in tags_to_add
-                    ],
+                # the merge into the persisted team diffs this collection against the stored one
+                data.tags = await self._get_or_create_tags(
+                    [tag.name if isinstance(tag, m.Tag) else tag for tag in tags_updated],
                 )
         return data
 
+    async def _get_or_create_tags(self, names: list[str]) -> list[m.Tag]:
+        return await TagService(session=self.repository.session).get_or_create_many(names)
+
 
 class TeamMemberService(SQLAlchemyAsyncRepositoryService[m.TeamMember]):
     """Team Member Service."""
@@ -126,6 +112,105 @@ class TeamMemberService(SQLAlchemyAsyncRepositoryService[m.TeamMember]):
 
     repository_type = TeamMemberRepository
 
+    async def add_many(
+        self,
+        team_id: UUID,
+        members: dict[UUID, m.TeamRoles],
+        auto_commit: bool = False,
+    ) -> set[UUID]:
+        """Add users to a team in a single statement.
+
+        Users that are already members keep their current role.
+
+        Args:
+            team_id: The team to add the users to.
+            members: Team role of each user to add, by user ID.
+            auto_commit: Commit the transaction.
+
+        Returns:
+            The IDs of the users that were added.
+        """
+        if not members:
+            return set()
+        session = self.repository.session
+        rows = [
+            {"id": uuid4(), "team_id": team_id, "user_id": user_id, "role": role, "is_owner": False}
+            for user_id, role in members.items()
+        ]
+        dialect_name = session.get_bind().dialect.name
+        if dialect_name in {"postgresql", "sqlite"}:
+            insert_factory = postgresql.insert if dialect_name == "postgresql" else sqlite.insert
+            result = await session.execute(
+                insert_factory(m.TeamMember)
+                .values(rows)
+                .on_conflict_do_nothing(index_elements=[m.TeamMember.user_id, m.TeamMember.team_id])
+                .returning(m.TeamMember.user_id),
+            )
+            added = set(result.scalars())
+        else:
+            existing = set(
+                await session.scalars(
+                    select(m.TeamMember.user_id).where(
+                        m.TeamMember.team_id == team_id,
+                        m.TeamMember.user_id.in_(members),
+                    ),
+                ),
+            )
+            rows = [row for row in rows if row["user_id"] not in existing]
+            if rows:
+                await session.execute(insert(m.TeamMember), rows)
+            added = {row["user_id"] for row in rows}
+        invalidation.record(session, (m.TeamMember(team_id=team_id, user_id=user_id) for user_id in added))
+        if auto_commit:
+            await session.commit()
+        return added
+
+    async def remove_many(
+        self,
+        team_id: UUID,
+        user_ids: set[UUID],
+        auto_commit: bool = False,
+    ) -> tuple[set[UUID], set[UUID]]:
+        """Remove users from a team in a single statement. The team owner is never removed.
+
+        Args:
+            team_id: The team to remove the users from.
+            user_ids: The users to remove.
+            auto_commit: Commit the transaction.
+
+        Returns:
+            The IDs of the users that were removed, and of the requested users that were kept as team owners.
+        """
+        if not user_ids:
+            return set(), set()
+        session = self.repository.session
+        condition = and_(
+            m.TeamMember.team_id == team_id,
+            m.TeamMember.user_id.in_(user_ids),
+            m.TeamMember.is_owner.is_(False),
+        )
+        if session.get_bind().dialect.delete_returning:
+            result = await session.execute(delete(m.TeamMember).where(condition).returning(m.TeamMember.user_id))
+            removed = set(result.scalars())
+        else:
+            removed = set(await session.scalars(select(m.TeamMember.user_id).where(condition)))
+            await session.execute(delete(m.TeamMember).where(condition))
+        owners: set[UUID] = set()
+        if len(removed) < len(user_ids):
+            owners = set(
+                await session.scalars(
+                    select(m.TeamMember.user_id).where(
+                        m.TeamMember.team_id == team_id,
+                        m.TeamMember.user_id.in_(user_ids - removed),
+                        m.TeamMember.is_owner.is_(True),
+                    ),
+                ),
+            )
+        invalidation.record(session, (m.TeamMember(team_id=team_id, user_id=user_id) for user_id in removed))
+        if auto_commit:
+            await session.commit()
+        return removed, owners
+
 
 class TeamInvitationService(SQLAlchemyAsyncRepositoryService[m.TeamInvitation]):
     """Team Invitation Service."""
@@ -136,3 +221,8 @@ class TeamInvitationService(SQLAlchemyAsyncRepositoryService[m.TeamInvitation]):
         model_type = m.TeamInvitation
 
     repository_type = TeamInvitationRepository
+
+
+# cached responses embedding teams or their members; users list their teams too
+tag_writes(m.Team, "team", "team:{id}")
+tag_writes(m.TeamMember, "team", "team:{team_id}", "user", "user:{user_id}")
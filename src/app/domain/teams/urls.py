@@ -7,3 +7,5 @@ TEAM_INDEX = "/api/teams/{team_id:uuid}"
 TEAM_INVITATION_LIST = "/api/teams/{team_id:uuid}/invitations"
 TEAM_ADD_MEMBER = "/api/teams/{team_id:uuid}/members/add"
 TEAM_REMOVE_MEMBER = "/api/teams/{team_id:uuid}/members/remove"
+TEAM_ADD_MEMBERS = "/api/teams/{team_id:uuid}/members/bulk-add"
+TEAM_REMOVE_MEMBERS = "/api/teams/{team_id:uuid}/members/bulk-remove"
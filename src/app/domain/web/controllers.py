@@ -1,8 +1,15 @@
-from litestar import Controller, get
-from litestar.response import Template
-from litestar.status_codes import HTTP_200_OK
+from litestar import Controller, Request, Response, get
+from litestar.datastructures import CacheControlHeader
+from litestar.enums import MediaType
+from litestar.status_codes import HTTP_200_OK, HTTP_304_NOT_MODIFIED
 
 from app.config import constants
+from app.config.base import get_settings
+from app.lib.assets import etag_matches
+from app.lib.shell import ShellCache
+
+settings = get_settings()
+shell = ShellCache("site/index.html.j2", preload=settings.vite.PRELOAD_ASSETS)
 
 
 class WebController(Controller):
@@ -16,7 +23,15 @@ class WebController(Controller):
         operation_id="WebIndex",
         name="frontend:index",
         status_code=HTTP_200_OK,
+        # the shell points at the fingerprinted assets of the current build, so keep it short-lived
+        cache_control=CacheControlHeader(max_age=settings.vite.HTML_MAX_AGE, must_revalidate=True),
     )
-    async def index(self, path: str | None = None) -> Template:
+    async def index(self, request: Request, path: str | None = None) -> Response[bytes]:
         """Serve site root."""
-        return Template(template_name="site/index.html.j2")
+        rendered = shell.get(request)
+        headers = {"ETag": rendered.etag}
+        if rendered.link:
+            headers["Link"] = rendered.link
+        if etag_matches(request.headers.get("if-none-match", ""), rendered.etag):
+            return Response(b"", status_code=HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(rendered.body, media_type=MediaType.HTML, headers=headers)
@@ -0,0 +1,190 @@
+"""Static assets of the Vite bundle.
+
+Vite writes the bundle with content hashes in the file names and lists them in its manifest, so a fingerprinted file
+never changes: it is served as ``immutable`` with a long lifetime, and browsers do not ask for it again. The other
+files of the bundle keep their names across builds, so they are revalidated on every use and answered with
+``304 Not Modified`` while unchanged.
+
+The bundle is indexed once, when the middleware is created: every file gets a strong ``ETag`` derived from its
+content, and its precompressed siblings, see :func:`~app.lib.compression.precompress`, are served in its place to
+clients accepting their encoding. When the server supports the ASGI path send extension, as Granian does, the server
+sends the file itself with ``sendfile`` instead of the application reading it.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import mimetypes
+from email.utils import formatdate
+from typing import TYPE_CHECKING, Any, NamedTuple, cast
+
+import anyio
+import msgspec
+from litestar.datastructures import Headers
+from litestar.enums import ScopeType
+from litestar.middleware import ASGIMiddleware
+
+from app.lib.compression import negotiate, precompressed
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+    from pathlib import Path
+
+    from litestar.types import ASGIApp, HTTPScope, Message, Receive, Scope, Send
+
+__all__ = ("StaticAssetsMiddleware", "etag_matches", "read_manifest")
+
+_CHUNK_SIZE = 64 * 1024
+"""Size of the chunks a file is read in when the server cannot send it by itself."""
+
+_PATHSEND = "http.response.pathsend"
+
+
+class _Variant(NamedTuple):
+    path: Path
+    size: int
+    etag: str
+    last_modified: str
+
+
+class _Asset(NamedTuple):
+    media_type: str
+    cache_control: str
+    variants: dict[str, _Variant]
+    """Representations of the asset by content encoding, ``identity`` being the file itself."""
+
+
+def read_manifest(path: Path) -> frozenset[str]:
+    """Read the fingerprinted files of a Vite build from its manifest.
+
+    Args:
+        path: The manifest file.
+
+    Returns:
+        The files, relative to the bundle directory. Empty when there is no manifest.
+    """
+    if not path.is_file():
+        return frozenset()
+    chunks = msgspec.json.decode(path.read_bytes(), type=dict[str, dict[str, Any]])
+    files: set[str] = set()
+    for chunk in chunks.values():
+        files.add(chunk["file"])
+        files.update(chunk.get("css", ()))
+        files.update(chunk.get("assets", ()))
+    return frozenset(files)
+
+
+def _variant(path: Path) -> _Variant:
+    with path.open("rb") as file:
+        digest = hashlib.file_digest(file, "blake2b").hexdigest()[:32]
+    stat = path.stat()
+    return _Variant(path, stat.st_size, f'"{digest}"', formatdate(stat.st_mtime, usegmt=True))
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Whether an ``If-None-Match`` request header matches an entity tag, with the weak comparison it calls for."""
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in tags or etag in tags
+
+
+class StaticAssetsMiddleware(ASGIMiddleware):
+    """Serve the files of the Vite bundle with cache validators and a lifetime fit for each of them.
+
+    Requests for files that are not in the bundle are passed on, so the static files router still answers them.
+    """
+
+    scopes = (ScopeType.HTTP,)
+
+    def __init__(
+        self,
+        path: str,
+        directory: Path,
+        manifest: Path,
+        encodings: Sequence[str],
+        max_age: int = 31536000,
+    ) -> None:
+        """Initialize ``StaticAssetsMiddleware``.
+
+        Args:
+            path: URL prefix of the static assets.
+            directory: Directory the assets are served from.
+            manifest: The Vite manifest, listing the fingerprinted files.
+            encodings: Encodings of the precompressed siblings to serve, in order of preference.
+            max_age: Lifetime in seconds of the fingerprinted files.
+        """
+        self.path = path.rstrip("/") + "/"
+        self.encodings = tuple(encodings)
+        self._index: dict[str, _Asset] = {}
+        if not directory.is_dir():
+            return
+        fingerprinted = read_manifest(manifest)
+        files = {path for path in directory.rglob("*") if path.is_file()}
+        siblings = {path: precompressed(path) for path in files}
+        files.difference_update(sibling for found in siblings.values() for sibling in found.values())
+        for file in files:
+            name = file.relative_to(directory).as_posix()
+            media_type = mimetypes.guess_type(file.name)[0] or "application/octet-stream"
+            self._index[name] = _Asset(
+                media_type=f"{media_type}; charset=utf-8" if media_type.startswith("text/") else media_type,
+                cache_control=f"public, max-age={max_age}, immutable" if name in fingerprinted else "no-cache",
+                variants={
+                    "identity": _variant(file),
+                    **{
+                        encoding: _variant(siblings[file][encoding])
+                        for encoding in self.encodings
+                        if encoding in siblings[file]
+                    },
+                },
+            )
+
+    async def handle(self, scope: Scope, receive: Receive, send: Send, next_app: ASGIApp) -> None:
+        scope = cast("HTTPScope", scope)
+        path = scope["path"]
+        asset = (
+            self._index.get(path[len(self.path) :])
+            if path.startswith(self.path) and scope["method"] in {"GET", "HEAD"}
+            else None
+        )
+        if asset is None:
+            await next_app(scope, receive, send)
+            return
+        request_headers = Headers.from_scope(scope)
+        encoding = negotiate(
+            request_headers.get("accept-encoding", ""),
+            [encoding for encoding in self.encodings if encoding in asset.variants],
+        )
+        encoding = encoding or "identity"
+        variant = asset.variants[encoding]
+        headers = [
+            (b"cache-control", asset.cache_control.encode()),
+            (b"etag", variant.etag.encode()),
+            (b"last-modified", variant.last_modified.encode()),
+        ]
+        if len(asset.variants) > 1:
+            headers.append((b"vary", b"Accept-Encoding"))
+        if etag_matches(request_headers.get("if-none-match", ""), variant.etag):
+            await send({"type": "http.response.start", "status": 304, "headers": headers})
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+        headers.extend(
+            (
+                (b"content-type", asset.media_type.encode()),
+                (b"content-length", str(variant.size).encode()),
+            ),
+        )
+        if encoding != "identity":
+            headers.append((b"content-encoding", encoding.encode()))
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        if scope["method"] == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        elif _PATHSEND in (scope.get("extensions") or {}):
+            await send(cast("Message", {"type": _PATHSEND, "path": str(variant.path)}))
+        else:
+            await _send_file(variant.path, send)
+
+
+async def _send_file(path: Path, send: Send) -> None:
+    async with await anyio.open_file(path, "rb") as file:
+        while chunk := await file.read(_CHUNK_SIZE):
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+    await send({"type": "http.response.body", "body": b"", "more_body": False})
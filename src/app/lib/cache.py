@@ -0,0 +1,72 @@
+"""In-process caching helpers."""
+
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Generic, TypeVar
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+__all__ = ("LocalCache",)
+
+T = TypeVar("T")
+
+
+class LocalCache(Generic[T]):
+    """A bounded, per-worker LRU cache with a time to live on every entry.
+
+    Entries are evicted in least recently used order once ``max_size`` is reached, and are treated as missing once
+    they are older than ``expires_in`` seconds. Nothing here is shared between workers.
+    """
+
+    __slots__ = ("_data", "expires_in", "max_size")
+
+    def __init__(self, max_size: int = 1024, expires_in: float = 5) -> None:
+        """Initialize ``LocalCache``.
+
+        Args:
+            max_size: Maximum number of entries to keep.
+            expires_in: Default time to live, in seconds, of each entry.
+        """
+        self._data: OrderedDict[str, tuple[float, T]] = OrderedDict()
+        self.max_size = max_size
+        self.expires_in = expires_in
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: str) -> T | None:
+        """Get a value, or ``None`` if it is missing or expired."""
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: T, expires_in: float | None = None) -> None:
+        """Set a value, evicting the least recently used entry when full."""
+        if self.max_size <= 0:
+            return
+        self._data[key] = (time.monotonic() + (self.expires_in if expires_in is None else expires_in), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        """Remove a value if present."""
+        self._data.pop(key, None)
+
+    def delete_where(self, predicate: Callable[[T], bool]) -> None:
+        """Remove every value matching ``predicate``."""
+        for key in [key for key, (_, value) in self._data.items() if predicate(value)]:
+            del self._data[key]
+
+    def clear(self) -> None:
+        """Remove all values."""
+        self._data.clear()
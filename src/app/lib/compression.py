@@ -0,0 +1,257 @@
+"""Response compression with content negotiation.
+
+Responses are compressed with the first encoding of the server's preference order that the client accepts, among
+brotli (``br``), zstandard (``zstd``) and gzip. Brotli and zstandard are only offered when the ``brotli`` and
+``zstandard`` packages of the ``compression`` extra are installed. Small bodies, responses already carrying a
+``Content-Encoding`` and media types that are already compressed, such as images, are sent as they are.
+
+Static assets do not have to be compressed on every request: :func:`precompress` writes ``.br``, ``.zst`` and ``.gz``
+siblings next to each file of a directory at build time, and :class:`~app.lib.assets.StaticAssetsMiddleware` serves
+the sibling matching the client's ``Accept-Encoding`` instead of the original file.
+"""
+
+from __future__ import annotations
+
+import gzip
+import mimetypes
+import zlib
+from typing import TYPE_CHECKING, NamedTuple
+
+from litestar.datastructures import Headers, MutableScopeHeaders
+from litestar.enums import ScopeType
+from litestar.middleware import ASGIMiddleware
+
+from app.lib.timing import phase
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable, Sequence
+    from pathlib import Path
+
+    from litestar.types import ASGIApp, HTTPResponseStartEvent, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+__all__ = (
+    "CompressionMiddleware",
+    "available_encodings",
+    "compress",
+    "negotiate",
+    "precompress",
+    "precompressed",
+)
+
+
+class _Compressor(NamedTuple):
+    compress: Callable[[bytes], bytes]
+    flush: Callable[[], bytes]
+
+
+class _Codec(NamedTuple):
+    stream: Callable[[], _Compressor]
+    """Create a streaming compressor tuned for speed."""
+    compress: Callable[[bytes], bytes]
+    """Compress a whole file with the best ratio."""
+
+
+def _gzip_stream() -> _Compressor:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    return _Compressor(compressor.compress, compressor.flush)
+
+
+_suffixes = {"br": ".br", "zstd": ".zst", "gzip": ".gz"}
+"""File name suffix of the precompressed siblings of each encoding."""
+
+_codecs: dict[str, _Codec] = {
+    "gzip": _Codec(_gzip_stream, lambda data: gzip.compress(data, compresslevel=9, mtime=0)),
+}
+if brotli is not None:
+
+    def _brotli_stream() -> _Compressor:
+        compressor = brotli.Compressor(quality=4)
+        return _Compressor(compressor.process, compressor.finish)
+
+    _codecs["br"] = _Codec(_brotli_stream, lambda data: brotli.compress(data, quality=11))
+if zstandard is not None:
+
+    def _zstd_stream() -> _Compressor:
+        compressor = zstandard.ZstdCompressor(level=3).compressobj()
+        return _Compressor(compressor.compress, compressor.flush)
+
+    _codecs["zstd"] = _Codec(_zstd_stream, zstandard.ZstdCompressor(level=19).compress)
+
+
+def available_encodings(preferred: Iterable[str]) -> tuple[str, ...]:
+    """Filter encodings, in order of preference, down to those that can be produced here."""
+    return tuple(encoding for encoding in preferred if encoding in _codecs)
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    """Compress a whole body with ``encoding``, tuned for speed as the responses compressed on the fly."""
+    compressor = _codecs[encoding].stream()
+    return compressor.compress(data) + compressor.flush()
+
+
+def negotiate(accept_encoding: str, encodings: Sequence[str]) -> str | None:
+    """Pick the first of ``encodings`` accepted by the client.
+
+    Args:
+        accept_encoding: The ``Accept-Encoding`` request header.
+        encodings: Encodings in order of preference.
+
+    Returns:
+        The encoding, or ``None`` when the client accepts none of them.
+    """
+    accepted: dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[name.strip().lower()] = quality
+    wildcard = accepted.get("*", 0.0)
+    return next((encoding for encoding in encodings if accepted.get(encoding, wildcard) > 0), None)
+
+
+class CompressionMiddleware(ASGIMiddleware):
+    """Compress response bodies with the negotiated encoding."""
+
+    scopes = (ScopeType.HTTP,)
+
+    def __init__(
+        self,
+        encodings: Sequence[str],
+        minimum_size: int = 500,
+        excluded_media_types: Sequence[str] = (),
+    ) -> None:
+        """Initialize ``CompressionMiddleware``.
+
+        Args:
+            encodings: Encodings in order of preference. Those that cannot be produced here are ignored.
+            minimum_size: Bodies smaller than this many bytes are not compressed.
+            excluded_media_types: Media types, or prefixes such as ``image/``, sent without compression.
+        """
+        self.encodings = available_encodings(encodings)
+        self.minimum_size = minimum_size
+        self.excluded_media_types = tuple(excluded_media_types)
+
+    def _compressible(self, headers: MutableScopeHeaders) -> bool:
+        if "content-encoding" in headers:
+            return False
+        media_type = headers.get("content-type", "").partition(";")[0].strip().lower()
+        return not media_type.startswith(self.excluded_media_types)
+
+    async def handle(self, scope: Scope, receive: Receive, send: Send, next_app: ASGIApp) -> None:
+        encoding = negotiate(Headers.from_scope(scope).get("accept-encoding", ""), self.encodings)
+        if encoding is None:
+            await next_app(scope, receive, send)
+            return
+        start: HTTPResponseStartEvent | None = None
+        compressor: _Compressor | None = None
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start, compressor
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] != "http.response.body" or start is None:
+                await send(message)
+                return
+            if compressor is not None:
+                with phase("compress"):
+                    body = compressor.compress(message["body"])
+                    if not message.get("more_body"):
+                        body += compressor.flush()
+                await send({**message, "body": body})
+                return
+            initial, start = start, None
+            headers = MutableScopeHeaders(initial)
+            more_body = message.get("more_body", False)
+            if not self._compressible(headers) or (not more_body and len(message["body"]) < self.minimum_size):
+                await send(initial)
+                await send(message)
+                return
+            with phase("compress"):
+                compressor = _codecs[encoding].stream()
+                body = compressor.compress(message["body"])
+                if not more_body:
+                    body += compressor.flush()
+            if not more_body:
+                headers["Content-Length"] = str(len(body))
+            else:
+                del headers["Content-Length"]
+            headers["Content-Encoding"] = encoding
+            headers.extend_header_value("Vary", "Accept-Encoding")
+            await send(initial)
+            await send({**message, "body": body})
+
+        await next_app(scope, receive, send_wrapper)
+
+
+def precompress(
+    directory: Path,
+    encodings: Iterable[str],
+    minimum_size: int = 500,
+    excluded_media_types: Sequence[str] = (),
+) -> int:
+    """Write a compressed sibling of every file in ``directory``, such as ``app.js.br`` next to ``app.js``.
+
+    Siblings that are up to date are kept, and no sibling is written when compression does not make the file smaller.
+
+    Args:
+        directory: The directory to walk.
+        encodings: Encodings to produce. Those that cannot be produced here are skipped.
+        minimum_size: Files smaller than this many bytes are skipped.
+        excluded_media_types: Media types, or prefixes such as ``image/``, to skip.
+
+    Returns:
+        The number of siblings written.
+    """
+    encodings = available_encodings(encodings)
+    suffixes = tuple(_suffixes.values())
+    excluded = tuple(excluded_media_types)
+    written = 0
+    for path in sorted(directory.rglob("*")):
+        if not path.is_file() or path.name.endswith(suffixes):
+            continue
+        media_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+        stat = path.stat()
+        if stat.st_size < minimum_size or media_type.startswith(excluded):
+            continue
+        data: bytes | None = None
+        for encoding in encodings:
+            sibling = path.with_name(path.name + _suffixes[encoding])
+            if sibling.exists() and sibling.stat().st_mtime >= stat.st_mtime:
+                continue
+            data = path.read_bytes() if data is None else data
+            compressed = _codecs[encoding].compress(data)
+            if len(compressed) < len(data):
+                sibling.write_bytes(compressed)
+                written += 1
+            else:
+                sibling.unlink(missing_ok=True)
+    return written
+
+
+def precompressed(path: Path) -> dict[str, Path]:
+    """Find the precompressed siblings of a file, written by :func:`precompress`.
+
+    Siblings are found whether or not their encoding can be produced here, since serving them needs no codec.
+
+    Returns:
+        The siblings by encoding.
+    """
+    siblings = {encoding: path.with_name(path.name + suffix) for encoding, suffix in _suffixes.items()}
+    return {encoding: sibling for encoding, sibling in siblings.items() if sibling.is_file()}
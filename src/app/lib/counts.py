@@ -0,0 +1,223 @@
+"""Row counts for paginated lists.
+
+An exact ``COUNT(*)`` reads every matching row, which dominates the cost of listing a large table. Each paginated
+controller picks a count strategy through the ``count_strategy`` key of its filter configuration:
+
+``exact``
+    Count the rows on every request.
+``estimated``
+    Ask the PostgreSQL planner: ``pg_class.reltuples`` for an unfiltered list, the ``EXPLAIN`` row estimate
+    otherwise. Other dialects count exactly.
+``cached``
+    Count exactly, and keep the result in Redis keyed by the filtered statement. Every committed write to a table the
+    statement reads bumps that table's generation, which retires the cached counts built from it.
+
+The strategy that actually produced a total is reported alongside it, since ``estimated`` and ``cached`` fall back to
+an exact count when they cannot answer.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from typing import TYPE_CHECKING, Any, Literal
+
+import msgspec
+import structlog
+from advanced_alchemy.filters import OrderBy, PaginationFilter, StatementFilter
+from redis import RedisError
+from sqlalchemy import ClauseElement, Executable, bindparam, select, text
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import class_mapper
+from sqlalchemy.sql.util import find_tables
+
+from app.lib import invalidation
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from advanced_alchemy.service import SQLAlchemyAsyncRepositoryService
+    from redis.asyncio import Redis
+    from sqlalchemy import Select
+    from sqlalchemy.ext.asyncio import AsyncSession
+    from sqlalchemy.sql.compiler import SQLCompiler
+
+__all__ = ("CountCache", "CountStrategy", "count_cache", "count_rows", "track_writes")
+
+logger = structlog.get_logger()
+
+CountStrategy = Literal["exact", "estimated", "cached"]
+
+_RELTUPLES = text("SELECT reltuples FROM pg_class WHERE oid = CAST(:table_name AS regclass)").bindparams(
+    bindparam("table_name"),
+)
+
+
+class _Explain(Executable, ClauseElement):
+    """``EXPLAIN (FORMAT JSON)`` of a select, with its parameters bound as usual."""
+
+    inherit_cache = False
+
+    def __init__(self, statement: Select[Any]) -> None:
+        self.statement = statement
+
+
+@compiles(_Explain, "postgresql")
+def _compile_explain(element: _Explain, compiler: SQLCompiler, **kwargs: Any) -> str:
+    explained = compiler.process(element.statement, **kwargs)
+    # the plan is the only column returned, do not read it as the columns of the statement
+    compiler._result_columns = []
+    return f"EXPLAIN (FORMAT JSON) {explained}"
+
+
+def _filtered(model: type[Any], filters: Iterable[Any]) -> Select[Any]:
+    """Select the primary key of the rows matched by ``filters``, ignoring ordering and pagination."""
+    statement = select(*class_mapper(model).primary_key)
+    for statement_filter in filters:
+        if isinstance(statement_filter, PaginationFilter | OrderBy):
+            continue
+        if isinstance(statement_filter, StatementFilter):
+            statement = statement_filter.append_to_statement(statement, model)
+        else:
+            statement = statement.where(statement_filter)
+    return statement
+
+
+async def _estimate(session: AsyncSession, model: type[Any], statement: Select[Any]) -> int | None:
+    if session.bind.dialect.name != "postgresql":
+        return None
+    if statement.whereclause is None:
+        reltuples = await session.scalar(_RELTUPLES, {"table_name": model.__table__.fullname})
+        if reltuples is not None and reltuples >= 0:
+            return round(float(reltuples))
+    plan = await session.scalar(_Explain(statement))
+    if isinstance(plan, str | bytes):
+        plan = msgspec.json.decode(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+class CountCache:
+    """Exact counts cached in Redis, invalidated per table through generation counters.
+
+    Redis errors are logged and treated as a miss.
+    """
+
+    __slots__ = ("expires_in", "hits", "misses", "namespace", "redis")
+
+    def __init__(self, redis: Redis | None = None, namespace: str = "counts", expires_in: int = 300) -> None:
+        self.redis = redis
+        self.namespace = namespace
+        self.expires_in = expires_in
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def stats(self) -> dict[str, int]:
+        """Hit and miss counters for this worker."""
+        return {"hits": self.hits, "misses": self.misses}
+
+    def _generation_key(self, table_name: str) -> str:
+        return f"{self.namespace}:generation:{table_name}"
+
+    async def _key(self, statement: Select[Any]) -> str | None:
+        if self.redis is None:
+            return None
+        tables = sorted({table.name for table in find_tables(statement)})
+        compiled = statement.compile()
+        digest = hashlib.sha256(f"{compiled}{sorted(compiled.params.items())!r}".encode()).hexdigest()
+        generations = await self.redis.mget([self._generation_key(name) for name in tables])
+        return f"{self.namespace}:{digest}:{':'.join(g.decode() if g else '0' for g in generations)}"
+
+    async def get(self, statement: Select[Any]) -> tuple[str | None, int | None]:
+        """Get the cached count of a statement.
+
+        Returns:
+            The cache key for the current table generations, or ``None`` when the cache is unavailable, and the
+            cached count, or ``None`` on a miss.
+        """
+        try:
+            key = await self._key(statement)
+            value = await self.redis.get(key) if self.redis is not None and key is not None else None
+        except RedisError:
+            await logger.awarning("Unable to read from the count cache", exc_info=True)
+            return None, None
+        if value is None:
+            self.misses += 1
+            return key, None
+        self.hits += 1
+        return key, int(value)
+
+    async def set(self, key: str, count: int) -> None:
+        if self.redis is None:
+            return
+        try:
+            await self.redis.set(key, count, ex=self.expires_in)
+        except RedisError:
+            await logger.awarning("Unable to write to the count cache", exc_info=True)
+
+    async def invalidate(self, table_names: Iterable[str]) -> None:
+        """Retire the counts that read any of the given tables."""
+        table_names = set(table_names)
+        if self.redis is None or not table_names:
+            return
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for table_name in table_names:
+                    pipe.incr(self._generation_key(table_name))
+                await pipe.execute()
+        except RedisError:
+            await logger.awarning("Unable to invalidate the count cache", exc_info=True)
+
+
+count_cache = CountCache()
+"""Count cache for this worker. The Redis client is attached by the application plugin."""
+
+
+async def count_rows(
+    service: SQLAlchemyAsyncRepositoryService[Any],
+    *filters: Any,
+    strategy: CountStrategy = "exact",
+) -> tuple[int, CountStrategy]:
+    """Count the rows matched by ``filters`` with the given strategy.
+
+    Args:
+        service: The service listing the rows.
+        *filters: Route filters and column criteria. Pagination and ordering filters are ignored.
+        strategy: How to count.
+
+    Returns:
+        The total, and the strategy that produced it.
+    """
+    model = service.repository.model_type
+    if strategy == "estimated":
+        estimate = await _estimate(service.repository.session, model, _filtered(model, filters))
+        if estimate is not None:
+            return estimate, "estimated"
+    elif strategy == "cached":
+        key, cached = await count_cache.get(_filtered(model, filters))
+        if cached is not None:
+            return cached, "cached"
+        total = await service.count(*_without_pagination(filters))
+        if key is not None:
+            await count_cache.set(key, total)
+            return total, "cached"
+        return total, "exact"
+    return await service.count(*_without_pagination(filters)), "exact"
+
+
+def _without_pagination(filters: Iterable[Any]) -> list[Any]:
+    return [f for f in filters if not isinstance(f, PaginationFilter)]
+
+
+def _table_name(instance: Any) -> str:
+    return str(instance.__table__.name)
+
+
+_tracked: set[type[Any]] = set()
+
+
+def track_writes(models: Iterable[type[Any]]) -> None:
+    """Invalidate cached counts when instances of ``models`` are committed. Models already tracked are skipped."""
+    for model in models:
+        if model not in _tracked:
+            _tracked.add(model)
+            invalidation.on_commit(model, key=_table_name)(count_cache.invalidate)
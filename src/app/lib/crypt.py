@@ -2,12 +2,196 @@ from __future__ import annotations  # noqa: A005
 
 import asyncio
 import base64
+import multiprocessing
+import time
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Literal, TypeVar
 
 from passlib.context import CryptContext
 
+from app.lib.exceptions import ServiceUnavailableError
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from concurrent.futures import Executor
+
+T = TypeVar("T")
+
 password_crypt_context = CryptContext(schemes=["argon2"], deprecated="auto")
 
 
+def configure_password_context(memory_cost: int, time_cost: int, parallelism: int) -> None:
+    """Set the argon2 parameters used for new hashes.
+
+    Stored hashes using other parameters keep verifying, and are reported as needing an update so they can be
+    replaced on the next successful login. Call this before :meth:`PasswordHasher.start` so pool workers inherit it.
+    """
+    password_crypt_context.update(
+        argon2__memory_cost=memory_cost,
+        argon2__time_cost=time_cost,
+        argon2__parallelism=parallelism,
+    )
+
+
+def password_needs_update(hashed_password: str) -> bool:
+    """Return ``True`` if a stored hash does not use the current scheme and parameters."""
+    return bool(password_crypt_context.needs_update(hashed_password))
+
+
+def _load_policy(policy: str) -> None:
+    password_crypt_context.load(policy)
+
+
+def _hash(password: str | bytes) -> str:
+    hashed: str = password_crypt_context.hash(password)
+    return hashed
+
+
+def _warm_up() -> None:
+    """Loaded by reference in each worker, so the hashing modules are imported before the first request."""
+
+
+def _verify_and_update(password: str | bytes, hashed_password: str) -> tuple[bool, str | None]:
+    valid, new_hash = password_crypt_context.verify_and_update(password, hashed_password)
+    return bool(valid), new_hash
+
+
+class PasswordHasher:
+    """Runs password hashing and verification on a dedicated, bounded pool.
+
+    Argon2 is deliberately slow and memory hungry. Running it on the event loop's default executor lets a burst of
+    logins starve every other ``run_in_executor`` user, and lets the queue grow without limit. Operations beyond
+    ``max_pending`` (queued and running) are rejected with :class:`ServiceUnavailableError` instead.
+
+    The pool is created by :meth:`start` and released by :meth:`shutdown`, which the application plugin registers as
+    lifespan hooks. Until then (CLI commands, tests), work runs on the loop's default executor.
+    """
+
+    __slots__ = (
+        "_executor",
+        "backend",
+        "completed",
+        "max_pending",
+        "max_seconds",
+        "max_workers",
+        "pending",
+        "rejected",
+        "total_seconds",
+    )
+
+    def __init__(
+        self,
+        backend: Literal["process", "thread"] = "process",
+        max_workers: int = 2,
+        max_pending: int = 32,
+    ) -> None:
+        """Initialize ``PasswordHasher``.
+
+        Args:
+            backend: ``process`` for a process pool (falling back to threads where unavailable), or ``thread``.
+            max_workers: Number of workers in the pool.
+            max_pending: Maximum number of queued and running operations.
+        """
+        self._executor: Executor | None = None
+        self.backend = backend
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self.rejected = 0
+        self.completed = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def configure(self, backend: str, max_workers: int, max_pending: int) -> None:
+        """Update the pool settings. Takes effect on the next :meth:`start`."""
+        if backend not in {"process", "thread"}:
+            msg = f"Unsupported password hashing backend: {backend!r}"
+            raise ValueError(msg)
+        self.backend = backend  # type: ignore[assignment]
+        self.max_workers = max(max_workers, 1)
+        self.max_pending = max(max_pending, 1)
+
+    @property
+    def stats(self) -> dict[str, float]:
+        """Queue depth, rejections, and the count and latency of successful operations, for this worker."""
+        return {
+            "pending": self.pending,
+            "rejected": self.rejected,
+            "completed": self.completed,
+            "total_seconds": self.total_seconds,
+            "max_seconds": self.max_seconds,
+        }
+
+    def start(self) -> None:
+        """Create the pool."""
+        if self._executor is None:
+            self._executor = self._create_executor()
+
+    def shutdown(self) -> None:
+        """Release the pool, cancelling queued operations."""
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _create_executor(self) -> Executor:
+        if self.backend == "process":
+            try:
+                executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_load_policy,
+                    initargs=(password_crypt_context.to_string(),),
+                )
+            except (ImportError, NotImplementedError, OSError):
+                pass
+            else:
+                for _ in range(self.max_workers):
+                    executor.submit(_warm_up)
+                return executor
+        return ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="password-hasher")
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        """Run ``fn`` on the pool.
+
+        Raises:
+            ServiceUnavailableError: When ``max_pending`` operations are already queued or running.
+        """
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            msg = "Too many concurrent password operations. Please try again shortly."
+            raise ServiceUnavailableError(detail=msg)
+        self.pending += 1
+        started = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        executor = self._executor
+        try:
+            try:
+                result = await loop.run_in_executor(executor, fn, *args)
+            except BrokenExecutor:
+                # A worker died (e.g. killed for memory); replace the pool and retry once.
+                self._replace(executor)
+                result = await loop.run_in_executor(self._executor, fn, *args)
+        finally:
+            self.pending -= 1
+        elapsed = time.perf_counter() - started
+        self.completed += 1
+        self.total_seconds += elapsed
+        self.max_seconds = max(self.max_seconds, elapsed)
+        return result
+
+    def _replace(self, broken: Executor | None) -> None:
+        """Replace the ``broken`` pool, unless a concurrent operation already did."""
+        if broken is None or self._executor is not broken:
+            return
+        self._executor = self._create_executor()
+        # the operations queued on the broken pool already failed, and are retried by their callers
+        broken.shutdown(wait=False)
+
+
+password_hasher = PasswordHasher()
+"""Password hasher for this worker. Configured and started by the application plugin."""
+
+
 def get_encryption_key(secret: str) -> bytes:
     """Get Encryption Key.
 
@@ -30,7 +214,7 @@ async def get_password_hash(password: str | bytes) -> str:
     Returns:
         str: Hashed password
     """
-    return await asyncio.get_running_loop().run_in_executor(None, password_crypt_context.hash, password)
+    return await password_hasher.run(_hash, password)
 
 
 async def verify_password(plain_password: str | bytes, hashed_password: str) -> bool:
@@ -43,10 +227,19 @@ async def verify_password(plain_password: str | bytes, hashed_password: str) ->
     Returns:
         bool: True if password matches hash.
     """
-    valid, _ = await asyncio.get_running_loop().run_in_executor(
-        None,
-        password_crypt_context.verify_and_update,
-        plain_password,
-        hashed_password,
-    )
-    return bool(valid)
+    valid, _ = await verify_and_update_password(plain_password, hashed_password)
+    return valid
+
+
+async def verify_and_update_password(plain_password: str | bytes, hashed_password: str) -> tuple[bool, str | None]:
+    """Verify Password and compute its replacement hash if needed.
+
+    Args:
+        plain_password (str | bytes): The string or byte password
+        hashed_password (str): the hash of the password
+
+    Returns:
+        tuple[bool, str | None]: Whether the password matches, and a new hash when the stored one uses outdated
+        parameters.
+    """
+    return await password_hasher.run(_verify_and_update, plain_password, hashed_password)
@@ -7,20 +7,258 @@ You should not have modify this module very often and should only be invoked und
 
 from __future__ import annotations
 
+from typing import TYPE_CHECKING, Any, Literal, TypeVar, cast, overload
+
 from advanced_alchemy.extensions.litestar.providers import (
+    DEPENDENCY_DEFAULTS,
     DependencyCache,
     DependencyDefaults,
-    create_filter_dependencies,
-    create_service_dependencies,
-    create_service_provider,
+    FilterConfig,
     dep_cache,
 )
+from advanced_alchemy.extensions.litestar.providers import (
+    create_filter_dependencies as _create_filter_dependencies,
+)
+from advanced_alchemy.extensions.litestar.providers import (
+    create_service_dependencies as _create_service_dependencies,
+)
+from advanced_alchemy.extensions.litestar.providers import (
+    create_service_provider as _create_service_provider,
+)
+from advanced_alchemy.filters import FilterTypes, OrderBy, StatementFilter
+from litestar.di import Provide
+from litestar.exceptions import ValidationException
+from litestar.params import Dependency, Parameter
+
+from app.lib.pagination import CountedLimitOffset, CursorFilter
+from app.lib.timing import timed
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncGenerator, Callable, Collection, Generator
+
+    from advanced_alchemy.service import SQLAlchemyAsyncRepositoryService, SQLAlchemySyncRepositoryService
+
+    from app.lib.counts import CountStrategy
 
 __all__ = (
+    "PAGINATION_DEPENDENCY_KEY",
     "DependencyCache",
     "DependencyDefaults",
+    "FilterConfig",
+    "PaginatedFilterConfig",
     "create_filter_dependencies",
     "create_service_dependencies",
     "create_service_provider",
     "dep_cache",
 )
+
+AsyncServiceT = TypeVar("AsyncServiceT", bound="SQLAlchemyAsyncRepositoryService[Any]")
+SyncServiceT = TypeVar("SyncServiceT", bound="SQLAlchemySyncRepositoryService[Any]")
+
+PAGINATION_DEPENDENCY_KEY = "pagination"
+_BASE_FILTERS_DEPENDENCY_KEY = "base_filters"
+_PAGINATION_KEYS = frozenset(
+    (
+        "count_strategy",
+        "cursor_pagination",
+        "pagination_type",
+        "pagination_size",
+        "sort_field",
+        "sort_fields",
+        "sort_order",
+    )
+)
+
+
+class PaginatedFilterConfig(FilterConfig, total=False):
+    """Filter configuration accepting cursor pagination next to limit/offset pagination.
+
+    With ``cursor_pagination``, ``sort_field`` (required) and ``sort_order`` set the default ordering. The list
+    endpoint returns :class:`~advanced_alchemy.service.OffsetPagination` by default, and
+    :class:`~app.lib.pagination.CursorPagination` when the client sends a ``cursor`` or ``paginationType=cursor``,
+    both through :func:`~app.lib.pagination.paginate`.
+    """
+
+    cursor_pagination: bool
+    """Serve keyset pages to clients asking for them."""
+    count_strategy: CountStrategy
+    """How totals are counted, see :mod:`app.lib.counts`. Defaults to ``exact``."""
+    sort_fields: Collection[str]
+    """Fields clients may order keyset pages by with ``orderBy``, in addition to ``sort_field``. Each needs an index on
+    ``(field, id)``, and its values are readable in the cursors."""
+
+
+def create_filter_dependencies(
+    config: PaginatedFilterConfig,
+    dep_defaults: DependencyDefaults = DEPENDENCY_DEFAULTS,
+) -> dict[str, Provide]:
+    """Create the filter dependencies, including cursor pagination when configured.
+
+    Args:
+        config: Filter settings.
+        dep_defaults: Dependency defaults to use for the filter dependencies.
+
+    Returns:
+        The filter dependency providers, aggregated under the ``filters`` key.
+    """
+    if not config.get("cursor_pagination"):
+        return _create_filter_dependencies(config, dep_defaults)
+    sort_field = config.get("sort_field")
+    if not sort_field:
+        msg = "Cursor pagination requires a sort_field"
+        raise ValueError(msg)
+    base_config = cast(
+        "FilterConfig",
+        {key: value for key, value in config.items() if key not in _PAGINATION_KEYS},
+    )
+    deps = dict(_create_filter_dependencies(base_config, dep_defaults)) if base_config else {}
+    aggregate = deps.pop(dep_defaults.FILTERS_DEPENDENCY_KEY, None)
+    if aggregate is not None:
+        deps[_BASE_FILTERS_DEPENDENCY_KEY] = aggregate
+
+    page_size = config.get("pagination_size", dep_defaults.DEFAULT_PAGINATION_SIZE)
+    default_sort_order = config.get("sort_order", "desc")
+    id_field = config.get("id_field", "id")
+    count_strategy = config.get("count_strategy", "exact")
+    sort_fields = frozenset((sort_field, *config.get("sort_fields", ())))
+
+    def provide_pagination(
+        pagination_type: Literal["limit_offset", "cursor"] = Parameter(
+            title="Pagination type",
+            description="Page with a cursor rather than an offset. Implied by ``cursor``.",
+            query="paginationType",
+            default="limit_offset",
+            required=False,
+        ),
+        cursor: str | None = Parameter(
+            title="Pagination cursor",
+            description="Cursor returned with the previous page. Omit it to get the first page.",
+            query="cursor",
+            default=None,
+            required=False,
+        ),
+        current_page: int = Parameter(ge=1, query="currentPage", default=1, required=False),
+        page_size: int = Parameter(query="pageSize", ge=1, le=1000, default=page_size, required=False),
+        field_name: str = Parameter(
+            title="Order by field",
+            description=f"With cursor pagination, one of {', '.join(sorted(sort_fields))}.",
+            query="orderBy",
+            default=sort_field,
+            required=False,
+        ),
+        sort_order: Literal["asc", "desc"] = Parameter(
+            title="Sort order",
+            query="sortOrder",
+            default=default_sort_order,
+            required=False,
+        ),
+        include_total: bool = Parameter(
+            title="Include total",
+            description="Count the matching rows of cursor pages. This is expensive on large tables.",
+            query="includeTotal",
+            default=False,
+            required=False,
+        ),
+    ) -> list[StatementFilter]:
+        if cursor is None and pagination_type == "limit_offset":
+            return [
+                CountedLimitOffset(page_size, page_size * (current_page - 1), count_strategy=count_strategy),
+                OrderBy(field_name=field_name, sort_order=sort_order),
+            ]
+        if field_name not in sort_fields:
+            msg = f"Unable to sort on {field_name!r}"
+            raise ValidationException(detail=msg, extra=[{"key": "orderBy", "source": "query"}])
+        return [
+            CursorFilter(
+                field_name=field_name,
+                sort_order=sort_order,
+                limit=page_size,
+                cursor=cursor,
+                id_field=id_field,
+                include_total=include_total,
+                count_strategy=count_strategy,
+            ),
+        ]
+
+    deps[PAGINATION_DEPENDENCY_KEY] = Provide(provide_pagination, sync_to_thread=False)
+
+    if aggregate is not None:
+
+        def provide_filters(
+            base_filters: list[FilterTypes] = Dependency(skip_validation=True),
+            pagination: list[StatementFilter] = Dependency(skip_validation=True),
+        ) -> list[StatementFilter]:
+            return [*base_filters, *pagination]
+
+    else:
+
+        def provide_filters(  # type: ignore[misc]
+            pagination: list[StatementFilter] = Dependency(skip_validation=True),
+        ) -> list[StatementFilter]:
+            return pagination
+
+    deps[dep_defaults.FILTERS_DEPENDENCY_KEY] = Provide(provide_filters, sync_to_thread=False)
+    return deps
+
+
+@overload
+def create_service_provider(
+    service_class: type[AsyncServiceT],
+    /,
+    **kwargs: Any,
+) -> Callable[..., AsyncGenerator[AsyncServiceT, None]]: ...
+
+
+@overload
+def create_service_provider(
+    service_class: type[SyncServiceT],
+    /,
+    **kwargs: Any,
+) -> Callable[..., Generator[SyncServiceT, None, None]]: ...
+
+
+def create_service_provider(
+    service_class: type[SQLAlchemyAsyncRepositoryService[Any] | SQLAlchemySyncRepositoryService[Any]],
+    /,
+    **kwargs: Any,
+) -> Callable[..., AsyncGenerator[Any, None] | Generator[Any, None, None]]:
+    """Create the service dependency provider, timed as the ``di`` phase, see :mod:`app.lib.timing`.
+
+    Args:
+        service_class: The service class to create a dependency provider for.
+        **kwargs: Passed to :func:`advanced_alchemy.extensions.litestar.providers.create_service_provider`.
+
+    Returns:
+        The dependency provider.
+    """
+    return timed("di")(_create_service_provider(service_class, **kwargs))
+
+
+def create_service_dependencies(
+    service_class: type[SQLAlchemyAsyncRepositoryService[Any] | SQLAlchemySyncRepositoryService[Any]],
+    /,
+    key: str,
+    filters: PaginatedFilterConfig | None = None,
+    dep_defaults: DependencyDefaults = DEPENDENCY_DEFAULTS,
+    **kwargs: Any,
+) -> dict[str, Provide]:
+    """Create the service dependency, timed as the ``di`` phase, and the filter dependencies.
+
+    The filter dependencies are created through :func:`create_filter_dependencies`.
+
+    Args:
+        service_class: The service class to create a dependency provider for.
+        key: The key to use for the service dependency.
+        filters: The filter configuration to use for the service.
+        dep_defaults: The dependency defaults to use for the service.
+        **kwargs: Passed to :func:`advanced_alchemy.extensions.litestar.providers.create_service_dependencies`.
+
+    Returns:
+        A dictionary of dependency providers for the service and its filters.
+    """
+    deps = _create_service_dependencies(service_class, key=key, dep_defaults=dep_defaults, **kwargs)
+    if deps[key].has_async_generator_dependency:
+        deps[key] = Provide(timed("di")(deps[key].dependency))
+    if filters:
+        deps.update(create_filter_dependencies(filters, dep_defaults))
+    return deps
@@ -15,6 +15,7 @@ from litestar.exceptions import (
     InternalServerException,
     NotFoundException,
     PermissionDeniedException,
+    ServiceUnavailableException,
 )
 from litestar.exceptions.responses import create_debug_response, create_exception_response
 from litestar.repository.exceptions import ConflictError, NotFoundError, RepositoryError
@@ -33,6 +34,7 @@ __all__ = (
     "ApplicationError",
     "AuthorizationError",
     "HealthCheckConfigurationError",
+    "ServiceUnavailableError",
     "after_exception_hook_handler",
 )
 
@@ -86,6 +88,13 @@ class HealthCheckConfigurationError(ApplicationError):
     """An error occurred while registering an health check."""
 
 
+class ServiceUnavailableError(ApplicationError):
+    """A resource is saturated and the request should be retried later."""
+
+    retry_after: int = 1
+    """Seconds the client should wait before retrying."""
+
+
 class _HTTPConflictException(HTTPException):
     """Request conflict with the current state of the target resource."""
 
@@ -123,6 +132,11 @@ def exception_to_http_response(
         Exception response appropriate to the type of original exception.
     """
     http_exc: type[HTTPException]
+    if isinstance(exc, ServiceUnavailableError):
+        return create_exception_response(
+            request,
+            ServiceUnavailableException(detail=exc.detail, headers={"Retry-After": str(exc.retry_after)}),
+        )
     if isinstance(exc, NotFoundError):
         http_exc = NotFoundException
     elif isinstance(exc, ConflictError | RepositoryError | IntegrityError):
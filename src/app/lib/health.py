@@ -0,0 +1,217 @@
+"""Liveness and readiness checks.
+
+A liveness probe only tells whether the process answers, so it does no I/O. A readiness probe tells whether the worker
+can serve requests. :class:`Readiness` runs its checks concurrently, and bounds each one with a timeout, so a hung
+dependency fails the probe instead of hanging it. The result is kept for a short time, so the probes of every load
+balancer and orchestrator cost one round of checks per worker and window. Probes arriving while the checks run share
+that round.
+
+Checks that are not critical, such as the heartbeat of the background workers, are reported without failing
+readiness.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Literal, NamedTuple
+
+import structlog
+from sqlalchemy import text
+from sqlalchemy.pool import QueuePool
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable, Iterable, Mapping
+
+    from redis.asyncio import Redis
+    from saq.queue import Queue
+    from sqlalchemy.ext.asyncio import AsyncEngine
+
+__all__ = (
+    "Check",
+    "CheckFailedError",
+    "CheckResult",
+    "Readiness",
+    "ReadinessReport",
+    "database_check",
+    "readiness",
+    "redis_check",
+    "workers_check",
+)
+
+logger = structlog.get_logger()
+
+
+class CheckFailedError(Exception):
+    """A dependency answered, but is not fit to serve requests."""
+
+    def __init__(self, message: str, details: dict[str, Any] | None = None) -> None:
+        super().__init__(message)
+        self.details = details or {}
+
+
+class Check(NamedTuple):
+    """A readiness check."""
+
+    probe: Callable[[], Awaitable[dict[str, Any]]]
+    """Return details on the dependency, or raise when it is not available."""
+    critical: bool = True
+    """Fail readiness when the check fails."""
+
+
+@dataclass
+class CheckResult:
+    """Outcome of a check."""
+
+    status: Literal["online", "offline"]
+    duration: float
+    """Milliseconds the check took."""
+    details: dict[str, Any] = field(default_factory=dict)
+    error: str | None = None
+
+
+@dataclass
+class ReadinessReport:
+    """Outcome of a round of checks."""
+
+    ready: bool
+    checks: dict[str, CheckResult]
+
+
+class Readiness:
+    """Readiness checks, run concurrently and cached."""
+
+    __slots__ = ("_expires_at", "_pending", "_report", "checks", "expires_in", "timeout")
+
+    def __init__(self, checks: Mapping[str, Check] | None = None, timeout: float = 2, expires_in: float = 5) -> None:
+        """Initialize ``Readiness``.
+
+        Args:
+            checks: The checks, by name.
+            timeout: Seconds each check may take before it is reported as failed.
+            expires_in: Seconds a round of checks is reused for.
+        """
+        self.checks = dict(checks or {})
+        self.timeout = timeout
+        self.expires_in = expires_in
+        self._report: ReadinessReport | None = None
+        self._expires_at = 0.0
+        self._pending: asyncio.Future[ReadinessReport] | None = None
+
+    def clear(self) -> None:
+        """Drop the cached report, so the next probe runs the checks."""
+        self._report = None
+
+    async def report(self) -> ReadinessReport:
+        """Get the outcome of the last round of checks, running them when it expired."""
+        if self._report is not None and time.monotonic() < self._expires_at:
+            return self._report
+        if self._pending is None:
+            self._pending = asyncio.ensure_future(self._run())
+        # a probe giving up must not cancel the round the other probes wait for
+        return await asyncio.shield(self._pending)
+
+    async def _run(self) -> ReadinessReport:
+        try:
+            results = await asyncio.gather(*(self._check(name, check) for name, check in self.checks.items()))
+            checks = dict(zip(self.checks, results, strict=True))
+            report = ReadinessReport(
+                ready=all(result.status == "online" for name, result in checks.items() if self.checks[name].critical),
+                checks=checks,
+            )
+            self._report = report
+            self._expires_at = time.monotonic() + self.expires_in
+        finally:
+            self._pending = None
+        if not report.ready:
+            await logger.awarning(
+                "Not ready",
+                checks={name: result.error for name, result in checks.items() if result.status == "offline"},
+            )
+        return report
+
+    async def _check(self, name: str, check: Check) -> CheckResult:
+        started = time.perf_counter()
+
+        def result(status: Literal["online", "offline"], **kwargs: Any) -> CheckResult:
+            return CheckResult(status=status, duration=round((time.perf_counter() - started) * 1000, 3), **kwargs)
+
+        try:
+            details = await asyncio.wait_for(check.probe(), self.timeout)
+        except TimeoutError:
+            return result("offline", error=f"Timed out after {self.timeout}s")
+        except CheckFailedError as exc:
+            return result("offline", details=exc.details, error=str(exc))
+        except Exception as exc:  # noqa: BLE001
+            # the probe is not authenticated, so the error message, which may name hosts, is only logged
+            await logger.awarning("Health check failed", check=name, exc_info=True)
+            return result("offline", error=type(exc).__name__)
+        return result("online", details=details)
+
+
+readiness = Readiness()
+"""Readiness checks of this worker. :class:`~app.server.core.ApplicationCore` attaches the checks."""
+
+
+def database_check(get_engine: Callable[[], AsyncEngine], max_overflow: int = 0) -> Check:
+    """Run ``select 1`` on a pool connection, and report how saturated the pool is.
+
+    Args:
+        get_engine: Get the engine to check.
+        max_overflow: Connections the pool may open beyond its size.
+    """
+
+    async def probe() -> dict[str, Any]:
+        details: dict[str, Any] = {}
+        engine = get_engine()
+        pool = engine.pool
+        if isinstance(pool, QueuePool):
+            capacity = pool.size() + max_overflow
+            details = {
+                "checked_out": pool.checkedout(),
+                "size": pool.size(),
+                "overflow": max(pool.overflow(), 0),
+                "saturation": round(pool.checkedout() / capacity, 3) if capacity else 0.0,
+            }
+        async with engine.connect() as connection:
+            await connection.execute(text("select 1"))
+        return details
+
+    return Check(probe)
+
+
+def redis_check(get_redis: Callable[[], Redis]) -> Check:
+    """Ping Redis.
+
+    Args:
+        get_redis: Get the client to ping.
+    """
+
+    async def probe() -> dict[str, Any]:
+        await get_redis().ping()
+        return {}
+
+    return Check(probe)
+
+
+def workers_check(queues: Callable[[], Iterable[Queue]]) -> Check:
+    """Count the background workers whose heartbeat is recent, and the jobs waiting, on each queue.
+
+    The check fails when a queue has no live worker, without failing readiness.
+
+    Args:
+        queues: Get the queues to check.
+    """
+
+    async def probe() -> dict[str, Any]:
+        details: dict[str, Any] = {}
+        for queue in queues():
+            info = await queue.info()
+            details[queue.name] = {"workers": len(info["workers"]), "queued": info["queued"]}
+        if idle := [name for name, queue in details.items() if not queue["workers"]]:
+            msg = f"No live worker on {', '.join(idle)}"
+            raise CheckFailedError(msg, details)
+        return details
+
+    return Check(probe, critical=False)
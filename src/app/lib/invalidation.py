@@ -0,0 +1,142 @@
+"""Commit-time cache invalidation.
+
+Cached data derived from database rows has to be dropped once those rows change. Handlers are registered per model
+with :func:`on_commit`. After every flush, the session records the keys each handler cares about, and the handlers
+are scheduled once the transaction has been committed. Work that is rolled back is discarded.
+
+Every mutation made through a service (or directly through a session) is covered, including changes to
+relationships such as team memberships appended to a team. Bulk ``INSERT``/``UPDATE``/``DELETE`` statements bypass the
+unit of work, so code issuing them reports the affected rows with :func:`record`.
+
+Handlers only run for commits made on an event loop the application started them on with :func:`start`, until
+:func:`drain` waits for the pending ones when it shuts down. Commits made elsewhere, such as by test fixtures seeding
+the database on their own loop, schedule nothing. Commands writing outside of the application run their work in
+:func:`dispatching`.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from itertools import chain
+from typing import TYPE_CHECKING, Any, TypeVar
+from weakref import WeakKeyDictionary
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator, Awaitable, Callable, Hashable, Iterable
+
+__all__ = ("dispatching", "drain", "listen", "on_commit", "record", "start")
+
+ChangeHandler = TypeVar("ChangeHandler", bound="Callable[[set[Any]], Awaitable[None]]")
+
+_SESSION_INFO_KEY = "pending_invalidations"
+_handlers: dict[type[Any], list[tuple[Callable[[Any], Hashable | None], Callable[[set[Any]], Awaitable[None]]]]] = (
+    defaultdict(list)
+)
+_loops: WeakKeyDictionary[asyncio.AbstractEventLoop, set[asyncio.Task[None]]] = WeakKeyDictionary()
+"""Loops handlers run on, with the handlers pending on each."""
+
+
+def on_commit(
+    model_type: type[Any],
+    key: Callable[[Any], Hashable | None],
+) -> Callable[[ChangeHandler], ChangeHandler]:
+    """Register a handler to run after instances of ``model_type`` are committed.
+
+    Args:
+        model_type: The model to watch for inserts, updates and deletes.
+        key: Extracts the value passed to the handler from a changed instance. It is called right after the flush,
+            so it should only read column attributes. ``None`` results are skipped.
+
+    Returns:
+        A decorator that registers the handler. The handler receives the set of collected keys, once per commit.
+    """
+
+    def decorator(handler: ChangeHandler) -> ChangeHandler:
+        _handlers[model_type].append((key, handler))
+        return handler
+
+    return decorator
+
+
+def record(session: Session | AsyncSession, instances: Iterable[Any]) -> None:
+    """Report rows changed outside the unit of work, such as by a bulk statement.
+
+    Args:
+        session: The session whose commit makes the change visible.
+        instances: Objects exposing the attributes read by the registered key functions, typically transient model
+            instances built from the affected rows.
+    """
+    _collect_instances(session.sync_session if isinstance(session, AsyncSession) else session, instances)
+
+
+def _collect_instances(session: Session, instances: Iterable[Any]) -> None:
+    pending: defaultdict[Callable[[set[Any]], Awaitable[None]], set[Any]] = session.info.setdefault(
+        _SESSION_INFO_KEY,
+        defaultdict(set),
+    )
+    for instance in instances:
+        for key, handler in _handlers.get(type(instance), ()):
+            if (value := key(instance)) is not None:
+                pending[handler].add(value)
+
+
+def _collect(session: Session, _: Any) -> None:
+    _collect_instances(session, chain(session.new, session.dirty, session.deleted))
+
+
+def _dispatch(session: Session) -> None:
+    pending = session.info.pop(_SESSION_INFO_KEY, None)
+    if not pending:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    tasks = _loops.get(loop)
+    if tasks is None:
+        return
+    for handler, keys in pending.items():
+        task = loop.create_task(handler(keys))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+
+def _discard(session: Session) -> None:
+    session.info.pop(_SESSION_INFO_KEY, None)
+
+
+def listen() -> None:
+    """Attach the session listeners. Calling this more than once has no effect."""
+    if event.contains(Session, "after_flush", _collect):
+        return
+    event.listen(Session, "after_flush", _collect)
+    event.listen(Session, "after_commit", _dispatch)
+    event.listen(Session, "after_rollback", _discard)
+
+
+async def start() -> None:
+    """Run the handlers of the commits made on the running loop, until :func:`drain`."""
+    _loops.setdefault(asyncio.get_running_loop(), set())
+
+
+async def drain() -> None:
+    """Wait for the handlers scheduled on the running loop to finish, and stop scheduling them there."""
+    tasks = _loops.pop(asyncio.get_running_loop(), None)
+    if tasks:
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+@asynccontextmanager
+async def dispatching() -> AsyncIterator[None]:
+    """Run the handlers of the commits made in the block, and wait for them when it exits."""
+    await start()
+    try:
+        yield
+    finally:
+        await drain()
@@ -0,0 +1,464 @@
+"""Prometheus metrics aggregated across workers.
+
+Every process records into the module level :data:`registry`: request latency per route, the phases reported by
+:mod:`app.lib.timing`, Redis command latency, the time spent waiting for a database connection, and the duration and
+outcome of background jobs. Counters and histograms are kept in memory and flushed periodically as increments into a
+Redis hash, so the totals add up across the Granian workers and the SAQ worker processes, and outlive any of them.
+
+Gauges describe the current state of a worker, such as its connection pool usage or the ``stats`` of its caches. Each
+worker publishes its own along with the flush, with an expiry, and the exposition adds up those of the workers still
+alive.
+
+:meth:`Registry.render` produces the Prometheus text exposition format served by the ``/metrics`` endpoint. It only
+reads Redis, so scrapes do not write anything, and reports what the workers published, at most one flush interval
+behind.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import os
+import socket
+import time
+from collections import defaultdict
+from typing import TYPE_CHECKING, Any, Protocol, cast
+
+import msgspec
+import structlog
+from litestar.enums import ScopeType
+from litestar.middleware import ASGIMiddleware
+from redis import RedisError
+from redis.asyncio import Redis
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable, Mapping
+
+    from litestar.types import ASGIApp, Message, Receive, Scope, Send
+    from saq.job import Job
+    from saq.queue import Queue
+    from sqlalchemy.ext.asyncio import AsyncEngine
+
+__all__ = (
+    "CONTENT_TYPE",
+    "Histogram",
+    "InstrumentedRedis",
+    "Registry",
+    "RequestMetricsMiddleware",
+    "TimedQueuePool",
+    "observe_job",
+    "pool_samples",
+    "queue_samples",
+    "registry",
+    "stats_samples",
+)
+
+logger = structlog.get_logger()
+
+Sample = tuple[str, dict[str, str], float]
+"""A sample: metric name, labels and value."""
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+"""Media type of the text exposition format."""
+
+_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+"""Upper bounds, in seconds, of the histogram buckets."""
+
+_JOB_BUCKETS = (0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0)
+"""Upper bounds, in seconds, of the background job duration buckets."""
+
+_FAMILIES: dict[str, tuple[str, str]] = {
+    "http_requests_total": ("counter", "Requests by route and status code."),
+    "http_request_duration_seconds": ("histogram", "Request latency by route, until the response is sent."),
+    "http_phase_duration_seconds": ("histogram", "Phases of the sampled requests, see Server-Timing."),
+    "redis_command_duration_seconds": ("histogram", "Redis command latency by command."),
+    "db_pool_wait_seconds": ("histogram", "Time spent waiting for a connection from the pool."),
+    "db_pool_connections": ("gauge", "Connections of the pool by state."),
+    "db_pool_size": ("gauge", "Configured size of the pool."),
+    "db_pool_overflow": ("gauge", "Connections opened beyond the size of the pool."),
+    "saq_jobs_total": ("counter", "Background jobs processed by queue, function and final status."),
+    "saq_job_duration_seconds": ("histogram", "Background job duration by queue and function."),
+    "saq_queue_jobs": ("gauge", "Background jobs by queue and state."),
+    "app_component_stats": ("gauge", "Counters reported by the stats property of caches and pools, per worker."),
+}
+"""Type and help text of the known metric families."""
+
+_HISTOGRAM_SUFFIXES = ("_bucket", "_sum", "_count")
+
+_encoder = msgspec.json.Encoder()
+_decoder = msgspec.json.Decoder(tuple[str, dict[str, str]])
+
+_LabelKey = tuple[tuple[str, str], ...]
+
+
+class Histogram:
+    """Distribution of durations over fixed buckets."""
+
+    __slots__ = ("buckets", "count", "counts", "sum")
+
+    def __init__(self, buckets: tuple[float, ...] = _BUCKETS) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        """Observations per bucket, the last one counting those above every bound."""
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds: float) -> None:
+        index = next((i for i, bound in enumerate(self.buckets) if seconds <= bound), len(self.buckets))
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def merge(self, other: Histogram) -> None:
+        """Add the observations of a histogram with the same buckets."""
+        self.counts = [count + other_count for count, other_count in zip(self.counts, other.counts, strict=True)]
+        self.count += other.count
+        self.sum += other.sum
+
+    def cumulative(self) -> list[tuple[float, int]]:
+        """Observations at or below each bound, ending with the total for an infinite bound."""
+        total = 0
+        result: list[tuple[float, int]] = []
+        for bound, count in zip((*self.buckets, float("inf")), self.counts, strict=True):
+            total += count
+            result.append((bound, total))
+        return result
+
+
+def _field(name: str, labels: Mapping[str, str]) -> str:
+    return _encoder.encode((name, labels)).decode()
+
+
+def _format_bound(bound: float) -> str:
+    return "+Inf" if bound == float("inf") else f"{bound:g}"
+
+
+def _format_value(value: float) -> str:
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _family(name: str) -> str:
+    if name in _FAMILIES:
+        return name
+    for suffix in _HISTOGRAM_SUFFIXES:
+        if name.endswith(suffix) and _FAMILIES.get(name.removesuffix(suffix), ("",))[0] == "histogram":
+            return name.removesuffix(suffix)
+    return name
+
+
+def _sort_key(sample: Sample) -> tuple[str, list[tuple[str, str]], float]:
+    name, labels, _ = sample
+    bound = labels.get("le")
+    return (
+        name,
+        sorted((key, value) for key, value in labels.items() if key != "le"),
+        float(bound) if bound is not None else 0.0,
+    )
+
+
+def _worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class Registry:
+    """Counters and histograms recorded by this process, flushed to Redis, and gauges collected on each flush.
+
+    Call :meth:`start` when the application starts, to flush every ``interval`` seconds, and :meth:`stop` when it
+    shuts down.
+    """
+
+    __slots__ = ("_counters", "_histograms", "_task", "collectors", "interval", "namespace", "redis")
+
+    def __init__(self, namespace: str = "metrics", interval: float = 10, redis: Redis | None = None) -> None:
+        """Initialize ``Registry``.
+
+        Args:
+            namespace: Prefix of the Redis keys.
+            interval: Seconds between two flushes. Gauges of a worker expire after three intervals without a flush.
+            redis: Client the metrics are flushed with.
+        """
+        self.namespace = namespace
+        self.interval = interval
+        self.redis = redis
+        self.collectors: list[Callable[[], Iterable[Sample]]] = []
+        """Callables returning the current gauges of this worker."""
+        self._counters: defaultdict[tuple[str, _LabelKey], float] = defaultdict(float)
+        self._histograms: dict[tuple[str, _LabelKey], Histogram] = {}
+        self._task: asyncio.Task[None] | None = None
+
+    @property
+    def _counters_key(self) -> str:
+        return f"{self.namespace}:counters"
+
+    @property
+    def _workers_key(self) -> str:
+        return f"{self.namespace}:workers"
+
+    def _gauges_key(self, worker: str) -> str:
+        return f"{self.namespace}:gauges:{worker}"
+
+    def inc(self, name: str, value: float = 1, **labels: str) -> None:
+        """Increment a counter."""
+        self._counters[name, tuple(sorted(labels.items()))] += value
+
+    def observe(self, name: str, seconds: float, buckets: tuple[float, ...] = _BUCKETS, **labels: str) -> None:
+        """Record an observation in a histogram."""
+        key = (name, tuple(sorted(labels.items())))
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms[key] = Histogram(buckets)
+        histogram.observe(seconds)
+
+    def _increments(
+        self,
+        counters: Mapping[tuple[str, _LabelKey], float],
+        histograms: Mapping[tuple[str, _LabelKey], Histogram],
+    ) -> dict[str, float]:
+        increments = {_field(name, dict(labels)): value for (name, labels), value in counters.items()}
+        for (name, labels), histogram in histograms.items():
+            for bound, total in histogram.cumulative():
+                increments[_field(f"{name}_bucket", {**dict(labels), "le": _format_bound(bound)})] = total
+            increments[_field(f"{name}_sum", dict(labels))] = histogram.sum
+            increments[_field(f"{name}_count", dict(labels))] = histogram.count
+        return increments
+
+    async def flush(self, redis: Redis | None = None, namespace: str | None = None) -> None:
+        """Add the counters and histograms recorded since the last flush to the totals in Redis.
+
+        Args:
+            redis: Client to flush with, instead of :attr:`redis`.
+            namespace: Prefix of the Redis keys, instead of :attr:`namespace`.
+        """
+        redis = redis or self.redis
+        if redis is None or not (self._counters or self._histograms):
+            return
+        counters, self._counters = self._counters, defaultdict(float)
+        histograms, self._histograms = self._histograms, {}
+        key = f"{namespace}:counters" if namespace is not None else self._counters_key
+        try:
+            async with redis.pipeline(transaction=False) as pipeline:
+                for field, value in self._increments(counters, histograms).items():
+                    pipeline.hincrbyfloat(key, field, value)
+                await pipeline.execute()
+        except RedisError:
+            await logger.awarning("Unable to flush metrics", exc_info=True)
+            # keep them for the next flush
+            for counter, value in counters.items():
+                self._counters[counter] += value
+            for histogram_key, histogram in histograms.items():
+                if histogram_key in self._histograms:
+                    histogram.merge(self._histograms[histogram_key])
+                self._histograms[histogram_key] = histogram
+
+    async def publish(self) -> None:
+        """Flush the counters and histograms, and replace the gauges of this worker."""
+        await self.flush()
+        if self.redis is None:
+            return
+        worker = _worker_id()
+        gauges: defaultdict[str, float] = defaultdict(float)
+        for collector in self.collectors:
+            for name, labels, value in collector():
+                gauges[_field(name, labels)] += value
+        key = self._gauges_key(worker)
+        try:
+            async with self.redis.pipeline(transaction=True) as pipeline:
+                pipeline.delete(key)
+                if gauges:
+                    pipeline.hset(key, mapping=dict(gauges))
+                    pipeline.expire(key, int(self.interval * 3) + 1)
+                now = time.time()
+                pipeline.zadd(self._workers_key, {worker: now})
+                pipeline.zremrangebyscore(self._workers_key, "-inf", now - self.interval * 3)
+                await pipeline.execute()
+        except RedisError:
+            await logger.awarning("Unable to publish metrics", exc_info=True)
+
+    async def start(self) -> None:
+        """Publish the metrics of this worker every :attr:`interval` seconds, in the background."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop publishing, after a last flush, and drop the gauges of this worker."""
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        await self.flush()
+        if self.redis is not None:
+            worker = _worker_id()
+            try:
+                async with self.redis.pipeline(transaction=True) as pipeline:
+                    pipeline.delete(self._gauges_key(worker))
+                    pipeline.zrem(self._workers_key, worker)
+                    await pipeline.execute()
+            except RedisError:
+                await logger.awarning("Unable to drop the metrics of this worker", exc_info=True)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.publish()
+
+    async def collect(self) -> list[Sample]:
+        """Read the totals of every process and the gauges of the live workers from Redis, without writing anything."""
+        if self.redis is None:
+            return []
+        async with self.redis.pipeline(transaction=False) as pipeline:
+            pipeline.hgetall(self._counters_key)
+            pipeline.zrangebyscore(self._workers_key, time.time() - self.interval * 3, "+inf")
+            counters, workers = await pipeline.execute()
+            for worker in workers:
+                pipeline.hgetall(self._gauges_key(worker.decode()))
+            gauges = await pipeline.execute()
+        values: defaultdict[bytes, float] = defaultdict(float)
+        for hash_values in (counters, *gauges):
+            for field, value in hash_values.items():
+                values[field] += float(value)
+        return [(*_decoder.decode(field), value) for field, value in values.items()]
+
+    async def render(self, samples: Iterable[Sample] = ()) -> str:
+        """Render the metrics of every process, and extra samples, in the Prometheus text exposition format.
+
+        Args:
+            samples: Samples collected for this exposition only, such as the depth of the job queues.
+
+        Returns:
+            The exposition.
+        """
+        families: defaultdict[str, list[Sample]] = defaultdict(list)
+        for sample in [*await self.collect(), *samples]:
+            families[_family(sample[0])].append(sample)
+        lines: list[str] = []
+        for family in sorted(families):
+            kind, description = _FAMILIES.get(family, ("untyped", ""))
+            if description:
+                lines.append(f"# HELP {family} {description}")
+            lines.append(f"# TYPE {family} {kind}")
+            for name, labels, value in sorted(families[family], key=_sort_key):
+                rendered = ",".join(f'{key}="{_escape(label)}"' for key, label in labels.items())
+                value_text = _format_value(value)
+                lines.append(f"{name}{{{rendered}}} {value_text}" if rendered else f"{name} {value_text}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+"""Metrics of this process. :class:`~app.server.core.ApplicationCore` attaches it to the application's Redis."""
+
+
+class RequestMetricsMiddleware(ASGIMiddleware):
+    """Count requests and record their latency, by method and route template."""
+
+    scopes = (ScopeType.HTTP,)
+
+    def __init__(self, registry: Registry = registry) -> None:
+        """Initialize ``RequestMetricsMiddleware``.
+
+        Args:
+            registry: Registry the requests are recorded in.
+        """
+        self.registry = registry
+
+    async def handle(self, scope: Scope, receive: Receive, send: Send, next_app: ASGIApp) -> None:
+        started = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await next_app(scope, receive, send_wrapper)
+        except Exception as exc:
+            status = getattr(exc, "status_code", 500)
+            raise
+        finally:
+            route = scope.get("path_template", "")
+            method = cast("str", scope.get("method", ""))
+            self.registry.inc("http_requests_total", method=method, route=route, status=str(status))
+            self.registry.observe(
+                "http_request_duration_seconds",
+                time.perf_counter() - started,
+                method=method,
+                route=route,
+            )
+
+
+class InstrumentedRedis(Redis):
+    """Redis client recording the latency of its commands. Pipelines and pub/sub are not recorded."""
+
+    async def execute_command(self, *args: Any, **options: Any) -> Any:
+        started = time.perf_counter()
+        try:
+            return await super().execute_command(*args, **options)  # type: ignore[no-untyped-call]
+        finally:
+            command = args[0] if isinstance(args[0], str) else bytes(args[0]).decode()
+            registry.observe("redis_command_duration_seconds", time.perf_counter() - started, command=command.upper())
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Connection pool recording how long checkouts wait for a connection."""
+
+    def _do_get(self) -> Any:
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            registry.observe("db_pool_wait_seconds", time.perf_counter() - started)
+
+
+def pool_samples(engine: AsyncEngine, /, **labels: str) -> list[Sample]:
+    """Gauges of the connection pool of ``engine``, when it is a queue pool, with the given labels."""
+    pool = engine.pool
+    if not isinstance(pool, QueuePool):
+        return []
+    return [
+        ("db_pool_connections", {**labels, "state": "checked_out"}, pool.checkedout()),
+        ("db_pool_connections", {**labels, "state": "idle"}, pool.checkedin()),
+        ("db_pool_size", labels, pool.size()),
+        ("db_pool_overflow", labels, max(pool.overflow(), 0)),
+    ]
+
+
+class _HasStats(Protocol):
+    @property
+    def stats(self) -> Mapping[str, float]: ...
+
+
+def stats_samples(components: Mapping[str, _HasStats]) -> list[Sample]:
+    """Gauges of the ``stats`` of caches, stores and pools, by component name."""
+    return [
+        ("app_component_stats", {"component": name, "stat": stat}, float(value))
+        for name, component in components.items()
+        for stat, value in component.stats.items()
+    ]
+
+
+async def queue_samples(queues: Iterable[Queue]) -> list[Sample]:
+    """Gauges of the jobs waiting in, and being processed from, job queues."""
+    samples: list[Sample] = []
+    for queue in queues:
+        for state in ("queued", "active", "incomplete"):
+            count = await queue.count(state)
+            samples.append(("saq_queue_jobs", {"queue": queue.name, "state": state}, count))
+    return samples
+
+
+def observe_job(job: Job) -> None:
+    """Record the duration and status of a processed job, from an SAQ ``after_process`` hook."""
+    if not job.started:
+        return
+    queue = job.queue.name if job.queue is not None else ""
+    duration = ((job.completed or time.time() * 1000) - job.started) / 1000
+    registry.inc("saq_jobs_total", queue=queue, function=job.function, status=job.status.value)
+    registry.observe("saq_job_duration_seconds", duration, _JOB_BUCKETS, queue=queue, function=job.function)
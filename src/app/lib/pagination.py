@@ -0,0 +1,206 @@
+"""Keyset (cursor) pagination.
+
+Limit/offset pagination counts every matching row and makes the database walk past all skipped rows on every page.
+Keyset pagination instead continues from the last row of the previous page: each page is fetched as
+``WHERE (sort_field, id) > (last_value, last_id) ORDER BY sort_field, id LIMIT n``, which an index on
+``(sort_field, id)`` answers without scanning the skipped rows. The total is only counted when the client asks for it.
+
+The position is handed to clients as an opaque cursor. Enable it on a controller with ``"cursor_pagination": True``
+in the filter configuration passed to :func:`app.lib.deps.create_filter_dependencies`, and return :func:`paginate`
+from the handler. Lists keep answering with limit/offset pages, and switch to keyset pages when the client sends a
+``cursor`` or ``paginationType=cursor``. Keyset pages may only be ordered by the ``sort_field`` and ``sort_fields`` of
+the configuration, so that every order is backed by an index, and cursors only carry the values of those fields.
+"""
+
+from __future__ import annotations
+
+import base64
+import binascii
+from collections.abc import Sequence  # noqa: TC003
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Generic, TypeVar, cast
+
+import msgspec
+from advanced_alchemy.filters import LimitOffset, PaginationFilter
+from litestar.exceptions import ValidationException
+from sqlalchemy import Select, and_, or_, tuple_
+from sqlalchemy.orm import class_mapper
+
+from app.lib.counts import CountStrategy, count_rows
+from app.lib.schema import CamelizedBaseStruct
+
+if TYPE_CHECKING:
+    from advanced_alchemy.filters import StatementTypeT
+    from advanced_alchemy.repository.typing import ModelT
+    from advanced_alchemy.service import OffsetPagination, SQLAlchemyAsyncRepositoryService
+    from advanced_alchemy.service.typing import ModelDTOT
+    from sqlalchemy import Column, ColumnElement
+
+__all__ = ("CountedLimitOffset", "CursorFilter", "CursorPagination", "paginate")
+
+T = TypeVar("T")
+
+
+class CursorPagination(CamelizedBaseStruct, Generic[T]):
+    """A page of results from keyset pagination."""
+
+    items: Sequence[T]
+    limit: int
+    next_cursor: str | None = None
+    """Cursor of the next page, or ``None`` on the last page."""
+    total: int | None = None
+    """Number of matching rows, only counted when requested."""
+    total_strategy: CountStrategy | None = None
+    """How ``total`` was counted: ``exact``, ``estimated`` or ``cached``."""
+
+
+class _Position(msgspec.Struct, array_like=True, frozen=True):
+    field_name: str
+    sort_order: str
+    value: Any
+    id: Any
+
+
+_encoder = msgspec.json.Encoder()
+_decoder = msgspec.json.Decoder(_Position)
+
+
+@dataclass
+class CountedLimitOffset(LimitOffset):
+    """Limit/offset pagination whose total is counted with ``count_strategy``."""
+
+    count_strategy: CountStrategy = "exact"
+
+
+def _invalid_cursor(detail: str = "Invalid pagination cursor") -> ValidationException:
+    return ValidationException(detail=detail, extra=[{"key": "cursor", "source": "query"}])
+
+
+@dataclass
+class CursorFilter(PaginationFilter):
+    """Keyset pagination over ``(field_name, id_field)``.
+
+    The statement is limited to ``limit + 1`` rows; the extra row only tells :func:`paginate` whether a next page
+    exists. Rows with a ``NULL`` sort value come last in ascending order and first in descending order, on every
+    dialect.
+    """
+
+    field_name: str
+    sort_order: str
+    limit: int
+    cursor: str | None = None
+    """Opaque cursor returned with the previous page, ``None`` for the first page."""
+    id_field: str = "id"
+    include_total: bool = False
+    count_strategy: CountStrategy = "exact"
+
+    def __post_init__(self) -> None:
+        self._position = self._decode(self.cursor) if self.cursor else None
+
+    def _decode(self, cursor: str) -> _Position:
+        try:
+            position = _decoder.decode(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        except (binascii.Error, ValueError, msgspec.DecodeError) as exc:
+            raise _invalid_cursor() from exc
+        if (position.field_name, position.sort_order) != (self.field_name, self.sort_order):
+            msg = "The pagination cursor was issued for a different sort order"
+            raise _invalid_cursor(msg)
+        return position
+
+    def _column(self, model: type[ModelT], name: str) -> Column[Any]:
+        column = class_mapper(model).columns.get(name)
+        if column is None:
+            msg = f"Unable to sort on {name!r}"
+            raise ValidationException(detail=msg, extra=[{"key": "orderBy", "source": "query"}])
+        return column
+
+    @staticmethod
+    def _convert(value: Any, column: Column[Any]) -> Any:
+        if value is None:
+            return None
+        try:
+            return msgspec.convert(value, column.type.python_type, strict=False)
+        except (msgspec.ValidationError, NotImplementedError) as exc:
+            raise _invalid_cursor() from exc
+
+    def _after(self, column: Column[Any], id_column: Column[Any], position: _Position) -> ColumnElement[bool]:
+        value = self._convert(position.value, column)
+        last_id = self._convert(position.id, id_column)
+        if last_id is None:
+            raise _invalid_cursor()
+        ascending = self.sort_order == "asc"
+        key = tuple_(value, last_id, types=(column.type, id_column.type))
+        if value is None:
+            same_value = and_(column.is_(None), id_column > last_id if ascending else id_column < last_id)
+            return same_value if ascending else or_(column.is_not(None), same_value)
+        if ascending:
+            after = tuple_(column, id_column) > key
+            return or_(after, column.is_(None)) if column.nullable else after
+        return tuple_(column, id_column) < key
+
+    def append_to_statement(self, statement: StatementTypeT, model: type[ModelT]) -> StatementTypeT:
+        if not isinstance(statement, Select):
+            return statement
+        column = self._column(model, self.field_name)
+        id_column = self._column(model, self.id_field)
+        where = () if self._position is None else (self._after(column, id_column, self._position),)
+        if self.sort_order == "asc":
+            order = (column.asc().nulls_last() if column.nullable else column.asc(), id_column.asc())
+        else:
+            order = (column.desc().nulls_first() if column.nullable else column.desc(), id_column.desc())
+        return cast("StatementTypeT", statement.where(*where).order_by(*order).limit(self.limit + 1))
+
+    def next_cursor(self, last: Any) -> str:
+        """Encode the position right after ``last``, the final row of the current page."""
+        position = _Position(
+            field_name=self.field_name,
+            sort_order=self.sort_order,
+            value=getattr(last, self.field_name),
+            id=getattr(last, self.id_field),
+        )
+        return base64.urlsafe_b64encode(_encoder.encode(position)).rstrip(b"=").decode()
+
+
+async def paginate(
+    service: SQLAlchemyAsyncRepositoryService[ModelT],
+    *filters: Any,
+    schema_type: type[ModelDTOT] | None = None,
+) -> OffsetPagination[Any] | CursorPagination[Any]:
+    """Fetch a page of results with the :class:`CountedLimitOffset` or :class:`CursorFilter` found in ``filters``.
+
+    Args:
+        service: The service listing the rows.
+        *filters: Route filters, including exactly one pagination filter. Other filters and raw column criteria
+            narrow the results as they do with ``list_and_count``.
+        schema_type: Optional schema to convert the rows to.
+
+    Returns:
+        A limit/offset page with the total number of matching rows, or a keyset page with the cursor of the next one
+        and, when requested, the total. Totals are counted with the filter's count strategy.
+    """
+    pagination = next((f for f in filters if isinstance(f, CountedLimitOffset | CursorFilter)), None)
+    if isinstance(pagination, CountedLimitOffset):
+        if pagination.count_strategy == "exact":
+            results, count = await service.list_and_count(*filters)
+        else:
+            results = await service.list(*filters)
+            count, _ = await count_rows(service, *filters, strategy=pagination.count_strategy)
+        return service.to_schema(data=results, total=count, filters=filters, schema_type=schema_type)
+    if pagination is None:
+        msg = "paginate() requires a CountedLimitOffset or a CursorFilter"
+        raise TypeError(msg)
+    results = await service.list(*filters)
+    items = results[: pagination.limit]
+    next_cursor = pagination.next_cursor(items[-1]) if len(results) > pagination.limit else None
+    total, total_strategy = (
+        await count_rows(service, *filters, strategy=pagination.count_strategy)
+        if pagination.include_total
+        else (None, None)
+    )
+    return CursorPagination(
+        items=service.to_schema(data=items, schema_type=schema_type).items,
+        limit=pagination.limit,
+        next_cursor=next_cursor,
+        total=total,
+        total_strategy=total_strategy,
+    )
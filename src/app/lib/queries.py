@@ -0,0 +1,170 @@
+"""Per-request database query accounting.
+
+:func:`instrument` hooks the cursor events of every engine, and :class:`QueryTrackingMiddleware` counts the statements a
+request executes and the time spent in the database. The totals are bound to the structlog context and reported in
+the ``Server-Timing`` response header.
+
+Two kinds of accidental queries are caught:
+
+- A handler may declare how many statements it is expected to execute with the ``query_budget`` key of its ``opt``.
+  Going over budget logs a warning and, in strict mode, replaces the response with a ``500`` error. The test suite
+  enables strict mode, so that a new lazy load breaks the tests of the handler.
+- The same statement executed again and again within a request, typically a lazy-loaded relationship accessed in a
+  loop, is logged as a likely N+1 query.
+"""
+
+from __future__ import annotations
+
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Any
+
+import msgspec
+import structlog
+from litestar.datastructures import MutableScopeHeaders
+from litestar.enums import ScopeType
+from litestar.middleware import ASGIMiddleware
+from litestar.status_codes import HTTP_500_INTERNAL_SERVER_ERROR
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from structlog.contextvars import bind_contextvars
+
+from app.config import constants
+
+if TYPE_CHECKING:
+    from litestar.types import ASGIApp, Message, Receive, Scope, Send
+    from sqlalchemy.engine import Connection, ExecutionContext
+
+__all__ = ("QueryStats", "QueryTrackingMiddleware", "current_stats", "instrument")
+
+logger = structlog.get_logger()
+
+_STARTED_AT = "query_started_at"
+"""Key of the execution start time in the ``info`` of a connection."""
+
+
+class QueryStats:
+    """Statements executed, and time spent in the database, while handling a request."""
+
+    __slots__ = ("count", "duration", "statements")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.duration = 0.0
+        """Seconds spent executing statements."""
+        self.statements: Counter[str] = Counter()
+        """Number of executions of each statement."""
+
+    def repeated(self, threshold: int) -> list[tuple[str, int]]:
+        """Statements executed at least ``threshold`` times, most repeated first."""
+        return [(statement, count) for statement, count in self.statements.most_common() if count >= threshold]
+
+
+_stats: ContextVar[QueryStats | None] = ContextVar("query_stats", default=None)
+
+
+def current_stats() -> QueryStats | None:
+    """Query statistics of the request being handled, if it is tracked."""
+    return _stats.get()
+
+
+def _before_cursor_execute(conn: Connection, *_: Any) -> None:
+    if _stats.get() is not None:
+        conn.info.setdefault(_STARTED_AT, []).append(time.perf_counter())
+
+
+def _after_cursor_execute(
+    conn: Connection,
+    _cursor: Any,
+    statement: str,
+    _parameters: Any,
+    _context: ExecutionContext | None,
+    _executemany: bool,
+) -> None:
+    stats = _stats.get()
+    started_at = conn.info.get(_STARTED_AT)
+    if stats is None or not started_at:
+        return
+    stats.count += 1
+    stats.duration += time.perf_counter() - started_at.pop()
+    stats.statements[statement] += 1
+
+
+def instrument() -> None:
+    """Count the statements executed through any engine for tracked requests. Calling it again is a no-op.
+
+    The events of the :class:`~sqlalchemy.engine.Engine` class are hooked, so that engines created or replaced after
+    the application, such as replicas or the engines of the tests, are counted too.
+    """
+    if not event.contains(Engine, "after_cursor_execute", _after_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class QueryTrackingMiddleware(ASGIMiddleware):
+    """Track the queries of every request, enforce the query budget of handlers and report likely N+1 queries."""
+
+    scopes = (ScopeType.HTTP,)
+
+    def __init__(self, strict: bool = False, repeated_threshold: int = 0) -> None:
+        """Initialize ``QueryTrackingMiddleware``.
+
+        Args:
+            strict: Fail requests going over the query budget of their handler, instead of logging a warning.
+            repeated_threshold: Log statements executed at least this many times within a request. ``0`` disables it.
+        """
+        self.strict = strict
+        self.repeated_threshold = repeated_threshold
+
+    async def _over_budget(self, scope: Scope, stats: QueryStats) -> str | None:
+        route_handler = scope.get("route_handler")
+        budget = route_handler.opt.get(constants.QUERY_BUDGET) if route_handler is not None else None
+        if budget is None or stats.count <= budget:
+            return None
+        await logger.awarning(
+            "Query budget exceeded",
+            handler=str(route_handler),
+            budget=budget,
+            statements=stats.statements.most_common(),
+        )
+        return f"{route_handler} executed {stats.count} statements, over its budget of {budget}"
+
+    async def handle(self, scope: Scope, receive: Receive, send: Send, next_app: ASGIApp) -> None:
+        stats = QueryStats()
+        token = _stats.set(stats)
+        rejected = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal rejected
+            if rejected:
+                return
+            if message["type"] == "http.response.start":
+                bind_contextvars(db_queries=stats.count, db_time=round(stats.duration * 1000, 3))
+                detail = await self._over_budget(scope, stats)
+                if detail is not None and self.strict:
+                    # the response may be partly sent already, so it is replaced here rather than by raising
+                    rejected = True
+                    await send(
+                        {
+                            "type": "http.response.start",
+                            "status": HTTP_500_INTERNAL_SERVER_ERROR,
+                            "headers": [(b"content-type", b"application/json")],
+                        },
+                    )
+                    body = msgspec.json.encode({"status_code": HTTP_500_INTERNAL_SERVER_ERROR, "detail": detail})
+                    await send({"type": "http.response.body", "body": body, "more_body": False})
+                    return
+                MutableScopeHeaders(message).extend_header_value(
+                    "Server-Timing",
+                    f'db;dur={stats.duration * 1000:.3f};desc="{stats.count} queries"',
+                )
+            await send(message)
+
+        try:
+            await next_app(scope, receive, send_wrapper)
+        finally:
+            _stats.reset(token)
+        if self.repeated_threshold:
+            for statement, count in stats.repeated(self.repeated_threshold):
+                await logger.awarning("Repeated statement, likely an N+1 query", statement=statement, count=count)
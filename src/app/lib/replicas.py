@@ -0,0 +1,247 @@
+"""Read replica routing.
+
+Sessions created with :class:`RoutingSession` send the reads of read-only requests to a replica, and everything else
+to the primary:
+
+- :class:`ReplicaRoutingMiddleware` marks requests to ``GET`` and ``HEAD`` handlers as read-only. A handler overrides
+  it with the :data:`~app.config.constants.READ_ONLY` key of its ``opt``.
+- :func:`read_only` marks a block as read-only wherever it runs. ``read_only(replica=False)`` keeps the reads of a
+  read-only block on the primary, as for principals and credentials.
+- Once a session flushes, executes a DML statement or locks rows, it sticks to the primary, so that a request reads
+  its own writes.
+
+Routing is decided per request, not per service method: the same ``get`` runs on a replica in a ``GET`` handler, and
+on the primary in a handler reading the rows it is about to change.
+
+Replicas lagging further behind the primary than the staleness bound are skipped. :class:`ReplicaSet` measures the lag
+of each replica in the background, and reads fall back to the primary until a replica was measured fresh. Caches
+filled by read-only requests may hold data as old as the staleness bound: cached responses are purged again once the
+replicas caught up with a write, see :class:`~app.lib.response_cache.ResponseCacheTags`.
+
+Without replicas, read-only blocks still start deferred transactions on SQLite, see
+:attr:`~app.config.base.DatabaseSettings.SQLITE_BEGIN_IMMEDIATE`. The authentication middleware runs before
+:class:`ReplicaRoutingMiddleware`, and loads the principal in the transaction of the request, so it marks the lookup
+with :func:`is_read_only_request`.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import math
+from contextlib import contextmanager
+from contextvars import ContextVar
+from itertools import count
+from typing import TYPE_CHECKING, Any
+
+import structlog
+from litestar.enums import ScopeType
+from litestar.middleware import ASGIMiddleware
+from sqlalchemy import Select, text
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.dml import UpdateBase
+
+from app.config import constants
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator, Sequence
+
+    from litestar.types import ASGIApp, Receive, Scope, Send
+    from sqlalchemy import Connection, Engine
+    from sqlalchemy.ext.asyncio import AsyncEngine
+
+__all__ = (
+    "ReplicaRoutingMiddleware",
+    "ReplicaSet",
+    "RoutingSession",
+    "is_read_only",
+    "is_read_only_request",
+    "read_only",
+    "replicas",
+)
+
+logger = structlog.get_logger()
+
+_USE_PRIMARY = "use_primary"
+"""Key of the ``info`` of a session set once it wrote, so that its later reads see the writes."""
+_SAFE_METHODS = frozenset(("GET", "HEAD"))
+_LAG_QUERIES = {
+    "postgresql": text(
+        "select case when not pg_is_in_recovery() or pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() then 0 "
+        "else extract(epoch from now() - pg_last_xact_replay_timestamp()) end",
+    ),
+}
+"""Seconds a replica is behind its primary, by dialect. Replicas of other dialects are assumed to be up to date."""
+
+_read_only: ContextVar[bool] = ContextVar("read_only", default=False)
+_replica_reads: ContextVar[bool] = ContextVar("replica_reads", default=True)
+
+
+@contextmanager
+def read_only(enabled: bool = True, *, replica: bool = True) -> Iterator[None]:
+    """Mark the block as read-only, or as writing when ``enabled`` is ``False``.
+
+    The reads of a read-only block go to a replica, unless ``replica`` is ``False``.
+    """
+    token = _read_only.set(enabled)
+    replica_token = _replica_reads.set(replica)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(replica_token)
+        _read_only.reset(token)
+
+
+def is_read_only() -> bool:
+    """Whether the running code is marked read-only."""
+    return _read_only.get()
+
+
+def is_read_only_request(scope: Scope) -> bool:
+    """Whether a request is read-only: ``GET`` and ``HEAD`` requests, unless the ``opt`` of the handler says otherwise.
+
+    The :data:`~app.config.constants.READ_ONLY` key of the ``opt`` marks other handlers as read-only, or ``GET``
+    handlers as writing.
+    """
+    if scope["type"] != ScopeType.HTTP:
+        return False
+    enabled = scope["method"] in _SAFE_METHODS
+    route_handler = scope.get("route_handler")
+    if route_handler is not None:
+        enabled = route_handler.opt.get(constants.READ_ONLY, enabled)
+    return bool(enabled)
+
+
+class ReplicaSet:
+    """Replica engines, and how far each one is behind the primary.
+
+    Call :meth:`start` when the application starts, to measure the lag every ``interval`` seconds, and :meth:`stop`
+    when it shuts down.
+    """
+
+    __slots__ = ("_fallbacks", "_lags", "_next", "_reads", "_task", "engines", "interval", "max_staleness", "timeout")
+
+    def __init__(
+        self,
+        engines: Sequence[AsyncEngine] = (),
+        max_staleness: float = 5,
+        interval: float = 1,
+        timeout: float = 2,
+    ) -> None:
+        """Initialize ``ReplicaSet``.
+
+        Args:
+            engines: The replica engines.
+            max_staleness: Seconds a replica may be behind the primary before its reads go to the primary.
+            interval: Seconds between two measures of the lag.
+            timeout: Seconds a measure may take before the replica is considered stale.
+        """
+        self.engines = list(engines)
+        self.max_staleness = max_staleness
+        self.interval = interval
+        self.timeout = timeout
+        self._lags: dict[AsyncEngine, float] = {}
+        self._next = count()
+        self._reads = 0
+        self._fallbacks = 0
+        self._task: asyncio.Task[None] | None = None
+
+    @property
+    def stats(self) -> dict[str, float]:
+        """Replicas, fresh replicas, reads sent to a replica and reads sent to the primary for lack of one."""
+        return {
+            "replicas": len(self.engines),
+            "fresh": len(self._fresh()),
+            "reads": self._reads,
+            "fallbacks": self._fallbacks,
+        }
+
+    def _fresh(self) -> list[AsyncEngine]:
+        return [engine for engine in self.engines if self._lags.get(engine, math.inf) <= self.max_staleness]
+
+    def choose(self) -> AsyncEngine | None:
+        """Pick a fresh replica, in turn, or ``None`` when there is none."""
+        if not self.engines:
+            return None
+        if not (fresh := self._fresh()):
+            self._fallbacks += 1
+            return None
+        self._reads += 1
+        return fresh[next(self._next) % len(fresh)]
+
+    async def _measure(self, engine: AsyncEngine) -> float:
+        query = _LAG_QUERIES.get(engine.dialect.name)
+        if query is None:
+            return 0.0
+        try:
+            async with asyncio.timeout(self.timeout), engine.connect() as connection:
+                lag = await connection.scalar(query)
+        except Exception:  # noqa: BLE001
+            await logger.awarning("Unable to measure the replication lag", replica=repr(engine.url), exc_info=True)
+            return math.inf
+        return math.inf if lag is None else float(lag)
+
+    async def check(self) -> None:
+        """Measure the lag of every replica, concurrently."""
+        lags = await asyncio.gather(*(self._measure(engine) for engine in self.engines))
+        for engine, lag in zip(self.engines, lags, strict=True):
+            if lag > self.max_staleness >= self._lags.get(engine, math.inf):
+                await logger.awarning("Replica is stale", replica=repr(engine.url), lag=lag)
+            self._lags[engine] = lag
+
+    async def start(self) -> None:
+        """Measure the lag of the replicas now, then every :attr:`interval` seconds in the background."""
+        if self._task is None and self.engines:
+            await self.check()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop measuring the lag, and close the connections of the replicas."""
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        self._lags.clear()
+        for engine in self.engines:
+            await engine.dispose()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.check()
+
+
+replicas = ReplicaSet()
+"""Replicas of the database. :class:`~app.server.core.ApplicationCore` attaches the engines."""
+
+
+class RoutingSession(Session):
+    """Session sending the reads of read-only requests to :data:`replicas`, and everything else to its bind."""
+
+    def get_bind(self, mapper: Any = None, *, clause: Any = None, **kwargs: Any) -> Engine | Connection:
+        if self._flushing or isinstance(clause, UpdateBase) or getattr(clause, "_for_update_arg", None) is not None:
+            self.info[_USE_PRIMARY] = True
+        elif (
+            isinstance(clause, Select)
+            and _read_only.get()
+            and _replica_reads.get()
+            and not self.info.get(_USE_PRIMARY)
+            and (replica := replicas.choose()) is not None
+        ):
+            return replica.sync_engine
+        return super().get_bind(mapper, clause=clause, **kwargs)
+
+
+class ReplicaRoutingMiddleware(ASGIMiddleware):
+    """Mark requests to ``GET`` and ``HEAD`` handlers, and handlers opting in, as read-only, see
+    :func:`is_read_only_request`.
+
+    Install it after the authentication middleware, so that principals are loaded from the primary.
+    """
+
+    scopes = (ScopeType.HTTP,)
+
+    async def handle(self, scope: Scope, receive: Receive, send: Send, next_app: ASGIApp) -> None:
+        with read_only(is_read_only_request(scope)):
+            await next_app(scope, receive, send)
@@ -0,0 +1,499 @@
+"""Tag-based invalidation of cached responses.
+
+Cached route handlers declare the data their response is built from as tags, such as ``user`` for anything listing
+users or ``team:{team_id}`` for a single team. The tags are formatted with the request's path parameters. When a
+response is written to the cache, its key is added to a Redis set per tag.
+
+Writes purge tags through :func:`tag_writes`, which registers commit-time handlers (see :mod:`app.lib.invalidation`):
+once a change to a model is committed, every cached response carrying one of the tags formatted from the changed
+instance is deleted.
+
+Responses that differ between users are keyed by scope: a route handler lists scope names under the
+:data:`~app.config.constants.CACHE_KEY_SCOPES` option, and each scope registered with :func:`cache_key_scope`
+contributes a value of the request, such as the principal id, to the cache key. Scope values can also be used in tags,
+so ``user:{user}`` tags the response with the id of the current user.
+
+To avoid a burst of identical queries when a hot entry expires, :class:`TaggedRedisStore` can serve expired entries
+while a single request refreshes them, and make concurrent misses wait for that request.
+:class:`ResponseCacheLockMiddleware` releases the lock of a request whose response was not stored, such as an error.
+
+Each encoding negotiated with the client, as by :class:`~app.lib.compression.CompressionMiddleware`, gets its own
+cache entries (see :func:`negotiate_encoding`). The store keeps the bodies of those entries compressed with that
+encoding once they reach a size threshold, and cache hits replay them as they are, with a ``Content-Encoding`` header:
+nothing is compressed or decompressed when serving a hit.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import math
+import secrets
+import struct
+import time
+from contextvars import ContextVar
+from datetime import timedelta
+from itertools import chain
+from typing import TYPE_CHECKING, Any
+
+import msgspec
+import structlog
+from litestar.enums import ScopeType
+from litestar.exceptions import ImproperlyConfiguredException
+from litestar.middleware import ASGIMiddleware
+from litestar.stores.redis import RedisStore
+from redis import RedisError
+
+from app.lib import invalidation
+from app.lib.compression import compress, negotiate
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable, Mapping, Sequence
+
+    from litestar import Request
+    from litestar.types import ASGIApp, Receive, Scope, Send
+    from redis.asyncio import Redis
+
+    from app.lib.stores import LayeredStore
+
+    CacheKeyScope = Callable[[Request[Any, Any, Any]], str]
+
+__all__ = (
+    "ResponseCacheLockMiddleware",
+    "ResponseCacheTags",
+    "TaggedRedisStore",
+    "cache_key_scope",
+    "negotiate_encoding",
+    "resolve_cache_key_scopes",
+    "response_cache_tags",
+    "tag_writes",
+)
+
+logger = structlog.get_logger()
+
+_LOCK_POLL_INTERVAL = 0.05
+"""Seconds between two checks of a request waiting for another one to store a response."""
+_RELEASE_LOCK_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("DEL", KEYS[1])
+end
+return 0
+"""
+"""Delete a refresh lock, unless it expired and was taken by another request."""
+_PURGE_SCRIPT = """
+local deleted = 0
+for _, tag_key in ipairs(KEYS) do
+    local members = redis.call("SMEMBERS", tag_key)
+    for first = 1, #members, 1000 do
+        deleted = deleted + redis.call("DEL", unpack(members, first, math.min(first + 999, #members)))
+    end
+    redis.call("DEL", tag_key)
+end
+return deleted
+"""
+"""Delete the entries indexed under the tags of ``KEYS``, and the tag indexes, in batches below Lua's unpack limit."""
+_ENVELOPE = struct.Struct(">4sd")
+_ENVELOPE_MAGIC = b"swr1"
+
+
+def _wrap(value: str | bytes, fresh_until: float) -> bytes:
+    """Prefix a cached value with the time until which it is fresh."""
+    return _ENVELOPE.pack(_ENVELOPE_MAGIC, fresh_until) + (value.encode() if isinstance(value, str) else value)
+
+
+def _unwrap(data: bytes) -> tuple[bytes, float | None]:
+    """Split a cached value from its freshness, ``None`` for values stored without a stale period."""
+    if data[:4] != _ENVELOPE_MAGIC:
+        return data, None
+    return data[_ENVELOPE.size :], _ENVELOPE.unpack_from(data)[1]
+
+
+_request_tags: ContextVar[tuple[str, tuple[str, ...]] | None] = ContextVar("response_cache_tags", default=None)
+"""Cache key and tags of the response being produced for the current request."""
+_request_encoding: ContextVar[tuple[str, str] | None] = ContextVar("response_cache_encoding", default=None)
+"""Cache key and encoding of the current request, when it negotiated one with the client."""
+_request_lock: ContextVar[tuple[str, bytes] | None] = ContextVar("response_cache_lock", default=None)
+"""Cache key and token of the refresh lock held by the current request."""
+_BODY_HEADERS = frozenset((b"content-encoding", b"content-length"))
+
+
+def _compress(value: bytes, min_size: int, encoding: str = "gzip") -> bytes:
+    """Compress the body of cached response messages, unless it is smaller than ``min_size`` or already encoded."""
+    start, *messages = msgspec.msgpack.decode(value)
+    headers = start["headers"]
+    body = b"".join(message.get("body", b"") for message in messages)
+    if len(body) < min_size or any(name.lower() == b"content-encoding" for name, _ in headers):
+        return value
+    body = compress(body, encoding)
+    start["headers"] = [
+        *([name, header] for name, header in headers if name.lower() not in _BODY_HEADERS),
+        [b"content-encoding", encoding.encode()],
+        [b"content-length", str(len(body)).encode()],
+        [b"vary", b"Accept-Encoding"],
+    ]
+    return msgspec.msgpack.encode([start, {"type": "http.response.body", "body": body, "more_body": False}])
+
+
+def negotiate_encoding(request: Request[Any, Any, Any], key: str, encodings: Sequence[str] = ("gzip",)) -> str:
+    """Get the cache key of the encoding variant of a response accepted by the client.
+
+    Args:
+        request: The request being answered.
+        key: The cache key shared by all variants.
+        encodings: Encodings in order of preference, see :func:`~app.lib.compression.negotiate`.
+
+    Returns:
+        ``key`` suffixed with the first of ``encodings`` the client accepts, such as ``:br``, so that compressed
+        entries are only replayed to such clients, and ``key`` when it accepts none.
+    """
+    encoding = negotiate(request.headers.get("accept-encoding", ""), encodings)
+    if encoding is None:
+        _request_encoding.set(None)
+        return key
+    key = f"{key}:{encoding}"
+    _request_encoding.set((key, encoding))
+    return key
+
+
+class TaggedRedisStore(RedisStore):
+    """Redis store for cached responses, indexing every entry under the tags of the request that produced it.
+
+    With ``compress_min_size``, the bodies of the entries of an encoding variant are stored compressed with that
+    encoding once they reach that size in bytes.
+
+    With ``stale_for``, entries are kept that many seconds past their expiry. The first request reading an expired
+    entry takes the refresh lock of its key and misses, so that it renders and stores a fresh response, while the
+    requests arriving in the meantime are answered with the stale entry. With ``lock_timeout``, concurrent requests
+    for a missing entry wait for the one holding the lock instead of all rendering it. A lock is released when the
+    fresh entry is stored, by :meth:`release` when the response turned out not to be cacheable, or after
+    ``lock_timeout`` seconds when the request holding it died. Requests waiting for a lock released without an entry
+    render the response themselves.
+    """
+
+    __slots__ = (
+        "_purge",
+        "_release_lock",
+        "coalesced",
+        "compress_min_size",
+        "hits",
+        "lock_timeout",
+        "misses",
+        "stale_for",
+        "stale_hits",
+    )
+
+    def __init__(
+        self,
+        redis: Redis,
+        namespace: str | None = None,
+        stale_for: int = 0,
+        lock_timeout: int = 0,
+        compress_min_size: int | None = None,
+    ) -> None:
+        super().__init__(redis, namespace=namespace)
+        self.compress_min_size = compress_min_size
+        self.stale_for = stale_for
+        self.lock_timeout = lock_timeout
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._release_lock = redis.register_script(_RELEASE_LOCK_SCRIPT)
+        self._purge = redis.register_script(_PURGE_SCRIPT)
+
+    @property
+    def stats(self) -> dict[str, int]:
+        """Lookup counters for this worker: fresh hits, stale hits, misses, and misses answered by another request."""
+        return {"hits": self.hits, "stale_hits": self.stale_hits, "misses": self.misses, "coalesced": self.coalesced}
+
+    def _tag_key(self, tag: str) -> str:
+        return self._make_key(f"tag:{tag}")
+
+    def _lock_key(self, key: str) -> str:
+        return self._make_key(f"lock:{key}")
+
+    async def _lock(self, key: str) -> bool:
+        """Take the refresh lock of ``key``. Without locking, or when Redis fails, every request refreshes."""
+        if self.lock_timeout <= 0:
+            return True
+        token = secrets.token_bytes(16)
+        try:
+            locked = await self._redis.set(self._lock_key(key), token, nx=True, px=int(self.lock_timeout * 1000))
+        except RedisError:
+            await logger.awarning("Unable to lock a cached response", key=key, exc_info=True)
+            return True
+        if locked:
+            _request_lock.set((key, token))
+        return bool(locked)
+
+    async def release(self) -> None:
+        """Release the refresh lock held by the current request, if it did not store its response."""
+        held = _request_lock.get()
+        if held is None:
+            return
+        _request_lock.set(None)
+        key, token = held
+        try:
+            await self._release_lock(keys=[self._lock_key(key)], args=[token], client=self._redis)
+        except RedisError:
+            await logger.awarning("Unable to release the lock of a cached response", key=key, exc_info=True)
+
+    async def _wait(self, key: str) -> bytes | None:
+        """Wait for the request holding the refresh lock of ``key`` to store its response.
+
+        Returns ``None`` as soon as the lock is released without an entry, as the response is not cacheable.
+        """
+        deadline = time.monotonic() + self.lock_timeout
+        try:
+            while time.monotonic() < deadline:
+                await asyncio.sleep(_LOCK_POLL_INTERVAL)
+                data = await self._redis.get(self._make_key(key))
+                if data is not None:
+                    return _unwrap(data)[0]
+                if not await self._redis.exists(self._lock_key(key)):
+                    return None
+        except RedisError:
+            await logger.awarning("Unable to wait for a cached response", key=key, exc_info=True)
+        return None
+
+    async def get(self, key: str, renew_for: int | timedelta | None = None) -> bytes | None:
+        return (await self.get_fresh(key, renew_for))[0]
+
+    async def get_fresh(self, key: str, renew_for: int | timedelta | None = None) -> tuple[bytes | None, float]:
+        """Get an entry as :meth:`get` does, and the number of seconds it stays fresh.
+
+        Entries stored without a stale period are fresh until they expire, which is reported as ``math.inf``. Stale
+        entries and the responses of other requests are reported as ``0``, not to be reused.
+        """
+        data = await super().get(key, renew_for)
+        if data is not None:
+            value, fresh_until = _unwrap(data)
+            if fresh_until is None:
+                self.hits += 1
+                return value, math.inf
+            if (fresh_for := fresh_until - time.time()) > 0:
+                self.hits += 1
+                return value, fresh_for
+            if not await self._lock(key):
+                self.stale_hits += 1
+                return value, 0
+            self.misses += 1
+            return None, 0
+        if await self._lock(key):
+            self.misses += 1
+            return None, 0
+        awaited = await self._wait(key)
+        if awaited is None:
+            self.misses += 1
+        else:
+            self.coalesced += 1
+        return awaited, 0
+
+    async def set(self, key: str, value: str | bytes, expires_in: int | timedelta | None = None) -> None:
+        if isinstance(expires_in, timedelta):
+            expires_in = int(expires_in.total_seconds())
+        if (
+            self.compress_min_size is not None
+            and (variant := _request_encoding.get()) is not None
+            and variant[0] == key
+        ):
+            value = _compress(value.encode() if isinstance(value, str) else value, self.compress_min_size, variant[1])
+        if expires_in and self.stale_for > 0:
+            value = _wrap(value, time.time() + expires_in)
+            expires_in += self.stale_for
+        await super().set(key, value, expires_in)
+        pending = _request_tags.get()
+        tags = pending[1] if pending is not None and pending[0] == key else ()
+        token = None
+        if (held := _request_lock.get()) is not None and held[0] == key:
+            _request_lock.set(None)
+            token = held[1]
+        if not tags and token is None:
+            return
+        try:
+            async with self._redis.pipeline(transaction=False) as pipe:
+                if token is not None:
+                    # the lock may have expired and been taken by another request
+                    await self._release_lock(keys=[self._lock_key(key)], args=[token], client=pipe)
+                for tag in tags:
+                    tag_key = self._tag_key(tag)
+                    pipe.sadd(tag_key, self._make_key(key))
+                    if expires_in:
+                        # keep the index for as long as its longest-lived entry
+                        pipe.expire(tag_key, expires_in, nx=True)
+                        pipe.expire(tag_key, expires_in, gt=True)
+                    else:
+                        pipe.persist(tag_key)
+                await pipe.execute()
+        except RedisError:
+            await logger.awarning("Unable to index a cached response", key=key, exc_info=True)
+
+    async def purge(self, tags: Iterable[str]) -> None:
+        """Delete the cached responses carrying any of the given tags."""
+        tag_keys = [self._tag_key(tag) for tag in set(tags)]
+        if not tag_keys:
+            return
+        try:
+            # in one script, so that no entry is indexed between reading a tag and deleting it
+            await self._purge(keys=tag_keys, client=self._redis)
+        except RedisError:
+            await logger.awarning("Unable to purge cached responses", tags=tags, exc_info=True)
+
+
+class ResponseCacheLockMiddleware(ASGIMiddleware):
+    """Release the refresh lock of cached responses that were not stored, such as errors.
+
+    Without it, the next requests for the key wait for the lock to expire.
+    """
+
+    scopes = (ScopeType.HTTP,)
+
+    async def handle(self, scope: Scope, receive: Receive, send: Send, next_app: ASGIApp) -> None:
+        token = _request_lock.set(None)
+        try:
+            await next_app(scope, receive, send)
+        finally:
+            if response_cache_tags.store is not None:
+                await response_cache_tags.store.release()
+            _request_lock.reset(token)
+
+
+class ResponseCacheTags:
+    """Links cached responses to their tags, and purges them after writes.
+
+    When the response cache has a memory tier (see :mod:`app.lib.stores`), ``local`` is that tier, and every purge
+    clears it on all workers.
+
+    Reads of cached handlers may go to a replica lagging behind the primary (see :mod:`app.lib.replicas`), so a request
+    right after a purge can cache the data from before the write again. With ``repurge_after``, every purge is repeated
+    once that many seconds later, when the replicas have caught up. Call :meth:`stop` when the application shuts down,
+    to run the pending ones right away.
+    """
+
+    __slots__ = ("_repurges", "local", "repurge_after", "store")
+
+    def __init__(
+        self,
+        store: TaggedRedisStore | None = None,
+        local: LayeredStore | None = None,
+        repurge_after: float = 0,
+    ) -> None:
+        """Initialize ``ResponseCacheTags``.
+
+        Args:
+            store: Store of the cached responses.
+            local: Memory tier of the response cache.
+            repurge_after: Seconds after which every purge is repeated, or ``0`` not to repeat them.
+        """
+        self.store = store
+        self.local = local
+        self.repurge_after = repurge_after
+        self._repurges: set[asyncio.Task[None]] = set()
+
+    @staticmethod
+    def tag(
+        request: Request[Any, Any, Any],
+        key: str,
+        templates: Iterable[str],
+        scopes: Mapping[str, str] | None = None,
+    ) -> None:
+        """Attach tags to the response cached under ``key`` for this request.
+
+        Args:
+            request: The request being answered.
+            key: The response cache key of the request.
+            templates: Tags of the route handler, formatted with the path parameters and the cache key scopes.
+            scopes: Cache key scope values of the request, by scope name.
+        """
+        values = {**request.path_params, **(scopes or {})}
+        _request_tags.set((key, tuple(template.format_map(values) for template in templates)))
+
+    async def purge(self, tag_groups: set[tuple[str, ...]]) -> None:
+        """Delete the cached responses carrying any of the given tags, and again :attr:`repurge_after` seconds later."""
+        tags = set(chain.from_iterable(tag_groups))
+        await self._purge(tags)
+        if self.repurge_after > 0:
+            task = asyncio.create_task(self._repurge(tags))
+            self._repurges.add(task)
+            task.add_done_callback(self._repurges.discard)
+
+    async def _purge(self, tags: set[str]) -> None:
+        if self.store is not None:
+            await self.store.purge(tags)
+        if self.local is not None:
+            await self.local.invalidate()
+
+    async def _repurge(self, tags: set[str]) -> None:
+        try:
+            await asyncio.sleep(self.repurge_after)
+        finally:
+            # also when cancelled by stop()
+            await self._purge(tags)
+
+    async def stop(self) -> None:
+        """Run the pending repeated purges now."""
+        for task in self._repurges:
+            task.cancel()
+        await asyncio.gather(*self._repurges, return_exceptions=True)
+
+
+response_cache_tags = ResponseCacheTags()
+"""Response cache tags for this worker. The store is attached by the application plugin."""
+
+
+_scopes: dict[str, CacheKeyScope] = {}
+
+
+def cache_key_scope(name: str) -> Callable[[CacheKeyScope], CacheKeyScope]:
+    """Register a cache key scope.
+
+    Args:
+        name: The scope name, as listed in the :data:`~app.config.constants.CACHE_KEY_SCOPES` option of a route handler.
+
+    Returns:
+        A decorator registering a function that returns the scope value of a request.
+    """
+
+    def decorator(func: CacheKeyScope) -> CacheKeyScope:
+        _scopes[name] = func
+        return func
+
+    return decorator
+
+
+def resolve_cache_key_scopes(request: Request[Any, Any, Any], names: Iterable[str]) -> dict[str, str]:
+    """Get the values of the given cache key scopes for a request.
+
+    Raises:
+        ImproperlyConfiguredException: A scope is not registered.
+    """
+    values = {}
+    for name in names:
+        scope = _scopes.get(name)
+        if scope is None:
+            msg = f"Unknown cache key scope {name!r}"
+            raise ImproperlyConfiguredException(msg)
+        values[name] = scope(request)
+    return values
+
+
+class _Attributes(dict[str, Any]):
+    def __init__(self, instance: Any) -> None:
+        super().__init__()
+        self.instance = instance
+
+    def __missing__(self, name: str) -> Any:
+        return getattr(self.instance, name)
+
+
+def tag_writes(model_type: type[Any], *templates: str) -> None:
+    """Purge the given tags once changes to ``model_type`` are committed.
+
+    Args:
+        model_type: The model to watch.
+        *templates: Tags to purge, formatted with the column attributes of each changed instance, such as
+            ``"team:{team_id}"``.
+    """
+    invalidation.on_commit(
+        model_type,
+        key=lambda instance: tuple(template.format_map(_Attributes(instance)) for template in templates),
+    )(response_cache_tags.purge)
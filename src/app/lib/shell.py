@@ -0,0 +1,138 @@
+"""Pre-rendered HTML shell of the single page application.
+
+Every frontend route answers with the same HTML shell, which only depends on the Vite build and the settings, so it is
+rendered once per build instead of on every request. The rendered shell carries a strong ``ETag``, and a ``Link``
+header preloading the scripts and stylesheets of the entry points, which proxies supporting it turn into a
+``103 Early Hints`` response.
+
+In production the build does not change for the lifetime of a worker, so the shell is rendered once. In development
+the Vite manifest and hot file are checked on every request, and the shell is rendered again when either changes.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, NamedTuple
+from urllib.parse import urljoin
+
+import msgspec
+from litestar.exceptions import ImproperlyConfiguredException
+from litestar_vite import VitePlugin
+
+if TYPE_CHECKING:
+    from litestar import Request
+    from litestar_vite import ViteConfig
+
+__all__ = ("Shell", "ShellCache", "preload_links")
+
+
+class Shell(NamedTuple):
+    """A rendered HTML shell."""
+
+    body: bytes
+    etag: str
+    """Strong entity tag of the body, quoted."""
+    link: str | None
+    """``Link`` header preloading the assets of the entry points, if any."""
+
+
+def preload_links(manifest: Path, asset_url: str) -> str | None:
+    """Build a ``Link`` header preloading the scripts, their static imports and the stylesheets of the entry points.
+
+    Args:
+        manifest: The Vite manifest.
+        asset_url: Base URL of the assets.
+
+    Returns:
+        The header value, or ``None`` when there is no manifest or nothing to preload.
+    """
+    if not manifest.is_file():
+        return None
+    chunks = msgspec.json.decode(manifest.read_bytes(), type=dict[str, dict[str, Any]])
+    scripts: dict[str, None] = {}
+    styles: dict[str, None] = {}
+    pending = [name for name, chunk in chunks.items() if chunk.get("isEntry")]
+    seen: set[str] = set()
+    while pending:
+        name = pending.pop(0)
+        if name in seen or name not in chunks:
+            continue
+        seen.add(name)
+        chunk = chunks[name]
+        if chunk["file"].endswith(".css"):
+            styles[chunk["file"]] = None
+        else:
+            scripts[chunk["file"]] = None
+        styles.update(dict.fromkeys(chunk.get("css", ())))
+        pending.extend(chunk.get("imports", ()))
+    links = [f"<{urljoin(asset_url, file)}>; rel=modulepreload" for file in scripts]
+    links.extend(f"<{urljoin(asset_url, file)}>; rel=preload; as=style" for file in styles)
+    return ", ".join(links) or None
+
+
+class ShellCache:
+    """The HTML shell rendered from a template, kept in memory for the current Vite build."""
+
+    __slots__ = ("_shell", "_version", "preload", "template_name")
+
+    def __init__(self, template_name: str, preload: bool = True) -> None:
+        """Initialize ``ShellCache``.
+
+        Args:
+            template_name: The template of the shell.
+            preload: Send a ``Link`` header preloading the assets of the entry points.
+        """
+        self.template_name = template_name
+        self.preload = preload
+        self._shell: Shell | None = None
+        self._version: tuple[int, ...] | None = None
+
+    @staticmethod
+    def _build_version(config: ViteConfig) -> tuple[int, ...]:
+        version: list[int] = []
+        for name in (config.manifest_name, config.hot_file):
+            try:
+                stat = (Path(config.bundle_dir) / name).stat()
+            except FileNotFoundError:
+                version.extend((0, 0))
+            else:
+                version.extend((stat.st_mtime_ns, stat.st_size))
+        return tuple(version)
+
+    def clear(self) -> None:
+        """Drop the rendered shell, so the next request renders it again."""
+        self._shell = None
+        self._version = None
+
+    def get(self, request: Request[Any, Any, Any]) -> Shell:
+        """Get the shell, rendering it on first use and, in development, whenever the Vite build changed.
+
+        Args:
+            request: The request the shell is rendered for. Nothing specific to it may end up in the shell.
+
+        Returns:
+            The rendered shell.
+        """
+        plugin = request.app.plugins.get(VitePlugin)
+        config = plugin.config
+        if self._shell is not None and not config.dev_mode:
+            return self._shell
+        version = self._build_version(config)
+        if self._shell is not None and version == self._version:
+            return self._shell
+        if self._version is not None:
+            plugin.asset_loader.parse_manifest()
+        if request.app.template_engine is None:
+            msg = "Rendering the HTML shell requires a template engine"
+            raise ImproperlyConfiguredException(msg)
+        body = request.app.template_engine.get_template(self.template_name).render(request=request).encode()
+        self._shell = Shell(
+            body=body,
+            etag=f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"',
+            link=preload_links(Path(config.bundle_dir) / config.manifest_name, config.asset_url)
+            if self.preload
+            else None,
+        )
+        self._version = version
+        return self._shell
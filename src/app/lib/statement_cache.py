@@ -0,0 +1,143 @@
+"""Statement cache accounting.
+
+Two caches spare the work of running the same statement again:
+
+- Each engine keeps the SQL compiled from statements in its compiled cache, sized with ``query_cache_size``.
+- The asyncpg dialect keeps each connection's prepared statements in a cache sized with
+  ``prepared_statement_cache_size``, sparing a round trip to prepare the statement again.
+
+:data:`statement_caches` counts the hits and misses of both for every engine, and reports those of the tracked engines
+in the logs when the application starts and shuts down, and on ``/metrics`` as ``app_component_stats``. A cache whose hit rate
+stays low once the application is warm, while it is full, is too small for the query mix.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any
+from weakref import WeakKeyDictionary
+
+import structlog
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.engine.interfaces import CacheStats
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from sqlalchemy.engine import Connection, ExecutionContext
+    from sqlalchemy.ext.asyncio import AsyncEngine
+
+__all__ = ("StatementCache", "StatementCaches", "statement_caches")
+
+logger = structlog.get_logger()
+
+
+def _hit_rate(hits: int, misses: int) -> float:
+    return round(hits / (hits + misses), 4) if hits + misses else 0.0
+
+
+class StatementCache:
+    """Hits and misses of the compiled cache of an engine, and of the prepared statement caches of its connections."""
+
+    __slots__ = ("_compiled_cache", "compiled", "prepared_hits", "prepared_misses")
+
+    def __init__(self, engine: Engine) -> None:
+        # not the engine itself, which keys the cache in _caches
+        self._compiled_cache = engine._compiled_cache
+        self.compiled = dict.fromkeys(CacheStats, 0)
+        """Executions of compiled statements, by cache outcome."""
+        self.prepared_hits = 0
+        self.prepared_misses = 0
+
+    @property
+    def stats(self) -> dict[str, float]:
+        """Compiled and prepared statement cache hits, misses, hit rates and compiled cache usage."""
+        compiled_cache = self._compiled_cache
+        hits = self.compiled[CacheStats.CACHE_HIT]
+        misses = self.compiled[CacheStats.CACHE_MISS]
+        return {
+            "compiled_hits": hits,
+            "compiled_misses": misses,
+            "compiled_uncached": self.compiled[CacheStats.CACHING_DISABLED] + self.compiled[CacheStats.NO_CACHE_KEY],
+            "compiled_hit_rate": _hit_rate(hits, misses),
+            "compiled_size": len(compiled_cache or ()),
+            "compiled_capacity": getattr(compiled_cache, "capacity", 0),
+            "prepared_hits": self.prepared_hits,
+            "prepared_misses": self.prepared_misses,
+            "prepared_hit_rate": _hit_rate(self.prepared_hits, self.prepared_misses),
+        }
+
+
+_caches: WeakKeyDictionary[Engine, StatementCache] = WeakKeyDictionary()
+"""Accounting of every engine that executed a statement."""
+
+
+def _cache(engine: Engine) -> StatementCache:
+    cache = _caches.get(engine)
+    if cache is None:
+        cache = _caches[engine] = StatementCache(engine)
+    return cache
+
+
+def _before_cursor_execute(
+    conn: Connection,
+    _cursor: Any,
+    statement: str,
+    _parameters: Any,
+    context: ExecutionContext | None,
+    executemany: bool,
+) -> None:
+    if context is None or context.compiled is None:
+        return
+    cache = _cache(conn.engine)
+    cache.compiled[context.cache_hit] += 1  # type: ignore[attr-defined]
+    # prepared statements are cached by the asyncpg dialect only, and not used by executemany
+    prepared = getattr(conn.connection.dbapi_connection, "_prepared_statement_cache", None)
+    if prepared is None or executemany:
+        return
+    if statement in prepared:
+        cache.prepared_hits += 1
+    else:
+        cache.prepared_misses += 1
+
+
+class StatementCaches:
+    """Statement cache accounting of the tracked engines, by name."""
+
+    __slots__ = ("engines",)
+
+    def __init__(self) -> None:
+        self.engines: dict[str, Callable[[], AsyncEngine]] = {}
+        """Get the engine reported under each name."""
+
+    def track(self, name: str, get_engine: Callable[[], AsyncEngine]) -> None:
+        """Report the statement cache hits and misses of an engine under ``name``.
+
+        The engine is looked up when the statistics are read, so that replacing it, as the tests do, is seen. Tracking
+        the same name again is a no-op.
+
+        Args:
+            name: The name of the engine in the statistics.
+            get_engine: Get the engine.
+        """
+        self.engines.setdefault(name, get_engine)
+        if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+            event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+
+    def cache(self, name: str) -> StatementCache:
+        """Accounting of the engine tracked as ``name``."""
+        return _cache(self.engines[name]().sync_engine)
+
+    @property
+    def stats(self) -> dict[str, float]:
+        """Statistics of every tracked engine, prefixed with its name."""
+        return {f"{name}_{stat}": value for name in self.engines for stat, value in self.cache(name).stats.items()}
+
+    async def report(self) -> None:
+        """Log the statistics of every tracked engine."""
+        for name in self.engines:
+            await logger.ainfo("Statement cache", engine=name, **self.cache(name).stats)
+
+
+statement_caches = StatementCaches()
+"""Statement cache accounting of this worker. :class:`~app.server.core.ApplicationCore` tracks the engines."""
@@ -0,0 +1,240 @@
+"""Two-tier stores.
+
+Every read from a :class:`~litestar.stores.redis.RedisStore` is a network round-trip, which dominates the cost of small
+and very hot entries. :class:`LayeredStore` keeps recently used entries in a bounded per-worker memory tier in front of
+the Redis store, and broadcasts every write and delete over Redis pub/sub so that the other workers drop their copy.
+
+The memory tier is only used while the worker is subscribed to the invalidation channel, and is cleared whenever the
+subscription is (re-)established, so messages missed while disconnected cannot leave stale entries behind. Writes
+made without going through a layered store, for instance by another application, are only seen once the local copy
+expires, so keep its time to live short.
+
+A shared store deciding for itself when an entry is fresh, such as the response cache with its stale period and
+refresh locks (see :mod:`app.lib.response_cache`), implements :class:`FreshnessAware`: the memory tier then only keeps
+the entries it reports fresh, and only for as long as they stay fresh, so that every other read goes through it.
+
+Other per-worker caches announce what they drop through an :class:`InvalidationChannel` of their own.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+from datetime import timedelta
+from typing import TYPE_CHECKING, Any, Protocol, runtime_checkable
+from uuid import uuid4
+
+import msgspec
+import structlog
+from litestar.stores.base import Store
+from redis import RedisError
+
+from app.lib.cache import LocalCache
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from redis.asyncio import Redis
+
+__all__ = ("FreshnessAware", "InvalidationChannel", "LayeredStore")
+
+logger = structlog.get_logger()
+
+_RECONNECT_DELAY = 1.0
+"""Seconds to wait before subscribing again after the invalidation channel failed."""
+
+_encoder = msgspec.msgpack.Encoder()
+_decoder = msgspec.msgpack.Decoder(tuple[str, Any])
+
+
+class InvalidationChannel:
+    """Announces the entries a worker dropped from its memory tier, so that the other workers drop them too.
+
+    Messages are ``(origin, payload)`` pairs on a Redis pub/sub channel, the origin identifying the sending worker so
+    that it ignores its own messages.
+    """
+
+    __slots__ = ("_listener", "_origin", "name", "redis", "subscribed")
+
+    def __init__(self, redis: Redis, name: str) -> None:
+        """Initialize ``InvalidationChannel``.
+
+        Args:
+            redis: Client used for the channel.
+            name: Pub/sub channel shared by the workers.
+        """
+        self.redis = redis
+        self.name = name
+        self.subscribed = False
+        self._origin = uuid4().hex
+        self._listener: asyncio.Task[None] | None = None
+
+    async def start(self, receive: Callable[[Any], None], reset: Callable[[], None]) -> None:
+        """Subscribe in the background.
+
+        Args:
+            receive: Applies the payload announced by another worker.
+            reset: Drops the whole memory tier. Called whenever the subscription is (re-)established or lost, as
+                messages may have been missed in between.
+        """
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen(receive, reset))
+
+    async def stop(self) -> None:
+        """Unsubscribe."""
+        if self._listener is not None:
+            self._listener.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._listener
+            self._listener = None
+        self.subscribed = False
+
+    async def _listen(self, receive: Callable[[Any], None], reset: Callable[[], None]) -> None:
+        while True:
+            try:
+                async with self.redis.pubsub(ignore_subscribe_messages=True) as pubsub:
+                    await pubsub.subscribe(self.name)
+                    reset()
+                    self.subscribed = True
+                    async for message in pubsub.listen():
+                        try:
+                            origin, payload = _decoder.decode(message["data"])
+                        except msgspec.DecodeError:
+                            continue
+                        if origin != self._origin:
+                            receive(payload)
+            except RedisError:
+                await logger.awarning("Lost the store invalidation channel", channel=self.name, exc_info=True)
+            finally:
+                self.subscribed = False
+                reset()
+            await asyncio.sleep(_RECONNECT_DELAY)
+
+    async def publish(self, payload: Any) -> None:
+        """Announce ``payload`` to the other workers. Failures are logged."""
+        try:
+            await self.redis.publish(self.name, _encoder.encode((self._origin, payload)))
+        except RedisError:
+            await logger.awarning("Unable to publish a store invalidation", channel=self.name, exc_info=True)
+
+
+@runtime_checkable
+class FreshnessAware(Protocol):
+    """A store reporting how long the entries it returns stay fresh."""
+
+    async def get_fresh(self, key: str, renew_for: int | timedelta | None = None) -> tuple[bytes | None, float]:
+        """Get an entry, and the number of seconds it stays fresh: ``0`` when it must not be reused."""
+        ...
+
+
+class LayeredStore(Store):
+    """A per-worker memory tier in front of a shared store.
+
+    Writes and deletes go through both tiers and are announced on ``channel``, with the key as payload or ``None`` to
+    drop every entry. Over a :class:`FreshnessAware` store, writes only go to the shared store, as it may transform
+    the value, and entries are only kept in memory once read back fresh. Call :meth:`start` when the application
+    starts and :meth:`stop` when it shuts down.
+    """
+
+    __slots__ = ("_generation", "_local", "channel", "local_hits", "misses", "remote", "remote_hits")
+
+    def __init__(
+        self,
+        remote: Store,
+        redis: Redis,
+        channel: str,
+        max_size: int = 1024,
+        expires_in: float = 5,
+    ) -> None:
+        """Initialize ``LayeredStore``.
+
+        Args:
+            remote: The shared store.
+            redis: Client used for the invalidation channel.
+            channel: Pub/sub channel shared by the workers layering the same store.
+            max_size: Maximum number of entries kept in memory.
+            expires_in: Maximum time in seconds an entry is kept in memory.
+        """
+        self.remote = remote
+        self.channel = InvalidationChannel(redis, channel)
+        self._local: LocalCache[bytes] = LocalCache(max_size=max_size, expires_in=expires_in)
+        self._generation = 0
+        """Bumped on every invalidation, so that reads started before one do not fill the memory tier."""
+        self.local_hits = 0
+        self.remote_hits = 0
+        self.misses = 0
+
+    @property
+    def stats(self) -> dict[str, int]:
+        """Hit and miss counters per tier for this worker."""
+        return {
+            "local_hits": self.local_hits,
+            "remote_hits": self.remote_hits,
+            "misses": self.misses,
+            "local_size": len(self._local),
+        }
+
+    async def start(self) -> None:
+        """Subscribe to the invalidation channel in the background."""
+        await self.channel.start(self._receive, self._receive)
+
+    async def stop(self) -> None:
+        """Unsubscribe from the invalidation channel and drop the memory tier."""
+        await self.channel.stop()
+        self._receive()
+
+    def _receive(self, key: str | None = None) -> None:
+        self._generation += 1
+        if key is None:
+            self._local.clear()
+        else:
+            self._local.delete(key)
+
+    async def invalidate(self, key: str | None = None) -> None:
+        """Drop ``key``, or every entry, from the memory tier of every worker, leaving the shared store untouched."""
+        self._receive(key)
+        await self.channel.publish(key)
+
+    async def get(self, key: str, renew_for: int | timedelta | None = None) -> bytes | None:
+        if self.channel.subscribed and (value := self._local.get(key)) is not None:
+            self.local_hits += 1
+            return value
+        generation = self._generation
+        if isinstance(self.remote, FreshnessAware):
+            value, fresh_for = await self.remote.get_fresh(key, renew_for)
+        else:
+            value, fresh_for = await self.remote.get(key, renew_for), self._local.expires_in
+        if value is None:
+            self.misses += 1
+            return None
+        self.remote_hits += 1
+        if self.channel.subscribed and fresh_for > 0 and generation == self._generation:
+            self._local.set(key, value, min(self._local.expires_in, fresh_for))
+        return value
+
+    async def set(self, key: str, value: str | bytes, expires_in: int | timedelta | None = None) -> None:
+        await self.remote.set(key, value, expires_in)
+        self._receive(key)
+        if self.channel.subscribed and not isinstance(self.remote, FreshnessAware):
+            local_expires_in = self._local.expires_in
+            if expires_in:
+                seconds = expires_in.total_seconds() if isinstance(expires_in, timedelta) else expires_in
+                local_expires_in = min(local_expires_in, seconds)
+            self._local.set(key, value.encode() if isinstance(value, str) else value, local_expires_in)
+        await self.channel.publish(key)
+
+    async def delete(self, key: str) -> None:
+        self._receive(key)
+        await self.remote.delete(key)
+        await self.channel.publish(key)
+
+    async def delete_all(self) -> None:
+        self._receive()
+        await self.remote.delete_all()
+        await self.channel.publish(None)
+
+    async def exists(self, key: str) -> bool:
+        return (self.channel.subscribed and self._local.get(key) is not None) or await self.remote.exists(key)
+
+    async def expires_in(self, key: str) -> int | None:
+        return await self.remote.expires_in(key)
@@ -0,0 +1,197 @@
+"""Per-request phase timings.
+
+:class:`ServerTimingMiddleware` times a sample of the requests. While a request is timed, the hot paths of the
+application record how long they took under a phase name:
+
+``jwt``
+    Decoding the access token.
+``principal``
+    Looking up the authenticated user.
+``guards``
+    Running the guards of the route handler.
+``di``
+    Constructing the services injected into the handler.
+``handler``
+    Resolving the dependencies and running the handler, from the ``before_request`` to the ``after_request`` hook.
+``serialize``
+    Turning the handler's return value into the response, until the response starts.
+``compress``
+    Compressing the response body.
+``app``
+    The whole request, until the response starts.
+
+Phases overlap: ``di`` is part of ``handler``, and so is the ``db`` time reported by :mod:`app.lib.queries`. The
+timings of a request are sent in the ``Server-Timing`` header and bound to the structlog context, in milliseconds, and
+aggregated into the ``http_phase_duration_seconds`` histogram of :mod:`app.lib.metrics`. Requests that are not sampled
+pay for a context variable lookup per phase.
+"""
+
+from __future__ import annotations
+
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from inspect import isasyncgenfunction, iscoroutinefunction, isgeneratorfunction
+from typing import TYPE_CHECKING, Any, TypeVar, cast
+
+from litestar.datastructures import MutableScopeHeaders
+from litestar.enums import ScopeType
+from litestar.middleware import ASGIMiddleware
+from structlog.contextvars import bind_contextvars
+
+from app.lib.metrics import registry
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterator
+
+    from litestar import Request, Response
+    from litestar.types import ASGIApp, Message, Receive, Scope, Send
+
+__all__ = (
+    "ServerTimingMiddleware",
+    "after_request",
+    "before_request",
+    "phase",
+    "timed",
+)
+
+F = TypeVar("F", bound="Callable[..., Any]")
+
+
+class _Timings:
+    __slots__ = ("handler_started", "phases", "serialize_started")
+
+    def __init__(self) -> None:
+        self.phases: dict[str, float] = {}
+        self.handler_started: float | None = None
+        self.serialize_started: float | None = None
+
+    def add(self, name: str, seconds: float) -> None:
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+
+_timings: ContextVar[_Timings | None] = ContextVar("timings", default=None)
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """Time the block as ``name`` when the request is sampled. Repeated phases add up."""
+    timings = _timings.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - started)
+
+
+def timed(name: str) -> Callable[[F], F]:
+    """Time calls to the decorated function as ``name``.
+
+    Coroutine functions are timed until they return, and async generator functions, such as dependency providers,
+    until they yield their value. Sync generator functions are left untouched.
+    """
+
+    def decorator(fn: F) -> F:
+        if isasyncgenfunction(fn):
+
+            @wraps(fn)
+            async def provider(*args: Any, **kwargs: Any) -> Any:
+                generator = fn(*args, **kwargs)
+                with phase(name):
+                    value = await anext(generator)
+                try:
+                    yield value
+                except Exception as exc:
+                    # forward the exceptions thrown into the dependency, as Litestar does on errors
+                    try:
+                        await generator.athrow(exc)
+                    except StopAsyncIteration:
+                        return
+                    raise
+                else:
+                    await anext(generator, None)
+
+            return cast("F", provider)
+        if iscoroutinefunction(fn):
+
+            @wraps(fn)
+            async def coroutine(*args: Any, **kwargs: Any) -> Any:
+                with phase(name):
+                    return await fn(*args, **kwargs)
+
+            return cast("F", coroutine)
+        if isgeneratorfunction(fn):
+            return fn
+
+        @wraps(fn)
+        def function(*args: Any, **kwargs: Any) -> Any:
+            with phase(name):
+                return fn(*args, **kwargs)
+
+        return cast("F", function)
+
+    return decorator
+
+
+async def before_request(_: Request[Any, Any, Any]) -> None:
+    """Application ``before_request`` hook starting the ``handler`` phase."""
+    if (timings := _timings.get()) is not None:
+        timings.handler_started = time.perf_counter()
+
+
+async def after_request(response: Response[Any]) -> Response[Any]:
+    """Application ``after_request`` hook ending the ``handler`` phase and starting the ``serialize`` one."""
+    if (timings := _timings.get()) is not None and timings.handler_started is not None:
+        timings.serialize_started = time.perf_counter()
+        timings.add("handler", timings.serialize_started - timings.handler_started)
+    return response
+
+
+class ServerTimingMiddleware(ASGIMiddleware):
+    """Time a sample of the requests and report their phases.
+
+    Install it first, so that the authentication and every other middleware are timed.
+    """
+
+    scopes = (ScopeType.HTTP,)
+
+    def __init__(self, sample_rate: float = 1.0) -> None:
+        """Initialize ``ServerTimingMiddleware``.
+
+        Args:
+            sample_rate: Share of the requests to time, between ``0`` and ``1``.
+        """
+        self.sample_rate = sample_rate
+
+    async def handle(self, scope: Scope, receive: Receive, send: Send, next_app: ASGIApp) -> None:
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:  # noqa: S311
+            await next_app(scope, receive, send)
+            return
+        timings = _Timings()
+        token = _timings.set(timings)
+        started = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                now = time.perf_counter()
+                if timings.serialize_started is not None:
+                    timings.add("serialize", now - timings.serialize_started)
+                timings.add("app", now - started)
+                bind_contextvars(timings={name: round(seconds * 1000, 3) for name, seconds in timings.phases.items()})
+                MutableScopeHeaders(message).extend_header_value(
+                    "Server-Timing",
+                    ", ".join(f"{name};dur={seconds * 1000:.3f}" for name, seconds in timings.phases.items()),
+                )
+            await send(message)
+
+        try:
+            await next_app(scope, receive, send_wrapper)
+        finally:
+            _timings.reset(token)
+            for name, seconds in timings.phases.items():
+                registry.observe("http_phase_duration_seconds", seconds, phase=name)
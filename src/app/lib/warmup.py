@@ -0,0 +1,121 @@
+"""Connection pool warm-up.
+
+After a deploy, the first requests of each worker pay for opening the pool connections, running the ``connect``
+listeners of :class:`~app.config.base.DatabaseSettings`, such as the JSON codecs of asyncpg, the type introspection
+of the driver, and the compilation and preparation of every statement they run. :data:`pool_warmup` pays it when the
+application starts instead:
+
+- it opens as many connections as the pool keeps, concurrently, so that they all are in the pool when requests come;
+- it runs the registered queries, the hottest statements, on each of them. The first run compiles the statements
+  into the compiled cache of the engine, and each run prepares them on its connection.
+
+Queries are registered by the domain modules running them with :meth:`PoolWarmup.query`. A query runs on a session
+bound to the connection, in a read-only transaction rolled back afterwards, and should build its statement exactly as
+the request does, through the same services and filters, for the cache keys to match. Being read-only, the
+transactions of the connections are deferred on SQLite, and do not wait for each other's write lock.
+
+Connections opened at startup are still recycled after ``pool_recycle`` seconds. A failed warm-up is logged, and
+does not prevent the application from starting.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from contextlib import AsyncExitStack
+from typing import TYPE_CHECKING, Any, TypeVar
+
+import structlog
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.pool import QueuePool
+
+from app.lib.replicas import read_only
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable, Sequence
+
+    from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+__all__ = ("PoolWarmup", "pool_warmup")
+
+logger = structlog.get_logger()
+
+Q = TypeVar("Q", bound="Callable[[AsyncSession], Awaitable[Any]]")
+
+
+class PoolWarmup:
+    """Open the connections of engine pools, and run the hottest statements on each of them.
+
+    Add :meth:`run` to the startup hooks of the application.
+    """
+
+    __slots__ = ("engines", "queries", "timeout")
+
+    def __init__(self, engines: Sequence[tuple[str, Callable[[], AsyncEngine]]] = (), timeout: float = 30) -> None:
+        """Initialize ``PoolWarmup``.
+
+        Args:
+            engines: Get the engines to warm up, by name. The engines are looked up when the warm-up runs, so that
+                replacing them, as the tests do, is seen.
+            timeout: Seconds the warm-up of an engine may take before it is abandoned.
+        """
+        self.engines = list(engines)
+        self.queries: list[Callable[[AsyncSession], Awaitable[Any]]] = []
+        self.timeout = timeout
+
+    def query(self, fn: Q) -> Q:
+        """Register the decorated coroutine function as a query to run on each connection."""
+        self.queries.append(fn)
+        return fn
+
+    async def warm(self, engine: AsyncEngine) -> int:
+        """Open the connections the pool of ``engine`` keeps, and run the queries on each of them.
+
+        Returns:
+            The number of connections warmed up. Engines without a pool keeping connections are skipped.
+        """
+        pool = engine.pool
+        if not isinstance(pool, QueuePool):
+            return 0
+        async with AsyncExitStack() as stack:
+            # held together, so that the pool opens a connection for each
+            connections = await asyncio.gather(
+                *(stack.enter_async_context(engine.connect()) for _ in range(pool.size())),
+            )
+            await asyncio.gather(*(self._run_queries(connection) for connection in connections))
+        return len(connections)
+
+    async def _run_queries(self, connection: AsyncConnection) -> None:
+        # on the connection being warmed up, rather than a replica
+        with read_only(replica=False):
+            await connection.execute(text("select 1"))
+            async with AsyncSession(bind=connection) as session:
+                for query in self.queries:
+                    await query(session)
+                await session.rollback()
+
+    async def run(self) -> None:
+        """Warm up every engine, concurrently, logging the outcome."""
+        await asyncio.gather(*(self._run(name, get_engine()) for name, get_engine in self.engines))
+
+    async def _run(self, name: str, engine: AsyncEngine) -> None:
+        started = time.perf_counter()
+        try:
+            async with asyncio.timeout(self.timeout):
+                connections = await self.warm(engine)
+        except Exception:  # noqa: BLE001
+            await logger.awarning("Unable to warm up the connection pool", engine=name, exc_info=True)
+            return
+        await logger.ainfo(
+            "Warmed up the connection pool",
+            engine=name,
+            connections=connections,
+            queries=len(self.queries),
+            duration=round((time.perf_counter() - started) * 1000, 3),
+        )
+
+
+pool_warmup = PoolWarmup()
+"""Pool warm-up of this worker. :class:`~app.server.core.ApplicationCore` attaches the engines, and the domain modules
+register their queries."""
@@ -1,7 +1,7 @@
 # pylint: disable=[invalid-name,import-outside-toplevel]
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, TypeVar
+from typing import TYPE_CHECKING, Any, TypeVar
 
 from litestar.config.response_cache import ResponseCacheConfig, default_cache_key_builder
 from litestar.di import Provide
@@ -12,14 +12,26 @@ from litestar.security.jwt import OAuth2Login
 from litestar.stores.redis import RedisStore
 from litestar.stores.registry import StoreRegistry
 
+from app.config import constants
+from app.domain.accounts.cache import principal_cache
 from app.domain.accounts.services import UserRoleService
+from app.lib.response_cache import (
+    TaggedRedisStore,
+    negotiate_encoding,
+    resolve_cache_key_scopes,
+    response_cache_tags,
+)
+from app.lib.stores import InvalidationChannel, LayeredStore
 
 if TYPE_CHECKING:
     from click import Group
     from litestar import Request
     from litestar.config.app import AppConfig
+    from litestar.stores.base import Store
     from redis.asyncio import Redis
 
+    from app.config.base import Settings
+
 
 T = TypeVar("T")
 
@@ -36,13 +48,20 @@ class ApplicationCore(InitPluginProtocol, CLIPluginProtocol):
     app_slug: str
 
     def on_cli_init(self, cli: Group) -> None:
-        from app.cli.commands import user_management_group
-        from app.config import get_settings
+        from litestar_vite.cli import vite_group
+
+        from app.cli.commands import precompress_assets, user_management_group
+        from app.config import constants, get_settings
 
         settings = get_settings()
         self.redis = settings.redis.get_client()
         self.app_slug = settings.app.slug
+        # commands write through the services too, so keep cached principals and token versions in sync
+        self._configure_accounts(settings, self.redis_store_factory(constants.PRINCIPAL_CACHE_STORE))
+        self._configure_counts(settings)
         cli.add_command(user_management_group)
+        # extends the `assets` group of the Vite plugin
+        vite_group.add_command(precompress_assets)  # type: ignore[arg-type]
 
     def on_app_init(self, app_config: AppConfig) -> AppConfig:
         """Configure application for use with SQLAlchemy.
@@ -73,11 +92,12 @@ class ApplicationCore(InitPluginProtocol, CLIPluginProtocol):
         from app.domain.teams.controllers import TeamController, TeamMemberController
         from app.domain.teams.services import TeamMemberService, TeamService
         from app.domain.web.controllers import WebController
+        from app.lib import crypt, invalidation
         from app.lib.exceptions import ApplicationError, exception_to_http_response
         from app.server import plugins
 
         settings = get_settings()
-        self.redis = settings.redis.get_client()
+        self.redis = settings.redis.get_client(instrumented=settings.metrics.ENABLED)
         self.app_slug = settings.app.slug
         app_config.debug = settings.app.DEBUG
         # openapi
@@ -93,6 +113,10 @@ class ApplicationCore(InitPluginProtocol, CLIPluginProtocol):
         app_config = jwt_auth.on_app_init(app_config)
         # security
         app_config.cors_config = config.cors
+        # timings, static assets, compression and query accounting
+        self._configure_middleware(app_config, settings)
+        # read-only requests, read replicas and statement caches
+        self._configure_database(app_config, settings)
         # templates
         app_config.template_config = config.templates
         # plugins
@@ -146,29 +170,240 @@ class ApplicationCore(InitPluginProtocol, CLIPluginProtocol):
         app_config.response_cache_config = ResponseCacheConfig(
             default_expiration=constants.CACHE_EXPIRATION,
             key_builder=self._cache_key_builder,
+            store=constants.RESPONSE_CACHE_STORE,
+        )
+        app_config.stores = self._configure_stores(app_config, settings)
+        self._configure_accounts(settings, app_config.stores.get(constants.PRINCIPAL_CACHE_STORE))
+        self._configure_counts(settings)
+        self._configure_metrics(app_config, settings, app_config.stores)
+        self._configure_health(settings)
+        app_config.on_shutdown.extend(
+            [invalidation.drain, principal_cache.stop, response_cache_tags.stop, self.redis.aclose],
+        )
+        # password hashing
+        crypt.password_hasher.configure(
+            backend=settings.app.PASSWORD_HASHING_BACKEND,
+            max_workers=settings.app.PASSWORD_HASHING_WORKERS,
+            max_pending=settings.app.PASSWORD_HASHING_MAX_PENDING,
         )
-        app_config.stores = StoreRegistry(default_factory=self.redis_store_factory)
-        app_config.on_shutdown.append(self.redis.aclose)  # type: ignore[attr-defined]
+        # commit-time invalidation only runs on the loop of the application, see app.lib.invalidation
+        app_config.on_startup.extend([invalidation.start, principal_cache.start, crypt.password_hasher.start])
+        app_config.on_shutdown.append(crypt.password_hasher.shutdown)
         # dependencies
-        dependencies = {"current_user": Provide(provide_user)}
-        app_config.dependencies.update(dependencies)
+        app_config.dependencies.update({"current_user": Provide(provide_user)})
         # listeners
         app_config.listeners.extend(
-            [account_signals.user_created_event_handler, team_signals.team_created_event_handler],
+            [
+                account_signals.user_created_event_handler,
+                account_signals.password_rehashed_event_handler,
+                team_signals.team_created_event_handler,
+            ],
         )
         return app_config
 
+    def _configure_middleware(self, app_config: AppConfig, settings: Settings) -> None:
+        """Time requests, serve the static assets, compress responses and account for the queries of each request."""
+        from app.config import app as config
+        from app.lib import queries, timing
+
+        if settings.log.TIMING_SAMPLE_RATE > 0:
+            # outermost, so that authentication and the other middleware are part of the timings
+            app_config.middleware.insert(0, config.server_timing)
+            app_config.before_request = timing.before_request
+            app_config.after_request = timing.after_request
+        if settings.vite.set_static_files and not settings.vite.DEV_MODE:
+            app_config.middleware.append(config.static_assets)
+        app_config.middleware.append(config.compression)
+        queries.instrument()
+        app_config.middleware.append(config.query_tracking)
+
+    def _configure_database(self, app_config: AppConfig, settings: Settings) -> None:
+        """Mark read-only requests, send their reads to the database replicas while they are fresh enough, warm up the
+        pools of every engine when ``POOL_WARMUP`` is set, and report the statement cache hit rates of every engine
+        when the application starts and shuts down.
+
+        Read-only requests also start deferred transactions on SQLite, see ``SQLITE_BEGIN_IMMEDIATE``. The primary engine
+        is looked up when it is used, so that replacing it, as the tests do, is seen.
+        """
+        from functools import partial
+
+        from app.config import app as config
+        from app.lib.replicas import replicas
+        from app.lib.statement_cache import statement_caches
+        from app.lib.warmup import pool_warmup
+
+        # after the authentication middleware, so that principals are loaded from the primary
+        app_config.middleware.append(config.replica_routing)
+        statement_caches.track("primary", config.alchemy.get_engine)
+        pool_warmup.engines = [("primary", config.alchemy.get_engine)]
+        pool_warmup.timeout = settings.db.POOL_TIMEOUT
+        if settings.db.POOL_WARMUP:
+            # before the report, so that it tells how warm the caches are when requests come
+            app_config.on_startup.append(pool_warmup.run)
+        app_config.on_startup.append(statement_caches.report)
+        app_config.on_shutdown.append(statement_caches.report)
+        if not settings.db.REPLICA_URLS:
+            return
+        replicas.engines = settings.db.get_replica_engines()
+        for index in range(len(replicas.engines)):
+            get_replica = partial(replicas.engines.__getitem__, index)
+            statement_caches.track(f"replica{index}", get_replica)
+            pool_warmup.engines.append((f"replica{index}", get_replica))
+        replicas.max_staleness = settings.db.REPLICA_MAX_STALENESS
+        replicas.interval = settings.db.REPLICA_CHECK_INTERVAL
+        # a replica may be up to max_staleness behind, plus the time until its lag is measured again
+        response_cache_tags.repurge_after = settings.db.REPLICA_MAX_STALENESS + settings.db.REPLICA_CHECK_INTERVAL
+        app_config.on_startup.append(replicas.start)
+        app_config.on_shutdown.append(replicas.stop)
+
+    def _configure_metrics(self, app_config: AppConfig, settings: Settings, stores: StoreRegistry) -> None:
+        """Record request metrics, publish them to this application's Redis and serve them on ``/metrics``."""
+        from functools import partial
+
+        from app.config import app as config
+        from app.config import constants
+        from app.domain.accounts.cache import principal_cache
+        from app.domain.system.controllers import MetricsController
+        from app.lib import counts, crypt, metrics
+        from app.lib.replicas import replicas
+        from app.lib.statement_cache import statement_caches
+
+        if not settings.metrics.ENABLED:
+            return
+        metrics.registry.redis = self.redis
+        metrics.registry.namespace = f"{self.app_slug}:{constants.METRICS_NAMESPACE}"
+        metrics.registry.interval = settings.metrics.FLUSH_INTERVAL
+        components: dict[str, Any] = {
+            "principal_cache": principal_cache,
+            "count_cache": counts.count_cache,
+            "password_hasher": crypt.password_hasher,
+            "response_cache": response_cache_tags.store,
+        }
+        components.update({f"store:{name}": stores.get(name) for name in settings.cache.LOCAL_STORES})
+        components["statement_caches"] = statement_caches
+        if replicas.engines:
+            components["replicas"] = replicas
+        metrics.registry.collectors.extend(
+            [
+                lambda: metrics.pool_samples(config.alchemy.get_engine(), pool="primary"),
+                *(
+                    partial(metrics.pool_samples, engine, pool=f"replica{index}")
+                    for index, engine in enumerate(replicas.engines)
+                ),
+                partial(metrics.stats_samples, components),
+            ],
+        )
+        # outermost, so that every request is counted with the status code it was answered with
+        app_config.middleware.insert(0, metrics.RequestMetricsMiddleware())
+        app_config.route_handlers.append(MetricsController)
+        app_config.on_startup.append(metrics.registry.start)
+        app_config.on_shutdown.append(metrics.registry.stop)
+
+    def _configure_health(self, settings: Settings) -> None:
+        """Check the database, this application's Redis and the background workers for readiness.
+
+        The checks look the engine and the client up when they run, so that replacing them, as the tests do, is seen.
+        """
+        from app.config import app as config
+        from app.lib import health
+
+        health.readiness.checks = {
+            "database": health.database_check(config.alchemy.get_engine, settings.db.POOL_MAX_OVERFLOW),
+            "cache": health.redis_check(lambda: self.redis),
+            "workers": health.workers_check(lambda: config.saq.get_queues().queues.values()),
+        }
+        health.readiness.timeout = settings.health.CHECK_TIMEOUT
+        health.readiness.expires_in = settings.health.CACHE_EXPIRATION
+        health.readiness.clear()
+
+    def _configure_accounts(self, settings: Settings, principal_store: Store) -> None:
+        """Attach the account caches to this application's Redis and apply the password hashing parameters."""
+        from app.config import constants
+        from app.domain.accounts.claims import token_versions
+        from app.lib import crypt, invalidation
+
+        principal_cache.store = principal_store
+        principal_cache.channel = InvalidationChannel(
+            self.redis,
+            f"{self.app_slug}:{constants.PRINCIPAL_CACHE_STORE}:principals",
+        )
+        token_versions.redis = self.redis
+        token_versions.namespace = f"{self.app_slug}:{constants.TOKEN_VERSION_NAMESPACE}"
+        invalidation.listen()
+        crypt.configure_password_context(
+            memory_cost=settings.app.PASSWORD_ARGON2_MEMORY_COST,
+            time_cost=settings.app.PASSWORD_ARGON2_TIME_COST,
+            parallelism=settings.app.PASSWORD_ARGON2_PARALLELISM,
+        )
+
+    def _configure_stores(self, app_config: AppConfig, settings: Settings) -> StoreRegistry:
+        """Create the response cache store and the stores configured with a memory tier.
+
+        Every other store is created on first use by :meth:`redis_store_factory`.
+        """
+        from app.config import app as config
+
+        response_cache_tags.store = TaggedRedisStore(
+            self.redis,
+            namespace=f"{self.app_slug}:{constants.RESPONSE_CACHE_STORE}",
+            stale_for=settings.cache.RESPONSE_STALE_EXPIRATION,
+            lock_timeout=settings.cache.RESPONSE_LOCK_TIMEOUT,
+            compress_min_size=settings.cache.RESPONSE_COMPRESSION_MIN_SIZE,
+        )
+        if settings.cache.RESPONSE_LOCK_TIMEOUT > 0:
+            app_config.middleware.append(config.response_cache_locks)
+        stores: dict[str, Store] = {constants.RESPONSE_CACHE_STORE: response_cache_tags.store}
+        for name in settings.cache.LOCAL_STORES:
+            local_store = LayeredStore(
+                stores.get(name) or self.redis_store_factory(name),
+                self.redis,
+                channel=f"{self.app_slug}:{name}:invalidate",
+                max_size=settings.cache.LOCAL_STORE_MAX_SIZE,
+                expires_in=settings.cache.LOCAL_STORE_EXPIRATION,
+            )
+            stores[name] = local_store
+            app_config.on_startup.append(local_store.start)
+            app_config.on_shutdown.append(local_store.stop)
+        if isinstance(response_cache := stores[constants.RESPONSE_CACHE_STORE], LayeredStore):
+            response_cache_tags.local = response_cache
+        return StoreRegistry(stores=stores, default_factory=self.redis_store_factory)
+
+    def _configure_counts(self, settings: Settings) -> None:
+        """Attach the list total cache to this application's Redis, and retire cached totals on every write."""
+        from app.config import constants
+        from app.db import models as m
+        from app.lib import counts
+
+        counts.count_cache.redis = self.redis
+        counts.count_cache.namespace = f"{self.app_slug}:{constants.COUNT_CACHE_NAMESPACE}"
+        counts.count_cache.expires_in = settings.cache.COUNT_EXPIRATION
+        counts.track_writes(mapper.class_ for mapper in m.User.registry.mappers)
+
     def redis_store_factory(self, name: str) -> RedisStore:
         return RedisStore(self.redis, namespace=f"{self.app_slug}:{name}")
 
     def _cache_key_builder(self, request: Request) -> str:
         """App name prefixed cache key builder.
 
+        The key includes the values of the cache key scopes of the route handler, so that responses varying by user
+        are not shared, and the response encoding accepted by the client.
+
         Args:
             request (Request): Current request instance.
 
         Returns:
             str: App slug prefixed cache key.
         """
+        from app.config import app as config
 
-        return f"{self.app_slug}:{default_cache_key_builder(request)}"
+        route_handler = request.scope.get("route_handler")
+        opt = route_handler.opt if route_handler is not None else {}
+        scopes = resolve_cache_key_scopes(request, opt.get(constants.CACHE_KEY_SCOPES, ()))
+        key = ":".join(
+            (self.app_slug, *(f"{name}={value}" for name, value in scopes.items()), default_cache_key_builder(request))
+        )
+        # the encodings CompressionMiddleware would negotiate, as cached responses are not compressed again
+        key = negotiate_encoding(request, key, config.compression.encodings)
+        if tags := opt.get(constants.CACHE_TAGS):
+            response_cache_tags.tag(request, key, tags, scopes)
+        return key
@@ -7,6 +7,7 @@ from advanced_alchemy.base import UUIDAuditBase
 from advanced_alchemy.utils.fixtures import open_fixture_async
 from httpx import AsyncClient
 from litestar import Litestar
+from litestar.stores.redis import RedisStore
 from litestar.testing import AsyncTestClient
 from litestar_saq.cli import get_saq_plugin
 from pytest_databases.docker.postgres import PostgresService
@@ -18,9 +19,14 @@ from sqlalchemy.pool import NullPool
 from app.config import app as config
 from app.config import get_settings
 from app.db.models import Team, User
+from app.domain.accounts.cache import principal_cache
+from app.domain.accounts.claims import token_versions
 from app.domain.accounts.guards import auth
 from app.domain.accounts.services import RoleService, UserService
 from app.domain.teams.services import TeamService
+from app.lib import metrics
+from app.lib.counts import count_cache
+from app.lib.stores import LayeredStore
 from app.server.core import ApplicationCore
 
 here = Path(__file__).parent
@@ -66,6 +72,7 @@ async def _seed_db(
     sessionmaker: async_sessionmaker[AsyncSession],
     raw_users: list[User | dict[str, Any]],
     raw_teams: list[Team | dict[str, Any]],
+    redis: Redis,
 ) -> AsyncGenerator[None, None]:
     """Populate test database with.
 
@@ -74,6 +81,7 @@ async def _seed_db(
         sessionmaker: The SQLAlchemy sessionmaker factory.
         raw_users: Test users to add to the database
         raw_teams: Test teams to add to the database
+        redis: The Redis instance, cleared of the cached data of the previous test.
 
     """
 
@@ -94,6 +102,9 @@ async def _seed_db(
         for obj in raw_teams:
             await teams_services.create(obj)
         await teams_services.repository.session.commit()
+    # the database was rebuilt behind the back of the caches. The client of the test is bound to the loop of the app.
+    async with Redis(**redis.connection_pool.connection_kwargs) as client:
+        await client.flushdb()
 
     yield
 
@@ -111,12 +122,20 @@ def _patch_db(
 
 @pytest.fixture(autouse=True)
 def _patch_redis(app: "Litestar", redis: Redis, monkeypatch: pytest.MonkeyPatch) -> None:
-    cache_config = app.response_cache_config
-    assert cache_config is not None
     saq_plugin = get_saq_plugin(app)
     app_plugin = app.plugins.get(ApplicationCore)
+    original = app_plugin.redis
     monkeypatch.setattr(app_plugin, "redis", redis)
-    monkeypatch.setattr(app.stores.get(cache_config.store), "_redis", redis)
+    # the stores and caches configured by the plugin hold the client it created
+    for holder in (token_versions, count_cache, metrics.registry, principal_cache.channel):
+        if holder.redis is original:
+            monkeypatch.setattr(holder, "redis", redis)
+    for store in app.stores._stores.values():
+        if isinstance(store, LayeredStore):
+            monkeypatch.setattr(store.channel, "redis", redis)
+            store = store.remote
+        if isinstance(store, RedisStore):
+            monkeypatch.setattr(store, "_redis", redis)
     if saq_plugin._config.queue_instances is not None:
         for queue in saq_plugin._config.queue_instances.values():
             monkeypatch.setattr(queue, "redis", redis)
@@ -13,3 +13,44 @@ async def test_tags_list(client: "AsyncClient", superuser_token_headers: dict[st
     resj = response.json()
     assert response.status_code == 200
     assert int(resj["total"]) == 3
+
+
+async def test_tags_list_cursor(client: "AsyncClient", superuser_token_headers: dict[str, str]) -> None:
+    response = await client.get(
+        "/api/tags",
+        params={"paginationType": "cursor", "pageSize": 2},
+        headers=superuser_token_headers,
+    )
+    assert response.status_code == 200
+    first_page = response.json()
+    assert len(first_page["items"]) == 2
+    assert first_page["total"] is None
+    assert first_page["nextCursor"] is not None
+
+    response = await client.get(
+        "/api/tags",
+        params={"pageSize": 2, "cursor": first_page["nextCursor"]},
+        headers=superuser_token_headers,
+    )
+    assert response.status_code == 200
+    second_page = response.json()
+    assert len(second_page["items"]) == 1
+    assert second_page["nextCursor"] is None
+    seen = {item["id"] for item in first_page["items"]} | {item["id"] for item in second_page["items"]}
+    assert len(seen) == 3
+
+    response = await client.get(
+        "/api/tags",
+        params={"cursor": first_page["nextCursor"], "sortOrder": "asc"},
+        headers=superuser_token_headers,
+    )
+    assert response.status_code == 400
+    response = await client.get(
+        "/api/tags",
+        params={"paginationType": "cursor", "includeTotal": True},
+        headers=superuser_token_headers,
+    )
+    assert response.json()["total"] == 3
+    assert response.json()["totalStrategy"] == "cached"
+    response = await client.get("/api/tags", params={"cursor": "not-a-cursor"}, headers=superuser_token_headers)
+    assert response.status_code == 400
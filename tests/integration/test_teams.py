@@ -75,6 +75,16 @@ async def test_teams_update(client: "AsyncClient", superuser_token_headers: dict
     assert response.status_code == 200
 
 
+async def test_teams_update_tags(client: "AsyncClient", superuser_token_headers: dict[str, str]) -> None:
+    response = await client.patch(
+        "/api/teams/97108ac1-ffcb-411d-8b1e-d9183399f63b",
+        json={"tags": ["cool tag", "Cool Tag", "another tag"]},
+        headers=superuser_token_headers,
+    )
+    assert response.status_code == 200
+    assert sorted(tag["slug"] for tag in response.json()["tags"]) == ["another-tag", "cool-tag"]
+
+
 async def test_teams_delete(client: "AsyncClient", superuser_token_headers: dict[str, str]) -> None:
     response = await client.delete(
         "/api/teams/81108ac1-ffcb-411d-8b1e-d91833999999",
@@ -105,3 +115,35 @@ async def test_teams_add_remove_member(client: "AsyncClient", superuser_token_he
     )
     assert response.status_code == 201
     assert "user@example.com" not in [e["email"] for e in response.json()["members"]]
+
+
+async def test_teams_bulk_add_remove_members(client: "AsyncClient", superuser_token_headers: dict[str, str]) -> None:
+    response = await client.post(
+        "/api/teams/81108ac1-ffcb-411d-8b1e-d91833999999/members/bulk-add",
+        headers=superuser_token_headers,
+        json={"members": [{"userName": "user@example.com"}, {"userName": "nobody@example.com"}]},
+    )
+    assert response.status_code == 201
+    assert response.json()["results"] == [
+        {"userName": "user@example.com", "status": "added"},
+        {"userName": "nobody@example.com", "status": "not_found"},
+    ]
+
+    response = await client.post(
+        "/api/teams/81108ac1-ffcb-411d-8b1e-d91833999999/members/bulk-add",
+        headers=superuser_token_headers,
+        json={"members": [{"userName": "user@example.com", "role": "ADMIN"}]},
+    )
+    assert response.json()["results"] == [{"userName": "user@example.com", "status": "already_member"}]
+
+    response = await client.post(
+        "/api/teams/81108ac1-ffcb-411d-8b1e-d91833999999/members/bulk-remove",
+        headers=superuser_token_headers,
+        json={"userNames": ["user@example.com", "user@example.com", "test@test.com", "nobody@example.com"]},
+    )
+    assert response.status_code == 201
+    assert response.json()["results"] == [
+        {"userName": "user@example.com", "status": "removed"},
+        {"userName": "test@test.com", "status": "owner"},
+        {"userName": "nobody@example.com", "status": "not_found"},
+    ]
@@ -0,0 +1,54 @@
+import asyncio
+from typing import TYPE_CHECKING
+from uuid import uuid4
+
+import pytest
+from litestar.stores.redis import RedisStore
+
+from app.db import models as m
+from app.domain.accounts.cache import PrincipalCache
+from app.lib.stores import InvalidationChannel
+
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
+
+pytestmark = pytest.mark.anyio
+
+
+def _user() -> m.User:
+    return m.User(id=uuid4(), email="user@example.com", is_active=True, is_superuser=False, is_verified=True)
+
+
+async def test_snapshot_loaded_before_an_invalidation_is_not_cached(redis: "Redis") -> None:
+    cache = PrincipalCache(store=RedisStore(redis, namespace=f"test-principals-{uuid4().hex}"))
+    user = _user()
+    generation = await cache.generation()
+    await cache.invalidate(user.id)
+    await cache.set(user, generation)
+    assert await cache.get(user.email) is None
+    await cache.set(user, await cache.generation())
+    assert await cache.get(user.email) is not None
+
+
+async def test_invalidation_reaches_the_other_workers(redis: "Redis") -> None:
+    namespace = f"test-principals-{uuid4().hex}"
+    first, second = (
+        PrincipalCache(store=RedisStore(redis, namespace=namespace), channel=InvalidationChannel(redis, namespace))
+        for _ in range(2)
+    )
+    for cache in (first, second):
+        await cache.start()
+    try:
+        for _ in range(100):
+            if first.channel and first.channel.subscribed and second.channel and second.channel.subscribed:
+                break
+            await asyncio.sleep(0.01)
+        user = _user()
+        await second.set(user, await second.generation())
+        assert second.stats["local_size"] == 1
+        await first.invalidate(user.id)
+        await asyncio.sleep(0.1)
+        assert second.stats["local_size"] == 0
+    finally:
+        await first.stop()
+        await second.stop()
@@ -0,0 +1,131 @@
+from datetime import UTC, datetime, timedelta
+from typing import TYPE_CHECKING, Any
+from uuid import uuid4
+
+import pytest
+from litestar import get
+from litestar.testing import RequestFactory
+from redis import RedisError
+
+from app.config import constants
+from app.domain.accounts import guards
+from app.domain.accounts.cache import PrincipalCache
+from app.domain.accounts.claims import Claims, TokenVersions, token_versions
+from app.domain.accounts.guards import TimedToken, current_user_from_token
+from app.domain.accounts.permissions import get_permissions
+
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
+
+pytestmark = pytest.mark.anyio
+
+
+@get("/teams", opt={constants.CLAIMS_ONLY: True})
+async def claims_only() -> None: ...
+
+
+@get("/me")
+async def loads_user() -> None: ...
+
+
+@pytest.fixture(autouse=True)
+def _claims(redis: "Redis", monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(guards.settings.app, "JWT_CLAIMS_ENABLED", True)
+    monkeypatch.setattr(token_versions, "redis", redis)
+    monkeypatch.setattr(token_versions, "namespace", f"test-token-versions-{uuid4().hex}")
+
+
+@pytest.fixture(name="lookups")
+def fx_lookups(monkeypatch: pytest.MonkeyPatch) -> list[str]:
+    """Emails the principal was looked up for, in the cache, and then the database."""
+    lookups: list[str] = []
+
+    async def get_principal(_: PrincipalCache, email: str) -> None:
+        lookups.append(email)
+
+    def provide_session(*_: Any) -> None:
+        pytest.fail("the user was loaded")
+
+    monkeypatch.setattr(PrincipalCache, "get", get_principal)
+    monkeypatch.setattr(guards.alchemy, "provide_session", provide_session)
+    return lookups
+
+
+def _token(claims: Claims) -> TimedToken:
+    return TimedToken(
+        exp=datetime.now(UTC) + timedelta(minutes=5),
+        sub="user@example.com",
+        extras=claims.to_token_extras(),
+    )
+
+
+async def _claims_of(*, is_active: bool = True, **kwargs: Any) -> Claims:
+    """Claims of a user logged in with the current token version."""
+    user_id = uuid4()
+    token_version = await token_versions.issue(user_id)
+    assert token_version is not None
+    return Claims(
+        id=user_id,
+        token_version=token_version,
+        is_active=is_active,
+        is_superuser=False,
+        is_verified=True,
+        **kwargs,
+    )
+
+
+async def test_claims_only_handler_builds_the_user_from_the_claims(lookups: list[str]) -> None:
+    claims = await _claims_of(roles=frozenset({"Application Access"}))
+    request = RequestFactory().get("/teams", route_handler=claims_only)
+    user = await current_user_from_token(_token(claims), request)
+    assert user is not None
+    assert (user.id, user.email) == (claims.id, "user@example.com")
+    assert get_permissions(user).has_role("Application Access")
+    assert lookups == []
+
+
+async def test_token_is_rejected_once_its_version_is_bumped(lookups: list[str]) -> None:
+    claims = await _claims_of()
+    token = _token(claims)
+    await token_versions.bump(claims.id)
+    for route_handler in (claims_only, loads_user):
+        request = RequestFactory().get("/", route_handler=route_handler)
+        assert await current_user_from_token(token, request) is None
+    # rejected from the version alone, without looking the user up
+    assert lookups == []
+
+
+async def test_token_is_rejected_once_its_version_is_lost(lookups: list[str], redis: "Redis") -> None:
+    claims = await _claims_of()
+    await redis.delete(token_versions._key(claims.id))
+    request = RequestFactory().get("/teams", route_handler=claims_only)
+    assert await current_user_from_token(_token(claims), request) is None
+    # a new sequence does not start from the lost version
+    assert await token_versions.issue(claims.id) != claims.token_version
+    assert await current_user_from_token(_token(claims), request) is None
+    assert lookups == []
+
+
+async def test_inactive_claims_are_rejected_on_claims_only_handlers(lookups: list[str]) -> None:
+    request = RequestFactory().get("/teams", route_handler=claims_only)
+    assert await current_user_from_token(_token(await _claims_of(is_active=False)), request) is None
+    assert lookups == []
+
+
+async def test_unreadable_versions_fail_closed_on_claims_only_handlers(
+    lookups: list[str], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    claims = await _claims_of()
+
+    async def unavailable(*_: Any) -> None:
+        raise RedisError
+
+    monkeypatch.setattr(TokenVersions, "get", unavailable)
+    request = RequestFactory().get("/teams", route_handler=claims_only)
+    assert await current_user_from_token(_token(claims), request) is None
+    assert lookups == []
+    # the claims cannot be trusted, so the user is looked up as for tokens without claims
+    request = RequestFactory().get("/me", route_handler=loads_user)
+    with pytest.raises(pytest.fail.Exception, match="the user was loaded"):
+        await current_user_from_token(_token(claims), request)
+    assert lookups == ["user@example.com"]
@@ -0,0 +1,71 @@
+from typing import TYPE_CHECKING
+from uuid import uuid4
+
+from litestar import get
+from litestar.exceptions import PermissionDeniedException
+from litestar.testing import RequestFactory
+
+from app.config import constants
+from app.db import models as m
+from app.domain.accounts.permissions import Permissions, TeamPermission, get_permissions, set_permissions
+from app.domain.teams.guards import requires_team_admin, requires_team_membership
+
+if TYPE_CHECKING:
+    from litestar.types import Guard
+
+team_id = uuid4()
+
+
+@get("/teams/{team_id:uuid}")
+async def team() -> None: ...
+
+
+def _check(guard: "Guard", user: m.User) -> bool:
+    """Whether the guard lets the user access the team."""
+    request = RequestFactory().get(f"/teams/{team_id}", user=user, route_handler=team)
+    request.scope["path_params"] = {"team_id": team_id}
+    try:
+        guard(request, team)
+    except PermissionDeniedException:
+        return False
+    return True
+
+
+def test_snapshot_follows_team_membership_changes() -> None:
+    user = m.User(email="member@example.com")
+    membership = m.TeamMember(team_id=team_id, role=m.TeamRoles.ADMIN, user=user)
+    assert not _check(requires_team_membership, user)
+    user.teams.append(membership)
+    assert get_permissions(user).is_team_admin(team_id)
+    assert _check(requires_team_admin, user)
+    membership.role = m.TeamRoles.MEMBER
+    assert not _check(requires_team_admin, user)
+    assert _check(requires_team_membership, user)
+    user.teams.remove(membership)
+    assert not get_permissions(user).is_team_member(team_id)
+    assert not _check(requires_team_membership, user)
+
+
+def test_snapshot_follows_role_changes() -> None:
+    user = m.User(email="admin@example.com")
+    assignment = m.UserRole(role=m.Role(name=constants.SUPERUSER_ACCESS_ROLE, slug="superuser"))
+    user.roles.append(assignment)
+    # superuser access bypasses team guards
+    assert _check(requires_team_admin, user)
+    assignment.role = m.Role(name="Application Access", slug="application-access")
+    assert get_permissions(user).roles == {"Application Access"}
+    assert not _check(requires_team_admin, user)
+    user.roles = []
+    assert get_permissions(user).roles == frozenset()
+    user.is_superuser = True
+    assert _check(requires_team_admin, user)
+
+
+def test_snapshot_is_kept_while_nothing_changes() -> None:
+    user = m.User(email="claims@example.com")
+    snapshot = Permissions(teams={team_id: TeamPermission(m.TeamRoles.MEMBER, is_owner=False)})
+    set_permissions(user, snapshot)
+    assert get_permissions(user) is snapshot
+    assert _check(requires_team_membership, user)
+    user.name = "Renamed"
+    assert get_permissions(user) is snapshot
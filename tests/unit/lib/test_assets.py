@@ -0,0 +1,67 @@
+from pathlib import Path
+
+import msgspec
+import pytest
+from litestar import Litestar
+from litestar.static_files import create_static_files_router
+from litestar.testing import AsyncTestClient
+
+from app.lib.assets import StaticAssetsMiddleware, read_manifest
+from app.lib.compression import precompress
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture(name="bundle")
+def fx_bundle(tmp_path: Path) -> Path:
+    (tmp_path / "assets").mkdir()
+    (tmp_path / "assets" / "main-4f2a1c.js").write_text("console.log('hello');\n" * 100)
+    (tmp_path / "assets" / "main-9b3e7d.css").write_text("body{margin:0}")
+    (tmp_path / "favicon.ico").write_bytes(b"\x00" * 10)
+    (tmp_path / "manifest.json").write_bytes(
+        msgspec.json.encode(
+            {"resources/main.tsx": {"file": "assets/main-4f2a1c.js", "css": ["assets/main-9b3e7d.css"]}},
+        ),
+    )
+    precompress(tmp_path, ["gzip"])
+    return tmp_path
+
+
+def test_read_manifest(bundle: Path) -> None:
+    assert read_manifest(bundle / "manifest.json") == {"assets/main-4f2a1c.js", "assets/main-9b3e7d.css"}
+    assert read_manifest(bundle / "missing.json") == frozenset()
+
+
+async def test_static_assets_middleware(bundle: Path) -> None:
+    app = Litestar(
+        [create_static_files_router(path="/static", directories=[bundle])],
+        middleware=[StaticAssetsMiddleware("/static/", bundle, bundle / "manifest.json", ["gzip"])],
+    )
+    async with AsyncTestClient(app) as client:
+        response = await client.get("/static/assets/main-4f2a1c.js", headers={"Accept-Encoding": "gzip"})
+        assert response.status_code == 200
+        assert response.headers["cache-control"] == "public, max-age=31536000, immutable"
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["vary"] == "Accept-Encoding"
+        assert response.text == (bundle / "assets" / "main-4f2a1c.js").read_text()
+        etag = response.headers["etag"]
+
+        response = await client.get("/static/assets/main-4f2a1c.js", headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in response.headers
+        assert response.headers["etag"] != etag
+
+        response = await client.get(
+            "/static/assets/main-4f2a1c.js",
+            headers={"Accept-Encoding": "gzip", "If-None-Match": etag},
+        )
+        assert response.status_code == 304
+        assert response.headers["etag"] == etag
+        assert response.content == b""
+
+        response = await client.get("/static/favicon.ico")
+        assert response.headers["cache-control"] == "no-cache"
+        response = await client.get("/static/favicon.ico", headers={"If-None-Match": response.headers["etag"]})
+        assert response.status_code == 304
+
+        response = await client.get("/static/missing.js")
+        assert response.status_code == 404
@@ -1,9 +1,25 @@
+import asyncio
+import gzip
+import time
+from typing import TYPE_CHECKING, Any
+
+import msgspec
 import pytest
+from litestar import get
 from litestar.config.response_cache import default_cache_key_builder
+from litestar.exceptions import ImproperlyConfiguredException, NotFoundException
 from litestar.testing import RequestFactory
 
+from app.config import app as config
+from app.config import constants
+from app.lib import response_cache
+from app.lib.cache import LocalCache
+from app.lib.response_cache import ResponseCacheLockMiddleware, ResponseCacheTags, TaggedRedisStore
 from app.server.core import ApplicationCore
 
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
+
 pytestmark = pytest.mark.anyio
 
 
@@ -12,3 +28,217 @@ def test_cache_key_builder(monkeypatch: "pytest.MonkeyPatch") -> None:
     request = RequestFactory().get("/test")
     default_cache_key = default_cache_key_builder(request)
     assert ApplicationCore()._cache_key_builder(request) == f"the-slug:{default_cache_key}"
+
+
+def test_cache_key_builder_tags_response(monkeypatch: "pytest.MonkeyPatch") -> None:
+    monkeypatch.setattr(ApplicationCore, "app_slug", "the-slug")
+
+    @get("/teams/{team_id:str}", cache=True, opt={constants.CACHE_TAGS: ("team:{team_id}", "user")})
+    async def handler(team_id: str) -> None: ...
+
+    request = RequestFactory().get("/teams/abc", route_handler=handler, path_params={"team_id": "abc"})
+    key = ApplicationCore()._cache_key_builder(request)
+    assert response_cache._request_tags.get() == (key, ("team:abc", "user"))
+
+
+def test_cache_key_builder_scopes(monkeypatch: "pytest.MonkeyPatch") -> None:
+    monkeypatch.setattr(ApplicationCore, "app_slug", "the-slug")
+    monkeypatch.setattr(response_cache, "_scopes", {})
+    response_cache.cache_key_scope("user")(lambda request: request.user)
+
+    @get("/profile", cache=True, opt={constants.CACHE_KEY_SCOPES: ("user",), constants.CACHE_TAGS: ("user:{user}",)})
+    async def handler() -> None: ...
+
+    core = ApplicationCore()
+    keys = {
+        user: core._cache_key_builder(RequestFactory().get("/profile", route_handler=handler, user=user))
+        for user in ("alice", "bob")
+    }
+    assert keys["alice"] != keys["bob"]
+    assert keys["alice"].startswith("the-slug:user=alice:")
+    assert response_cache._request_tags.get() == (keys["bob"], ("user:bob",))
+
+
+def test_cache_key_builder_unknown_scope(monkeypatch: "pytest.MonkeyPatch") -> None:
+    monkeypatch.setattr(response_cache, "_scopes", {})
+
+    @get("/profile", cache=True, opt={constants.CACHE_KEY_SCOPES: ("user",)})
+    async def handler() -> None: ...
+
+    with pytest.raises(ImproperlyConfiguredException):
+        ApplicationCore()._cache_key_builder(RequestFactory().get("/profile", route_handler=handler))
+
+
+def test_cache_key_builder_encoding_variants(monkeypatch: "pytest.MonkeyPatch") -> None:
+    monkeypatch.setattr(ApplicationCore, "app_slug", "the-slug")
+    monkeypatch.setattr(config.compression, "encodings", ("gzip",))
+    core = ApplicationCore()
+    identity = core._cache_key_builder(RequestFactory().get("/test"))
+    assert response_cache._request_encoding.get() is None
+    gzipped = core._cache_key_builder(RequestFactory().get("/test", headers={"Accept-Encoding": "gzip, br"}))
+    assert gzipped == f"{identity}:gzip"
+    assert response_cache._request_encoding.get() == (gzipped, "gzip")
+    refused = core._cache_key_builder(RequestFactory().get("/test", headers={"Accept-Encoding": "br, gzip;q=0"}))
+    assert refused == identity
+
+
+@pytest.mark.parametrize(
+    ("accept_encoding", "variant"),
+    [
+        ("gzip, br", ":br"),
+        ("br;q=0.5, gzip;q=1", ":br"),
+        ("gzip, br;q=0", ":gzip"),
+        ("gzip;q=0", ""),
+        ("identity, *;q=0", ""),
+        ("*", ":br"),
+        ("", ""),
+    ],
+)
+def test_negotiate_encoding(accept_encoding: str, variant: str) -> None:
+    request = RequestFactory().get("/test", headers={"Accept-Encoding": accept_encoding})
+    assert response_cache.negotiate_encoding(request, "key", ("br", "gzip")) == f"key{variant}"
+
+
+def test_compress_cached_response() -> None:
+    body = b'{"items": []}' * 100
+    messages = [
+        {"type": "http.response.start", "status": 200, "headers": [(b"content-length", b"1300")]},
+        {"type": "http.response.body", "body": body[:650], "more_body": True},
+        {"type": "http.response.body", "body": body[650:], "more_body": False},
+    ]
+    value = msgspec.msgpack.encode(messages)
+    assert response_cache._compress(value, min_size=len(body) + 1) == value
+    start, message = msgspec.msgpack.decode(response_cache._compress(value, min_size=1024))
+    assert gzip.decompress(message["body"]) == body
+    assert [b"content-encoding", b"gzip"] in start["headers"]
+    assert [b"content-length", str(len(message["body"])).encode()] in start["headers"]
+
+
+async def test_tagged_store_coalesces_misses(redis: "Redis") -> None:
+    store = TaggedRedisStore(redis, namespace="test-coalesce", stale_for=60, lock_timeout=5)
+    renders = 0
+
+    async def request() -> bytes:
+        nonlocal renders
+        value = await store.get("key")
+        if value is None:
+            renders += 1
+            await asyncio.sleep(0.2)
+            value = f"render {renders}".encode()
+            await store.set("key", value, expires_in=1)
+        return value
+
+    assert await asyncio.gather(*(request() for _ in range(5))) == [b"render 1"] * 5
+    assert renders == 1
+    await asyncio.sleep(1.1)
+    assert sorted(await asyncio.gather(*(request() for _ in range(5)))) == [b"render 1"] * 4 + [b"render 2"]
+    assert renders == 2
+    assert await request() == b"render 2"
+    assert store.stats == {"hits": 1, "stale_hits": 4, "misses": 2, "coalesced": 4}
+
+
+async def test_tagged_store_releases_locks_of_uncached_responses(
+    redis: "Redis", monkeypatch: "pytest.MonkeyPatch"
+) -> None:
+    store = TaggedRedisStore(redis, namespace="test-release", lock_timeout=5)
+    monkeypatch.setattr(response_cache.response_cache_tags, "store", store)
+    middleware = ResponseCacheLockMiddleware()
+    renders = 0
+
+    async def handler(*_: Any) -> None:
+        nonlocal renders
+        assert await store.get("key") is None
+        renders += 1
+        await asyncio.sleep(0.2)
+        raise NotFoundException
+
+    async def request() -> None:
+        with pytest.raises(NotFoundException):
+            await middleware.handle({"type": "http"}, None, None, handler)  # type: ignore[arg-type]
+
+    started = time.monotonic()
+    await asyncio.gather(*(request() for _ in range(3)))
+    await request()
+    # the waiting requests render as soon as the lock is released, instead of when it expires
+    assert time.monotonic() - started < 2
+    assert renders == 4
+    assert not await redis.keys("test-release:lock:*")
+
+
+async def test_tagged_store_keeps_locks_taken_by_other_requests(redis: "Redis") -> None:
+    store = TaggedRedisStore(redis, namespace="test-lock-owner", lock_timeout=5)
+    assert await store.get("key") is None
+    # the lock expired while rendering, and another request took it
+    await redis.set("test-lock-owner:lock:key", b"other")
+    await store.set("key", b"rendered", expires_in=60)
+    assert await redis.get("test-lock-owner:lock:key") == b"other"
+    await redis.delete("test-lock-owner:key", "test-lock-owner:lock:key")
+    assert await store.get("key") is None
+    await store.set("key", b"rendered", expires_in=60)
+    assert not await redis.exists("test-lock-owner:lock:key")
+
+
+async def test_purge_deletes_tagged_entries(redis: "Redis") -> None:
+    store = TaggedRedisStore(redis, namespace="test-purge")
+    # more entries than a script can delete at once
+    keys = [f"test-purge:key-{index}" for index in range(1500)]
+    await redis.mset(dict.fromkeys([*keys, "test-purge:user-key"], b"cached"))
+    await redis.sadd("test-purge:tag:team", *keys)
+    await redis.sadd("test-purge:tag:team:1", *keys[1::2])
+    await redis.sadd("test-purge:tag:user", "test-purge:user-key")
+    await store.purge(["team"])
+    assert sorted(await redis.keys("test-purge:*")) == [
+        b"test-purge:tag:team:1",
+        b"test-purge:tag:user",
+        b"test-purge:user-key",
+    ]
+
+
+async def test_purge_is_repeated_once_replicas_caught_up(redis: "Redis") -> None:
+    store = TaggedRedisStore(redis, namespace="test-repurge")
+    tags = ResponseCacheTags(store, repurge_after=0.2)
+
+    async def cache(value: bytes) -> None:
+        response_cache._request_tags.set(("key", ("team:1",)))
+        await store.set("key", value, expires_in=60)
+
+    await cache(b"before the write")
+    await tags.purge({("team:1",)})
+    assert await store.get("key") is None
+    # a read from a lagging replica caches the data from before the write again
+    await cache(b"before the write")
+    await asyncio.sleep(0.3)
+    assert await store.get("key") is None
+    await cache(b"after the write")
+    await tags.purge({("team:1",)})
+    await cache(b"stale")
+    # pending purges run when the application shuts down
+    await tags.stop()
+    assert await store.get("key") is None
+
+
+def test_local_cache_evicts_least_recently_used() -> None:
+    cache: LocalCache[int] = LocalCache(max_size=2, expires_in=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert len(cache) == 2
+
+
+def test_local_cache_expiration() -> None:
+    cache: LocalCache[int] = LocalCache(max_size=2, expires_in=60)
+    cache.set("a", 1, expires_in=0)
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_local_cache_delete_where() -> None:
+    cache: LocalCache[int] = LocalCache(max_size=10, expires_in=60)
+    for value in range(5):
+        cache.set(str(value), value)
+    cache.delete_where(lambda value: value % 2 == 0)
+    assert [cache.get(str(value)) for value in range(5)] == [None, 1, None, 3, None]
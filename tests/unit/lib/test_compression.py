@@ -0,0 +1,60 @@
+import gzip
+from pathlib import Path
+
+import pytest
+from litestar import Litestar, get
+from litestar.testing import AsyncTestClient
+
+from app.lib.compression import CompressionMiddleware, negotiate, precompress, precompressed
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.mark.parametrize(
+    ("accept_encoding", "expected"),
+    [
+        ("gzip, br", "br"),
+        ("gzip;q=0, br;q=0.5", "br"),
+        ("br;q=0, gzip", "gzip"),
+        ("*", "br"),
+        ("gzip;q=0, *", "br"),
+        ("identity", None),
+        ("", None),
+    ],
+)
+def test_negotiate(accept_encoding: str, expected: str | None) -> None:
+    assert negotiate(accept_encoding, ["br", "gzip"]) == expected
+
+
+def test_precompress(tmp_path: Path) -> None:
+    (tmp_path / "app.js").write_text("console.log('hello');\n" * 100)
+    (tmp_path / "tiny.css").write_text("a{}")
+    (tmp_path / "logo.png").write_bytes(b"\x89PNG" * 500)
+
+    assert precompress(tmp_path, ["gzip"], minimum_size=500, excluded_media_types=["image/"]) == 1
+    assert gzip.decompress((tmp_path / "app.js.gz").read_bytes()) == (tmp_path / "app.js").read_bytes()
+    assert precompressed(tmp_path / "app.js") == {"gzip": tmp_path / "app.js.gz"}
+    assert not (tmp_path / "tiny.css.gz").exists()
+    assert not (tmp_path / "logo.png.gz").exists()
+    assert precompress(tmp_path, ["gzip"], minimum_size=500, excluded_media_types=["image/"]) == 0
+
+
+async def test_compression_middleware() -> None:
+    @get("/large")
+    async def large() -> str:
+        return "x" * 1000
+
+    @get("/small")
+    async def small() -> str:
+        return "x"
+
+    app = Litestar([large, small], middleware=[CompressionMiddleware(["gzip"], minimum_size=500)])
+    async with AsyncTestClient(app) as client:
+        response = await client.get("/large", headers={"Accept-Encoding": "gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["vary"] == "Accept-Encoding"
+        assert response.text == "x" * 1000
+        response = await client.get("/large", headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in response.headers
+        response = await client.get("/small", headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in response.headers
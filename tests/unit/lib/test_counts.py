@@ -0,0 +1,42 @@
+from uuid import uuid4
+
+import pytest
+from advanced_alchemy.filters import LimitOffset, OrderBy
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+
+from app.db import models as m
+from app.lib.counts import CountCache, _Explain, _filtered
+from app.lib.pagination import CursorFilter
+
+pytestmark = pytest.mark.anyio
+
+
+def test_filtered_ignores_ordering_and_pagination() -> None:
+    user_id = uuid4()
+    statement = _filtered(
+        m.Team,
+        [
+            CursorFilter(field_name="name", sort_order="asc", limit=20),
+            LimitOffset(limit=20, offset=40),
+            OrderBy(field_name="name", sort_order="asc"),
+            m.Team.id.in_(select(m.TeamMember.team_id).where(m.TeamMember.user_id == user_id)),
+        ],
+    )
+    sql = str(statement)
+    assert "ORDER BY" not in sql
+    assert "LIMIT" not in sql
+    assert "team_member.user_id" in sql
+
+
+def test_explain_binds_parameters() -> None:
+    statement = _filtered(m.Tag, [m.Tag.name == "python"])
+    sql = str(_Explain(statement).compile(dialect=postgresql.dialect()))
+    assert sql.startswith("EXPLAIN (FORMAT JSON) SELECT tag.id")
+    assert "%(name_1)s" in sql
+
+
+async def test_count_cache_without_redis() -> None:
+    cache = CountCache()
+    assert await cache.get(_filtered(m.Tag, [])) == (None, None)
+    await cache.invalidate({"tag"})
@@ -1,11 +1,15 @@
 # pylint: disable=protected-access
 from __future__ import annotations
 
+import asyncio
 import base64
+from concurrent.futures import BrokenExecutor, Future, ThreadPoolExecutor
+from typing import Any
 
 import pytest
 
 from app.lib import crypt
+from app.lib.exceptions import ServiceUnavailableError
 
 pytestmark = pytest.mark.anyio
 
@@ -52,3 +56,90 @@ async def test_verify_password(valid_password: str, tested_password: str, expect
     is_valid = await crypt.verify_password(tested_password, secret_str_hash)
 
     assert is_valid == expected_result
+
+
+@pytest.mark.parametrize("backend", ["thread", "process"])
+async def test_password_hasher_backends(backend: str) -> None:
+    """Test hashing and verification on each pool backend."""
+    hasher = crypt.PasswordHasher()
+    hasher.configure(backend=backend, max_workers=1, max_pending=4)
+    hasher.start()
+    try:
+        hashed = await hasher.run(crypt._hash, "SuperS3cret123456789!!")
+        assert await hasher.run(crypt._verify_and_update, "SuperS3cret123456789!!", hashed) == (True, None)
+    finally:
+        hasher.shutdown()
+    assert hasher.stats["completed"] == 2
+    assert hasher.stats["pending"] == 0
+
+
+async def test_password_hasher_rejects_when_saturated() -> None:
+    """Test that work beyond ``max_pending`` is rejected instead of queued."""
+    hasher = crypt.PasswordHasher(backend="thread", max_workers=1, max_pending=1)
+    hasher.pending = 1
+
+    with pytest.raises(ServiceUnavailableError):
+        await hasher.run(crypt._hash, "password")
+
+    assert hasher.stats["rejected"] == 1
+
+
+class _BrokenPool(ThreadPoolExecutor):
+    """A pool whose worker died: every operation fails once it was submitted."""
+
+    def submit(self, *_: Any, **__: Any) -> Future[Any]:
+        future: Future[Any] = Future()
+        future.set_exception(BrokenExecutor())
+        return future
+
+
+async def test_password_hasher_replaces_a_broken_pool_once(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that concurrent operations failing on a broken pool replace it once, and all succeed on the new one."""
+    hasher = crypt.PasswordHasher(backend="thread", max_workers=1, max_pending=4)
+    created: list[ThreadPoolExecutor] = []
+
+    def create_executor(_: crypt.PasswordHasher) -> ThreadPoolExecutor:
+        created.append(ThreadPoolExecutor(max_workers=1))
+        return created[-1]
+
+    monkeypatch.setattr(crypt.PasswordHasher, "_create_executor", create_executor)
+    hasher._executor = _BrokenPool(max_workers=1)
+    try:
+        assert await asyncio.gather(*(hasher.run(str.upper, name) for name in "abc")) == ["A", "B", "C"]
+    finally:
+        hasher.shutdown()
+    assert len(created) == 1
+    assert hasher.stats["completed"] == 3
+
+
+async def test_password_hasher_only_counts_successful_operations() -> None:
+    """Test that failed operations are not counted as completed."""
+    hasher = crypt.PasswordHasher(backend="thread", max_workers=1, max_pending=4)
+    with pytest.raises(ValueError, match="invalid literal"):
+        await hasher.run(int, "not a number")
+    assert await hasher.run(int, "42") == 42
+    assert hasher.stats["completed"] == 1
+    assert hasher.stats["pending"] == 0
+
+
+def test_password_hasher_rejects_unknown_backend() -> None:
+    with pytest.raises(ValueError, match="Unsupported"):
+        crypt.PasswordHasher().configure(backend="gpu", max_workers=1, max_pending=1)
+
+
+async def test_verify_and_update_password_upgrades_outdated_hash() -> None:
+    """Test that hashes made with previous argon2 parameters verify and come back with a replacement."""
+    policy = crypt.password_crypt_context.to_string()
+    hashed = await crypt.get_password_hash("SuperS3cret123456789!!")
+    try:
+        crypt.configure_password_context(memory_cost=19456, time_cost=2, parallelism=1)
+        assert crypt.password_needs_update(hashed)
+
+        valid, new_hash = await crypt.verify_and_update_password("SuperS3cret123456789!!", hashed)
+        assert valid
+        assert new_hash is not None
+        assert "m=19456,t=2,p=1" in new_hash
+        assert not crypt.password_needs_update(new_hash)
+        assert await crypt.verify_and_update_password("SuperS3cret123456789!!", new_hash) == (True, None)
+    finally:
+        crypt.password_crypt_context.load(policy)
@@ -9,6 +9,7 @@ from litestar.status_codes import (
     HTTP_404_NOT_FOUND,
     HTTP_409_CONFLICT,
     HTTP_500_INTERNAL_SERVER_ERROR,
+    HTTP_503_SERVICE_UNAVAILABLE,
 )
 from litestar.testing import RequestFactory, create_test_client
 
@@ -63,6 +64,8 @@ def test_repository_exception_to_http_response(exc: type[ApplicationError], stat
         (exceptions.AuthorizationError, HTTP_403_FORBIDDEN, True),
         (exceptions.AuthorizationError, HTTP_403_FORBIDDEN, False),
         (exceptions.ApplicationError, HTTP_500_INTERNAL_SERVER_ERROR, False),
+        (exceptions.ServiceUnavailableError, HTTP_503_SERVICE_UNAVAILABLE, True),
+        (exceptions.ServiceUnavailableError, HTTP_503_SERVICE_UNAVAILABLE, False),
     ],
 )
 def test_exception_to_http_response(exc: type[exceptions.ApplicationError], status: int, debug: bool) -> None:
@@ -0,0 +1,68 @@
+import asyncio
+from typing import Any
+
+import pytest
+
+from app.lib.health import Check, CheckFailedError, Readiness
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_readiness_runs_checks_once_per_window() -> None:
+    calls = 0
+
+    async def probe() -> dict[str, Any]:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"calls": calls}
+
+    readiness = Readiness({"database": Check(probe)}, expires_in=60)
+    reports = await asyncio.gather(*(readiness.report() for _ in range(10)))
+    assert calls == 1
+    assert all(report is reports[0] for report in reports)
+    assert reports[0].ready
+    assert reports[0].checks["database"].details == {"calls": 1}
+
+    assert await readiness.report() is reports[0]
+    readiness.clear()
+    await readiness.report()
+    assert calls == 2
+
+
+async def test_readiness_checks_concurrently_with_timeout() -> None:
+    async def hung() -> dict[str, Any]:
+        await asyncio.sleep(10)
+        return {}
+
+    async def fine() -> dict[str, Any]:
+        return {}
+
+    readiness = Readiness({"database": Check(hung), "cache": Check(fine)}, timeout=0.05)
+    report = await asyncio.wait_for(readiness.report(), 1)
+    assert not report.ready
+    assert report.checks["database"].status == "offline"
+    assert report.checks["database"].error == "Timed out after 0.05s"
+    assert report.checks["cache"].status == "online"
+
+
+async def test_readiness_ignores_non_critical_failures() -> None:
+    async def idle() -> dict[str, Any]:
+        msg = "No live worker on default"
+        raise CheckFailedError(msg, {"default": {"workers": 0}})
+
+    async def broken() -> dict[str, Any]:
+        msg = "could not connect to db.internal:5432"
+        raise OSError(msg)
+
+    readiness = Readiness({"workers": Check(idle, critical=False)})
+    report = await readiness.report()
+    assert report.ready
+    assert report.checks["workers"].status == "offline"
+    assert report.checks["workers"].error == "No live worker on default"
+    assert report.checks["workers"].details == {"default": {"workers": 0}}
+
+    readiness = Readiness({"database": Check(broken)})
+    report = await readiness.report()
+    assert not report.ready
+    assert report.checks["database"].error == "OSError"
@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+from typing import Any
+
+import pytest
+from sqlalchemy.orm import Session
+
+from app.lib import invalidation
+
+pytestmark = pytest.mark.anyio
+
+
+class Change:
+    def __init__(self, key: str) -> None:
+        self.key = key
+
+
+received: list[set[Any]] = []
+
+
+@invalidation.on_commit(Change, lambda change: change.key)
+async def handler(keys: set[Any]) -> None:
+    received.append(keys)
+
+
+def _commit(*keys: str) -> None:
+    with Session() as session:
+        invalidation.record(session, [Change(key) for key in keys])
+        session.commit()
+
+
+async def test_handlers_only_run_on_started_loops() -> None:
+    invalidation.listen()
+    received.clear()
+    _commit("ignored")
+    async with invalidation.dispatching():
+        _commit("a", "b")
+    _commit("after")
+    await invalidation.drain()
+    assert received == [{"a", "b"}]
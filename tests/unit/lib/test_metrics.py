@@ -0,0 +1,103 @@
+from typing import TYPE_CHECKING
+from uuid import uuid4
+
+import pytest
+from litestar import Litestar, get
+from litestar.exceptions import NotAuthorizedException
+from litestar.testing import AsyncTestClient
+
+from app.config.base import get_settings
+from app.domain.system.guards import requires_metrics_token
+from app.lib.metrics import Histogram, Registry, RequestMetricsMiddleware
+
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
+
+pytestmark = pytest.mark.anyio
+
+
+def test_histogram() -> None:
+    histogram = Histogram(buckets=(0.1, 1.0))
+    for seconds in (0.05, 0.5, 0.7, 3.0):
+        histogram.observe(seconds)
+    assert histogram.count == 4
+    assert histogram.sum == pytest.approx(4.25)
+    assert histogram.cumulative() == [(0.1, 1), (1.0, 3), (float("inf"), 4)]
+
+
+async def test_registry_adds_up_processes(redis: "Redis") -> None:
+    namespace = f"test-metrics-{uuid4().hex}"
+    first = Registry(namespace=namespace, redis=redis)
+    second = Registry(namespace=namespace, redis=redis)
+    first.collectors.append(lambda: [("db_pool_size", {}, 5)])
+    second.collectors.append(lambda: [("db_pool_size", {}, 5)])
+    for registry in (first, second):
+        registry.inc("saq_jobs_total", queue="tasks", function="job", status="complete")
+        registry.observe("saq_job_duration_seconds", 2.0, (1.0, 5.0), queue="tasks", function="job")
+    await first.publish()
+    await second.publish()
+    text = await first.render([("saq_queue_jobs", {"queue": "tasks", "state": "queued"}, 3)])
+    lines = text.splitlines()
+    assert "# TYPE saq_jobs_total counter" in lines
+    assert 'saq_jobs_total{function="job",queue="tasks",status="complete"} 2' in lines
+    assert 'saq_job_duration_seconds_bucket{function="job",queue="tasks",le="1"} 0' in lines
+    assert 'saq_job_duration_seconds_bucket{function="job",queue="tasks",le="+Inf"} 2' in lines
+    assert 'saq_queue_jobs{queue="tasks",state="queued"} 3' in lines
+    # both registries run in this process, so they publish the gauges of the same worker
+    assert "db_pool_size 5" in lines
+
+
+async def test_request_metrics() -> None:
+    @get("/items/{item_id:int}")
+    async def item(item_id: int) -> int:
+        return item_id
+
+    @get("/denied")
+    async def denied() -> None:
+        raise NotAuthorizedException
+
+    registry = Registry()
+    async with AsyncTestClient(Litestar([item, denied], middleware=[RequestMetricsMiddleware(registry)])) as client:
+        await client.get("/items/1")
+        await client.get("/items/2")
+        await client.get("/denied")
+    assert registry._counters == {
+        ("http_requests_total", (("method", "GET"), ("route", "/items/{item_id}"), ("status", "200"))): 2,
+        ("http_requests_total", (("method", "GET"), ("route", "/denied"), ("status", "401"))): 1,
+    }
+
+
+async def test_collect_does_not_write(redis: "Redis") -> None:
+    registry = Registry(namespace=f"test-metrics-{uuid4().hex}", redis=redis)
+    registry.inc("saq_jobs_total", queue="tasks", function="job", status="complete")
+    assert await registry.collect() == []
+    assert await redis.keys(f"{registry.namespace}:*") == []
+    await registry.publish()
+    assert await registry.collect() == [
+        ("saq_jobs_total", {"function": "job", "queue": "tasks", "status": "complete"}, 1),
+    ]
+
+
+@pytest.mark.parametrize(
+    ("token", "authorization", "status_code"),
+    [
+        ("secret", "Bearer secret", 200),
+        ("secret", "bearer secret", 200),
+        ("secret", "Bearer wrong", 401),
+        ("secret", None, 401),
+        ("", "Bearer ", 401),
+        ("", None, 401),
+    ],
+)
+async def test_metrics_token(
+    monkeypatch: pytest.MonkeyPatch, token: str, authorization: "str | None", status_code: int
+) -> None:
+    @get("/metrics", guards=[requires_metrics_token])
+    async def scrape() -> str:
+        return ""
+
+    monkeypatch.setattr(get_settings().metrics, "TOKEN", token)
+    headers = {"Authorization": authorization} if authorization is not None else {}
+    async with AsyncTestClient(Litestar([scrape])) as client:
+        response = await client.get("/metrics", headers=headers)
+    assert response.status_code == status_code
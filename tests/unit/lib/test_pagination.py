@@ -0,0 +1,76 @@
+from uuid import uuid4
+
+import pytest
+from litestar.exceptions import ValidationException
+from sqlalchemy import select
+
+from app.db import models as m
+from app.lib.deps import PAGINATION_DEPENDENCY_KEY, create_filter_dependencies
+from app.lib.pagination import CountedLimitOffset, CursorFilter
+
+
+def test_cursor_filter_orders_nullable_columns_last() -> None:
+    statement = CursorFilter(field_name="name", sort_order="asc", limit=20).append_to_statement(
+        select(m.User.id),
+        m.User,
+    )
+    sql = str(statement)
+    assert "ORDER BY user_account.name ASC NULLS LAST, user_account.id ASC" in sql
+    assert "WHERE" not in sql
+
+
+def test_cursor_filter_continues_after_cursor() -> None:
+    first_page = CursorFilter(field_name="name", sort_order="desc", limit=20)
+    cursor = first_page.next_cursor(m.Tag(id=uuid4(), name="python", slug="python"))
+    statement = CursorFilter(field_name="name", sort_order="desc", limit=20, cursor=cursor).append_to_statement(
+        select(m.Tag.id),
+        m.Tag,
+    )
+    assert "WHERE (tag.name, tag.id) < (" in str(statement)
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", "WyJuYW1lIl0"])
+def test_cursor_filter_rejects_invalid_cursor(cursor: str) -> None:
+    with pytest.raises(ValidationException):
+        CursorFilter(field_name="name", sort_order="asc", limit=20, cursor=cursor)
+
+
+def test_cursor_filter_rejects_cursor_for_another_order() -> None:
+    cursor = CursorFilter(field_name="name", sort_order="asc", limit=20).next_cursor(m.Tag(id=uuid4(), name="a"))
+    with pytest.raises(ValidationException):
+        CursorFilter(field_name="name", sort_order="desc", limit=20, cursor=cursor)
+
+
+def test_cursor_filter_rejects_unknown_field() -> None:
+    with pytest.raises(ValidationException):
+        CursorFilter(field_name="password", sort_order="asc", limit=20).append_to_statement(select(m.User.id), m.User)
+
+
+def test_pagination_defaults_to_limit_offset() -> None:
+    dependencies = create_filter_dependencies({"cursor_pagination": True, "sort_field": "name"})
+    provide = dependencies[PAGINATION_DEPENDENCY_KEY].dependency
+    defaults = {"page_size": 20, "field_name": "name", "sort_order": "asc", "include_total": False}
+    limit_offset, _ = provide(pagination_type="limit_offset", cursor=None, current_page=3, **defaults)
+    assert isinstance(limit_offset, CountedLimitOffset)
+    assert limit_offset.offset == 40
+    [keyset] = provide(pagination_type="cursor", cursor=None, current_page=1, **defaults)
+    assert isinstance(keyset, CursorFilter)
+
+
+def test_cursor_pagination_only_orders_by_allowed_fields() -> None:
+    dependencies = create_filter_dependencies(
+        {"cursor_pagination": True, "sort_field": "name", "sort_fields": ("created_at",)},
+    )
+    provide = dependencies[PAGINATION_DEPENDENCY_KEY].dependency
+    defaults = {
+        "pagination_type": "cursor",
+        "cursor": None,
+        "current_page": 1,
+        "page_size": 20,
+        "sort_order": "asc",
+        "include_total": False,
+    }
+    assert provide(field_name="name", **defaults)[0].field_name == "name"
+    assert provide(field_name="created_at", **defaults)[0].field_name == "created_at"
+    with pytest.raises(ValidationException):
+        provide(field_name="hashed_password", **defaults)
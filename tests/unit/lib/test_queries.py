@@ -0,0 +1,49 @@
+from collections.abc import AsyncGenerator
+
+import pytest
+from litestar import Litestar, get
+from litestar.testing import AsyncTestClient
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from app.config import constants
+from app.lib.queries import QueryTrackingMiddleware, current_stats, instrument
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture(name="engine")
+async def fx_engine() -> AsyncGenerator[AsyncEngine, None]:
+    # before the engine exists, as engines created or replaced later are counted too
+    instrument()
+    engine = create_async_engine("sqlite+aiosqlite://")
+    yield engine
+    await engine.dispose()
+
+
+def _app(engine: AsyncEngine, middleware: QueryTrackingMiddleware) -> Litestar:
+    @get("/items", opt={constants.QUERY_BUDGET: 2})
+    async def items() -> int:
+        async with engine.connect() as connection:
+            for _ in range(3):
+                await connection.execute(text("SELECT 1"))
+        stats = current_stats()
+        assert stats is not None
+        return stats.count
+
+    return Litestar([items], middleware=[middleware])
+
+
+async def test_query_tracking(engine: AsyncEngine) -> None:
+    async with AsyncTestClient(_app(engine, QueryTrackingMiddleware(repeated_threshold=3))) as client:
+        response = await client.get("/items")
+        assert response.status_code == 200
+        assert response.json() == 3
+        assert response.headers["server-timing"].startswith("db;dur=")
+        assert response.headers["server-timing"].endswith('desc="3 queries"')
+
+
+async def test_query_budget_strict(engine: AsyncEngine) -> None:
+    async with AsyncTestClient(_app(engine, QueryTrackingMiddleware(strict=True))) as client:
+        response = await client.get("/items")
+        assert response.status_code == 500
@@ -0,0 +1,144 @@
+from collections.abc import AsyncGenerator
+from pathlib import Path
+
+import pytest
+from litestar import Litestar, get, post
+from litestar.testing import AsyncTestClient
+from sqlalchemy import column, insert, select, table, text
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+
+from app.config import constants
+from app.lib import replicas as replicas_module
+from app.lib.replicas import (
+    ReplicaRoutingMiddleware,
+    ReplicaSet,
+    RoutingSession,
+    is_read_only_request,
+    read_only,
+)
+
+pytestmark = pytest.mark.anyio
+
+item = table("item", column("name"))
+
+
+async def _database(path: Path, name: str) -> AsyncEngine:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    async with engine.begin() as connection:
+        await connection.execute(text("CREATE TABLE item (name TEXT)"))
+        await connection.execute(insert(item).values(name=name))
+    return engine
+
+
+@pytest.fixture(name="replica_set")
+async def fx_replica_set(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> AsyncGenerator[ReplicaSet, None]:
+    replica_set = ReplicaSet([await _database(tmp_path / "replica.sqlite3", "replica")])
+    monkeypatch.setattr(replicas_module, "replicas", replica_set)
+    yield replica_set
+    await replica_set.stop()
+
+
+@pytest.fixture(name="sessionmaker")
+async def fx_sessionmaker(tmp_path: Path) -> AsyncGenerator[async_sessionmaker, None]:
+    primary = await _database(tmp_path / "primary.sqlite3", "primary")
+    yield async_sessionmaker(primary, sync_session_class=RoutingSession)
+    await primary.dispose()
+
+
+async def test_reads_go_to_fresh_replicas(replica_set: ReplicaSet, sessionmaker: async_sessionmaker) -> None:
+    async with sessionmaker() as session:
+        with read_only():
+            # not measured yet
+            assert await session.scalar(select(item.c.name)) == "primary"
+    await replica_set.start()
+    async with sessionmaker() as session:
+        assert await session.scalar(select(item.c.name)) == "primary"
+        with read_only():
+            assert await session.scalar(select(item.c.name)) == "replica"
+            with read_only(False):
+                assert await session.scalar(select(item.c.name)) == "primary"
+    assert replica_set.stats == {"replicas": 1, "fresh": 1, "reads": 1, "fallbacks": 1}
+
+
+async def test_read_only_blocks_reading_from_the_primary(
+    replica_set: ReplicaSet, sessionmaker: async_sessionmaker
+) -> None:
+    await replica_set.start()
+    async with sessionmaker() as session:
+        with read_only(replica=False):
+            assert await session.scalar(select(item.c.name)) == "primary"
+        with read_only():
+            assert await session.scalar(select(item.c.name)) == "replica"
+    assert replica_set.stats["reads"] == 1
+
+
+def test_is_read_only_request() -> None:
+    @get("/")
+    async def read() -> None: ...
+
+    @get("/", opt={constants.READ_ONLY: False})
+    async def write() -> None: ...
+
+    @post("/", opt={constants.READ_ONLY: True})
+    async def search() -> None: ...
+
+    assert is_read_only_request({"type": "http", "method": "GET", "route_handler": read})  # type: ignore[typeddict-item]
+    assert is_read_only_request({"type": "http", "method": "HEAD"})  # type: ignore[typeddict-item]
+    assert not is_read_only_request({"type": "http", "method": "GET", "route_handler": write})  # type: ignore[typeddict-item]
+    assert not is_read_only_request({"type": "http", "method": "POST"})  # type: ignore[typeddict-item]
+    assert is_read_only_request({"type": "http", "method": "POST", "route_handler": search})  # type: ignore[typeddict-item]
+    assert not is_read_only_request({"type": "websocket"})  # type: ignore[typeddict-item]
+
+
+async def test_reads_stick_to_primary_after_a_write(replica_set: ReplicaSet, sessionmaker: async_sessionmaker) -> None:
+    await replica_set.start()
+
+    async def names() -> list[str]:
+        with read_only():
+            return list(await session.scalars(select(item.c.name)))
+
+    async with sessionmaker() as session:
+        assert await names() == ["replica"]
+        await session.execute(insert(item).values(name="written"))
+        assert await names() == ["primary", "written"]
+
+
+async def test_stale_replicas_are_skipped(replica_set: ReplicaSet, sessionmaker: async_sessionmaker) -> None:
+    replica_set.max_staleness = -1
+    await replica_set.start()
+    async with sessionmaker() as session:
+        with read_only():
+            assert await session.scalar(select(item.c.name)) == "primary"
+    assert replica_set.stats["fresh"] == 0
+    assert replica_set.stats["fallbacks"] == 1
+
+
+async def test_routing_middleware(replica_set: ReplicaSet, sessionmaker: async_sessionmaker) -> None:
+    await replica_set.start()
+
+    async def name() -> str:
+        async with sessionmaker() as session:
+            return str(await session.scalar(select(item.c.name)))
+
+    @get("/name")
+    async def get_name() -> str:
+        return await name()
+
+    @get("/primary", opt={constants.READ_ONLY: False})
+    async def get_primary() -> str:
+        return await name()
+
+    @post("/name", status_code=200)
+    async def post_name() -> str:
+        return await name()
+
+    @post("/search", status_code=200, opt={constants.READ_ONLY: True})
+    async def search() -> str:
+        return await name()
+
+    app = Litestar([get_name, get_primary, post_name, search], middleware=[ReplicaRoutingMiddleware()])
+    async with AsyncTestClient(app) as client:
+        assert (await client.get("/name")).text == "replica"
+        assert (await client.get("/primary")).text == "primary"
+        assert (await client.post("/name")).text == "primary"
+        assert (await client.post("/search")).text == "replica"
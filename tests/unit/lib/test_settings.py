@@ -1,6 +1,13 @@
+from pathlib import Path
+
 import pytest
+from sqlalchemy import event, text
 
 from app.config import get_settings
+from app.config._utils import get_config_val
+from app.config.base import DatabaseSettings, RedisSettings
+from app.lib.metrics import InstrumentedRedis
+from app.lib.replicas import read_only
 
 pytestmark = pytest.mark.anyio
 
@@ -10,3 +17,55 @@ def test_app_slug() -> None:
     settings = get_settings()
     settings.app.NAME = "My Application!"
     assert settings.app.slug == "my-application"
+
+
+def test_path_setting(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test paths read from the environment are parsed as paths."""
+    monkeypatch.setenv("TEST_PATH_SETTING", "dist/public")
+    assert get_config_val("TEST_PATH_SETTING", Path("public")) == Path("dist/public")
+
+
+def test_pgbouncer_disables_prepared_statement_caches() -> None:
+    """Test PgBouncer mode disables both statement caches and names prepared statements uniquely."""
+    settings = DatabaseSettings(PREPARED_STATEMENT_CACHE_SIZE=250, STATEMENT_CACHE_SIZE=50)
+    assert settings._asyncpg_connect_args() == {"prepared_statement_cache_size": 250, "statement_cache_size": 50}
+    settings.PGBOUNCER = True
+    connect_args = settings._asyncpg_connect_args()
+    assert connect_args["prepared_statement_cache_size"] == 0
+    assert connect_args["statement_cache_size"] == 0
+    name_func = connect_args["prepared_statement_name_func"]
+    assert name_func() != name_func()
+
+
+async def test_redis_client_is_only_instrumented_on_demand() -> None:
+    """Test Redis commands are only timed when metrics are recorded."""
+    settings = RedisSettings()
+    async with settings.get_client() as client:
+        assert not isinstance(client, InstrumentedRedis)
+    async with settings.get_client(instrumented=True) as client:
+        assert isinstance(client, InstrumentedRedis)
+
+
+async def test_sqlite_profile(tmp_path: Path) -> None:
+    """Test the SQLite profile is applied to new connections, and read-only transactions are deferred."""
+    engine = DatabaseSettings(URL=f"sqlite+aiosqlite:///{tmp_path}/db.sqlite3", SQLITE_BUSY_TIMEOUT=1234).get_engine()
+    begins: list[str] = []
+    event.listen(
+        engine.sync_engine,
+        "before_cursor_execute",
+        lambda *args: begins.append(args[2]) if args[2].startswith("BEGIN") else None,
+    )
+    async with engine.begin() as connection:
+        assert await connection.scalar(text("PRAGMA journal_mode")) == "wal"
+        assert await connection.scalar(text("PRAGMA busy_timeout")) == 1234
+    with read_only():
+        async with engine.begin() as connection:
+            await connection.execute(text("SELECT 1"))
+    with read_only(replica=False):
+        async with engine.begin() as connection:
+            await connection.execute(text("SELECT 1"))
+    await engine.dispose()
+    assert begins == ["BEGIN IMMEDIATE", "BEGIN", "BEGIN"]
+
+    with pytest.raises(ValueError, match="SQLITE_SYNCHRONOUS"):
+        DatabaseSettings(SQLITE_SYNCHRONOUS="fast")
@@ -0,0 +1,61 @@
+from pathlib import Path
+
+import msgspec
+import pytest
+from litestar import Litestar, Request, get
+from litestar.contrib.jinja import JinjaTemplateEngine
+from litestar.template import TemplateConfig
+from litestar.testing import AsyncTestClient
+from litestar_vite import ViteConfig, VitePlugin
+
+from app.lib.shell import ShellCache, preload_links
+
+pytestmark = pytest.mark.anyio
+
+MANIFEST = {
+    "resources/main.tsx": {
+        "file": "assets/main-4f2a1c.js",
+        "src": "resources/main.tsx",
+        "isEntry": True,
+        "imports": ["_vendor-8c1d2e.js"],
+        "css": ["assets/main-9b3e7d.css"],
+    },
+    "_vendor-8c1d2e.js": {"file": "assets/vendor-8c1d2e.js"},
+    "resources/lazy.tsx": {"file": "assets/lazy-1a2b3c.js", "isDynamicEntry": True},
+}
+
+
+def test_preload_links(tmp_path: Path) -> None:
+    (tmp_path / "manifest.json").write_bytes(msgspec.json.encode(MANIFEST))
+
+    assert preload_links(tmp_path / "manifest.json", "/static/") == (
+        "</static/assets/main-4f2a1c.js>; rel=modulepreload, "
+        "</static/assets/vendor-8c1d2e.js>; rel=modulepreload, "
+        "</static/assets/main-9b3e7d.css>; rel=preload; as=style"
+    )
+    assert preload_links(tmp_path / "missing.json", "/static/") is None
+
+
+async def test_shell_cache(tmp_path: Path) -> None:
+    (tmp_path / "templates").mkdir()
+    (tmp_path / "templates" / "index.html.j2").write_text("<html>{{ vite('resources/main.tsx') }}</html>")
+    (tmp_path / "manifest.json").write_bytes(msgspec.json.encode(MANIFEST))
+    shell = ShellCache("index.html.j2")
+
+    @get("/")
+    async def index(request: Request) -> bytes:
+        return shell.get(request).body
+
+    app = Litestar(
+        [index],
+        plugins=[VitePlugin(ViteConfig(bundle_dir=tmp_path, dev_mode=False, set_static_folders=False))],
+        template_config=TemplateConfig(engine=JinjaTemplateEngine(directory=tmp_path / "templates")),
+    )
+    async with AsyncTestClient(app) as client:
+        response = await client.get("/")
+        assert "/static/assets/main-4f2a1c.js" in response.text
+        rendered = shell._shell
+        assert rendered is not None
+        assert rendered.link is not None
+        await client.get("/")
+        assert shell._shell is rendered
@@ -0,0 +1,46 @@
+from collections.abc import AsyncGenerator
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from app.lib.statement_cache import StatementCaches
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture(name="engine")
+async def fx_engine() -> AsyncGenerator[AsyncEngine, None]:
+    engine = create_async_engine("sqlite+aiosqlite://", query_cache_size=10)
+    yield engine
+    await engine.dispose()
+
+
+async def test_compiled_cache_hits(engine: AsyncEngine) -> None:
+    caches = StatementCaches()
+    caches.track("primary", lambda: engine)
+    caches.track("primary", lambda: engine)
+    async with engine.connect() as connection:
+        for _ in range(3):
+            await connection.execute(text("SELECT 1"))
+        await connection.exec_driver_sql("SELECT 2")
+    stats = caches.cache("primary").stats
+    assert stats["compiled_misses"] == 1
+    assert stats["compiled_hits"] == 2
+    assert stats["compiled_hit_rate"] == 0.6667
+    assert stats["compiled_capacity"] == 10
+    # the sqlite dialect does not prepare statements
+    assert stats["prepared_hits"] == stats["prepared_misses"] == 0
+    assert caches.stats["primary_compiled_hits"] == 2
+
+
+async def test_tracked_engine_is_looked_up_when_read(engine: AsyncEngine) -> None:
+    caches = StatementCaches()
+    engines = [engine]
+    caches.track("primary", lambda: engines[-1])
+    replacement = create_async_engine("sqlite+aiosqlite://")
+    engines.append(replacement)
+    async with replacement.connect() as connection:
+        await connection.execute(text("SELECT 1"))
+    assert caches.stats["primary_compiled_misses"] == 1
+    await replacement.dispose()
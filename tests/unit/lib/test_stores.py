@@ -0,0 +1,92 @@
+import asyncio
+from typing import TYPE_CHECKING
+
+import pytest
+from litestar.stores.redis import RedisStore
+
+from app.lib import response_cache
+from app.lib.response_cache import ResponseCacheTags, TaggedRedisStore
+from app.lib.stores import LayeredStore
+
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
+
+pytestmark = pytest.mark.anyio
+
+
+async def _subscribed(*stores: LayeredStore) -> None:
+    for store in stores:
+        await store.start()
+    for _ in range(100):
+        if all(store.channel.subscribed for store in stores):
+            return
+        await asyncio.sleep(0.01)
+
+
+async def test_layered_store_tiers(redis: "Redis") -> None:
+    store = LayeredStore(RedisStore(redis, namespace="test-layered"), redis, channel="test-layered")
+    await _subscribed(store)
+    try:
+        assert await store.get("key") is None
+        await store.set("key", b"value", expires_in=60)
+        assert await store.get("key") == b"value"
+        assert store.stats == {"local_hits": 1, "remote_hits": 0, "misses": 1, "local_size": 1}
+    finally:
+        await store.stop()
+
+
+async def test_layered_store_broadcasts_writes(redis: "Redis") -> None:
+    remote = RedisStore(redis, namespace="test-layered-broadcast")
+    first = LayeredStore(remote, redis, channel="test-layered-broadcast")
+    second = LayeredStore(remote, redis, channel="test-layered-broadcast")
+    await _subscribed(first, second)
+    try:
+        await first.set("key", b"old")
+        assert await second.get("key") == b"old"
+        await first.set("key", b"new")
+        await asyncio.sleep(0.1)
+        assert await second.get("key") == b"new"
+        await first.invalidate()
+        await asyncio.sleep(0.1)
+        assert second.stats["local_size"] == 0
+    finally:
+        await first.stop()
+        await second.stop()
+
+
+async def test_layered_store_only_keeps_fresh_responses(redis: "Redis") -> None:
+    remote = TaggedRedisStore(redis, namespace="test-layered-fresh", stale_for=60, lock_timeout=5)
+    store = LayeredStore(remote, redis, channel="test-layered-fresh", expires_in=60)
+    await _subscribed(store)
+    try:
+        await store.set("key", b"value", expires_in=1)
+        assert store.stats["local_size"] == 0
+        assert await store.get("key") == b"value"
+        assert await store.get("key") == b"value"
+        assert store.stats["local_hits"] == 1
+        await asyncio.sleep(1.1)
+        # the first read of the stale entry takes the refresh lock, the next ones are served stale
+        assert await store.get("key") is None
+        assert await store.get("key") == b"value"
+        assert store.stats["local_size"] == 0
+        assert remote.stats == {"hits": 1, "stale_hits": 1, "misses": 1, "coalesced": 0}
+    finally:
+        await store.stop()
+
+
+async def test_purge_drops_responses_from_every_memory_tier(redis: "Redis") -> None:
+    remote = TaggedRedisStore(redis, namespace="test-layered-purge")
+    first = LayeredStore(remote, redis, channel="test-layered-purge")
+    second = LayeredStore(remote, redis, channel="test-layered-purge")
+    await _subscribed(first, second)
+    try:
+        response_cache._request_tags.set(("key", ("team",)))
+        await first.set("key", b"value", expires_in=60)
+        assert await second.get("key") == b"value"
+        assert second.stats["local_size"] == 1
+        await ResponseCacheTags(remote, local=first).purge({("team",)})
+        await asyncio.sleep(0.1)
+        assert await second.get("key") is None
+    finally:
+        await first.stop()
+        await second.stop()
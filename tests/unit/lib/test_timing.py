@@ -0,0 +1,46 @@
+from collections.abc import AsyncGenerator
+
+import pytest
+from litestar import Litestar, get
+from litestar.di import Provide
+from litestar.testing import AsyncTestClient
+
+from app.lib import timing
+from app.lib.timing import ServerTimingMiddleware, phase, timed
+
+pytestmark = pytest.mark.anyio
+
+
+@timed("di")
+async def provide_value() -> AsyncGenerator[int, None]:
+    yield 1
+
+
+def _app(sample_rate: float) -> Litestar:
+    @get("/")
+    async def index(value: int) -> int:
+        with phase("work"):
+            return value
+
+    return Litestar(
+        [index],
+        dependencies={"value": Provide(provide_value)},
+        middleware=[ServerTimingMiddleware(sample_rate=sample_rate)],
+        before_request=timing.before_request,
+        after_request=timing.after_request,
+    )
+
+
+async def test_server_timing() -> None:
+    async with AsyncTestClient(_app(1.0)) as client:
+        response = await client.get("/")
+    assert response.json() == 1
+    phases = [entry.partition(";")[0] for entry in response.headers["server-timing"].split(", ")]
+    assert phases == ["di", "work", "handler", "serialize", "app"]
+
+
+async def test_server_timing_not_sampled() -> None:
+    async with AsyncTestClient(_app(0.0)) as client:
+        response = await client.get("/")
+    assert response.json() == 1
+    assert "server-timing" not in response.headers
@@ -0,0 +1,80 @@
+from collections.abc import AsyncGenerator
+from pathlib import Path
+
+import pytest
+from sqlalchemy import column, event, select, table, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.lib.replicas import is_read_only
+from app.lib.statement_cache import StatementCaches
+from app.lib.warmup import PoolWarmup
+
+pytestmark = pytest.mark.anyio
+
+item = table("item", column("name"))
+
+
+@pytest.fixture(name="engine")
+async def fx_engine(tmp_path: Path) -> AsyncGenerator[AsyncEngine, None]:
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'warmup.sqlite3'}", poolclass=AsyncAdaptedQueuePool, pool_size=3
+    )
+    async with engine.begin() as connection:
+        await connection.execute(text("CREATE TABLE item (name TEXT)"))
+    await engine.dispose()
+    yield engine
+    await engine.dispose()
+
+
+async def test_warm_opens_the_pool_and_compiles_the_queries(engine: AsyncEngine) -> None:
+    caches = StatementCaches()
+    caches.track("primary", lambda: engine)
+    warmup = PoolWarmup([("primary", lambda: engine)])
+    sessions: set[AsyncSession] = set()
+
+    @warmup.query
+    async def names(db_session: AsyncSession) -> None:
+        sessions.add(db_session)
+        await db_session.execute(select(item.c.name).where(item.c.name == "missing"))
+
+    assert await warmup.warm(engine) == 3
+    pool = engine.sync_engine.pool
+    assert isinstance(pool, QueuePool)
+    assert pool.checkedin() == 3
+    assert pool.checkedout() == 0
+    assert len(sessions) == 3
+    stats = caches.cache("primary").stats
+    # compiled by the first connection, cached for the others
+    assert stats["compiled_hits"] == 2 * 3 - 2
+
+
+async def test_warm_runs_read_only_transactions(engine: AsyncEngine) -> None:
+    warmup = PoolWarmup()
+    begins: list[bool] = []
+    # as the SQLite listener of DatabaseSettings, which begins immediate transactions unless read-only
+    event.listen(engine.sync_engine, "begin", lambda _: begins.append(is_read_only()))
+
+    @warmup.query
+    async def names(db_session: AsyncSession) -> None:
+        await db_session.execute(select(item.c.name))
+
+    assert await warmup.warm(engine) == 3
+    assert begins == [True] * 3
+
+
+async def test_run_survives_a_failed_query(engine: AsyncEngine) -> None:
+    warmup = PoolWarmup([("primary", lambda: engine)])
+
+    @warmup.query
+    async def broken(db_session: AsyncSession) -> None:
+        await db_session.execute(text("SELECT * FROM missing"))
+
+    await warmup.run()
+    assert engine.sync_engine.pool.checkedout() == 0  # type: ignore[attr-defined]
+
+
+async def test_warm_skips_engines_without_pool() -> None:
+    engine = create_async_engine("sqlite+aiosqlite://")
+    assert await PoolWarmup().warm(engine) == 0
+    await engine.dispose()
@@ -0,0 +1,160 @@
+"""Compare SQLite profiles under concurrent reads and writes.
+
+Each profile runs the same workload against a fresh database file: writers run short transactions reading a row, then
+updating it and inserting another one, while readers run indexed lookups and an aggregate, marked read-only like
+``GET`` requests. The engines are created from :class:`~app.config.base.DatabaseSettings`, so the profile is applied
+as in the application.
+
+Usage::
+
+    uv run python tools/benchmark_sqlite.py --duration 10 --writers 4 --readers 16
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncEngine
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / "src"))
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+import app.config  # noqa: E402, F401  # loads the settings module before the library modules it imports
+from app.config.base import DatabaseSettings  # noqa: E402
+from app.lib.replicas import read_only  # noqa: E402
+
+PROFILES: dict[str, dict[str, Any]] = {
+    "default": {
+        "SQLITE_JOURNAL_MODE": "DELETE",
+        "SQLITE_SYNCHRONOUS": "FULL",
+        "SQLITE_MMAP_SIZE": 0,
+        "SQLITE_CACHE_SIZE": -2000,
+        "SQLITE_TEMP_STORE": "DEFAULT",
+        "SQLITE_BUSY_TIMEOUT": 5000,
+        "SQLITE_BEGIN_IMMEDIATE": False,
+    },
+    "tuned-deferred": {"SQLITE_BEGIN_IMMEDIATE": False},
+    "tuned": {},
+}
+"""Settings overriding the defaults of :class:`DatabaseSettings`.
+
+``default`` is SQLite's own configuration, with the 5 second busy timeout of the ``sqlite3`` module.
+"""
+
+
+@dataclass
+class Result:
+    latencies: dict[str, list[float]] = field(default_factory=lambda: {"read": [], "write": []})
+    errors: dict[str, int] = field(default_factory=lambda: {"read": 0, "write": 0})
+
+
+async def _setup(engine: AsyncEngine, rows: int) -> None:
+    async with engine.begin() as connection:
+        await connection.execute(
+            text("CREATE TABLE item (id INTEGER PRIMARY KEY, owner INTEGER NOT NULL, name TEXT, value INTEGER)"),
+        )
+        await connection.execute(text("CREATE INDEX ix_item_owner ON item (owner)"))
+        await connection.execute(
+            text("INSERT INTO item (owner, name, value) VALUES (:owner, :name, :value)"),
+            [{"owner": i % 100, "name": f"item {i}", "value": i} for i in range(rows)],
+        )
+
+
+async def _write(engine: AsyncEngine, rows: int) -> None:
+    # read, then write, as the ORM does when updating a loaded row
+    async with engine.begin() as connection:
+        item_id = random.randrange(1, rows)  # noqa: S311
+        value = await connection.scalar(text("SELECT value FROM item WHERE id = :id"), {"id": item_id})
+        await connection.execute(
+            text("UPDATE item SET value = :value WHERE id = :id"), {"id": item_id, "value": value + 1}
+        )
+        await connection.execute(
+            text("INSERT INTO item (owner, name, value) VALUES (:owner, 'new', 0)"),
+            {"owner": random.randrange(100)},  # noqa: S311
+        )
+
+
+async def _read(engine: AsyncEngine, _: int) -> None:
+    with read_only():
+        async with engine.begin() as connection:
+            owner = random.randrange(100)  # noqa: S311
+            await connection.execute(text("SELECT * FROM item WHERE owner = :owner LIMIT 20"), {"owner": owner})
+            await connection.execute(
+                text("SELECT count(*), sum(value) FROM item WHERE owner = :owner"), {"owner": owner}
+            )
+
+
+async def _worker(kind: str, engine: AsyncEngine, rows: int, deadline: float, result: Result) -> None:
+    operation = _write if kind == "write" else _read
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            await operation(engine, rows)
+        except OperationalError:
+            # "database is locked"
+            result.errors[kind] += 1
+        else:
+            result.latencies[kind].append(time.perf_counter() - started)
+
+
+async def run_profile(name: str, args: argparse.Namespace) -> Result:
+    with tempfile.TemporaryDirectory() as directory:
+        settings = DatabaseSettings(
+            URL=f"sqlite+aiosqlite:///{directory}/benchmark.sqlite3",
+            POOL_SIZE=args.writers + args.readers,
+            **PROFILES[name],
+        )
+        engine = settings.get_engine()
+        await _setup(engine, args.rows)
+        result = Result()
+        deadline = time.perf_counter() + args.duration
+        await asyncio.gather(
+            *(_worker("write", engine, args.rows, deadline, result) for _ in range(args.writers)),
+            *(_worker("read", engine, args.rows, deadline, result) for _ in range(args.readers)),
+        )
+        await engine.dispose()
+    return result
+
+
+def _summary(kind: str, result: Result, duration: float) -> str:
+    latencies = sorted(result.latencies[kind])
+    if not latencies:
+        return f"{kind:>6}: no successful operation, {result.errors[kind]} errors"
+    p95 = latencies[int(len(latencies) * 0.95) - 1] if len(latencies) >= 20 else latencies[-1]
+    return (
+        f"{kind:>6}: {len(latencies) / duration:9.1f}/s  "
+        f"p50 {statistics.median(latencies) * 1000:7.2f}ms  p95 {p95 * 1000:7.2f}ms  "
+        f"errors {result.errors[kind]}"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duration", type=float, default=5, help="Seconds each profile runs.")
+    parser.add_argument("--writers", type=int, default=4, help="Concurrent write transactions.")
+    parser.add_argument("--readers", type=int, default=16, help="Concurrent read-only transactions.")
+    parser.add_argument("--rows", type=int, default=10_000, help="Rows in the table before the run.")
+    parser.add_argument("--profile", action="append", choices=PROFILES, help="Profiles to run. Defaults to all.")
+    args = parser.parse_args()
+    for name in args.profile or PROFILES:
+        result = await run_profile(name, args)
+        print(f"{name}\n{_summary('write', result, args.duration)}\n{_summary('read', result, args.duration)}")  # noqa: T201
+
+
+if __name__ == "__main__":
+    asyncio.run(main())